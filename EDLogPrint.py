@@ -1,4 +1,46 @@
-from printer import printer
+import argparse
 
+import events  # noqa: F401 (events has to be imported before monitor)
+from config import config
+from replay import JournalReplay
 
-printer.run()
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Elite Dangerous Log Print')
+    parser.add_argument('--replay', nargs='?', const='text', choices=JournalReplay.OUTPUTS,
+                        help='run all journals in journal_dir through the app and exit: '
+                             'print them (text) or rebuild the scanned bodies (bodies)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='processes decoding the journals of the replay '
+                             '(default: 1, the replay runs in the main process)')
+    parser.add_argument('--runtime', choices=('threads', 'asyncio'),
+                        default=config.get('runtime', 'threads'),
+                        help='run the monitor and the printer in threads or as '
+                             'tasks of an asyncio event loop')
+    parser.add_argument('--diagnostics', action='store_true',
+                        default=config.get('diagnostics', False),
+                        help='print the JSON library, the file system notifications '
+                             'and the event queue stats to stderr at the start and the exit')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    config['diagnostics'] = args.diagnostics
+
+    if args.replay:
+        JournalReplay(args.replay, jobs=args.jobs).run()
+    else:
+        from printer import printer
+        if args.runtime == 'asyncio':
+            from runtime import AsyncRuntime
+            runtime = AsyncRuntime()
+            runtime.add_consumer(printer.consume)
+            runtime.run()
+        else:
+            printer.run()
+
+        if args.diagnostics:
+            from monitor import monitor
+            monitor.report_diagnostics()
@@ -0,0 +1,1089 @@
+import argparse
+import asyncio
+import base64
+import copy
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from os.path import getsize, join
+
+import colorama
+
+import events  # noqa: F401 (events has to be imported before monitor)
+import jsoncodec
+from bodies import StarSystemBodies
+from bodydb import BodyDatabase
+from config import config
+from console import ConsoleWriter
+from eventqueue import EventQueue
+from journal import Journals, logfiles
+from monitor import JournalHandler, monitor
+from printer import LogPrinter
+from replay import JournalReplay
+from runtime import AsyncRuntime
+from screenshot import ScreenshotConverter
+from server import StateServer, read_websocket_frame
+from sinks import ConsoleSink, JsonlSink, SocketSink, Sinks, TextSink
+
+
+def report(name, samples, unit='ms'):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f'{name}: n={len(samples)} min={samples[0]:.2f}{unit} '
+        f'median={statistics.median(samples):.2f}{unit} '
+        f'p95={p95:.2f}{unit} max={samples[-1]:.2f}{unit}'
+    )
+
+
+def bench_latency(args):
+    """Time from a line written to the journal until get_entry() returns it"""
+
+    config['journal_notifications'] = not args.poll
+    journal_dir = tempfile.mkdtemp()
+    logfile = join(journal_dir, 'Journal.2021-01-01T000000.01.log')
+    line = '{ "timestamp":"2021-01-01T00:00:00Z", "event":"SupercruiseEntry", "StarSystem":"Sol" }\r\n'
+
+    with open(logfile, 'w', encoding='utf-8') as log:
+        handler = JournalHandler()
+        handler.journal_dir = journal_dir
+        handler.checkpoint_interval = 0
+
+        if args.asyncio:
+            samples = latency_async(args, handler, log, line)
+        else:
+            handler.start()
+            time.sleep(0.5)
+
+            samples = []
+            for _ in range(args.count):
+                log.write(line)
+                log.flush()
+                start = time.perf_counter()
+                entry = handler.get_entry(timeout=5)
+                if entry is None:
+                    print('Timed out waiting for the event')
+                    break
+                samples.append((time.perf_counter() - start) * 1000)
+                time.sleep(args.interval)
+
+            handler.stop()
+
+    shutil.rmtree(journal_dir)
+
+    if samples:
+        mode = 'polling' if args.poll else 'notifications'
+        runtime = 'asyncio' if args.asyncio else 'threads'
+        report(f'Journal to printer latency ({mode}, {runtime})', samples)
+
+
+def latency_async(args, handler, log, line):
+    """The latency benchmark with the journal written by a consumer task"""
+
+    samples = []
+
+    async def consumer(queue):
+        await asyncio.sleep(0.5)
+        for _ in range(args.count):
+            log.write(line)
+            log.flush()
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(queue.get(), 5)
+            except asyncio.TimeoutError:
+                print('Timed out waiting for the event')
+                break
+            samples.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(args.interval)
+
+        # Ends the runtime like Ctrl+C
+        raise KeyboardInterrupt
+
+    runtime = AsyncRuntime(handler)
+    runtime.add_consumer(consumer)
+    runtime.run()
+    return samples
+
+
+def bench_rotation(args):
+    """Journal rotation: lines left in the old journal and the first event of the new one"""
+
+    config['journal_notifications'] = not args.poll
+    journal_dir = tempfile.mkdtemp()
+    line = '{ "timestamp":"2021-01-01T00:00:00Z", "event":"SupercruiseEntry", "StarSystem":"%s" }\r\n'
+
+    logfile = join(journal_dir, 'Journal.2021-01-01T000000.01.log')
+    log = open(logfile, 'w', encoding='utf-8')
+    handler = JournalHandler()
+    handler.journal_dir = journal_dir
+    handler.checkpoint_interval = 0
+    handler.start()
+    time.sleep(0.5)
+
+    samples = []
+    lost = 0
+    for session in range(1, args.count + 1):
+        # The game writes its last lines and starts the next journal at once
+        for number in range(args.lines):
+            log.write(line % f'old {session} {number}')
+        log.close()
+
+        logfile = join(journal_dir, f'Journal.2021-01-01T{session:06d}.01.log')
+        log = open(logfile, 'w', encoding='utf-8')
+        log.write(line % f'new {session}')
+        log.flush()
+        start = time.perf_counter()
+
+        received = 0
+        while True:
+            entry = handler.get_entry(timeout=5)
+            if entry is None:
+                break
+            if entry['StarSystem'].startswith('new'):
+                samples.append((time.perf_counter() - start) * 1000)
+                break
+            received += 1
+        lost += args.lines - received
+        time.sleep(args.interval)
+
+    handler.stop()
+    log.close()
+    shutil.rmtree(journal_dir)
+
+    mode = 'polling' if args.poll else 'notifications'
+    print(f'{lost} of {args.count * args.lines} lines of the old journals lost')
+    if samples:
+        report(f'First event of a new journal ({mode})', samples)
+
+
+def bench_companion(args):
+    """Status.json rewritten in bursts: files read and entries made vs writes"""
+
+    journal_dir = tempfile.mkdtemp()
+    logfile = join(journal_dir, 'Journal.2021-01-01T000000.01.log')
+    open(logfile, 'w').close()
+    status_path = join(journal_dir, 'Status.json')
+
+    handler = JournalHandler()
+    handler.journal_dir = journal_dir
+    handler.checkpoint_interval = 0
+    handler.track(())
+    handler.start()
+    time.sleep(0.5)
+
+    fuel = 32.0
+    writes = 0
+    start = time.process_time()
+    for burst in range(args.count):
+        # The game writes the same status several times in a row
+        fuel -= 0.01
+        for _ in range(args.burst):
+            with open(status_path, 'w', encoding='utf-8') as status:
+                status.write(json.dumps({
+                    'timestamp': '2021-01-01T00:00:00Z', 'event': 'Status',
+                    'Flags': 16842765, 'Pips': [4, 8, 0], 'FireGroup': 0, 'GuiFocus': 0,
+                    'Fuel': {'FuelMain': fuel, 'FuelReservoir': 0.5},
+                    'Cargo': 0.0, 'LegalState': 'Clean', 'Latitude': 12.5, 'Longitude': -3.25,
+                    'Heading': burst % 360, 'Altitude': 0, 'BodyName': 'Sol 3',
+                }))
+            writes += 1
+        time.sleep(args.interval)
+
+    time.sleep(0.5)
+    cpu = time.process_time() - start
+    handler.stop()
+    companion = handler.companion
+    shutil.rmtree(journal_dir)
+
+    print(f'{writes} writes, {companion.reads} reads, {companion.entries} entries, '
+          f'{cpu * 1000:.0f} ms CPU')
+    current = 'current' if abs(handler.state['FuelLevel'] - fuel) < 1e-9 else 'STALE'
+    print(f'fuel in the state is {current}')
+
+
+def read_journals(journal_dir):
+    lines = []
+    for filename in sorted(os.listdir(journal_dir)):
+        if filename.startswith('Journal') and filename.endswith('.log'):
+            with open(join(journal_dir, filename), 'rb') as log:
+                lines.extend(line for line in log if line.strip())
+
+    return lines
+
+
+def bench_decode(args):
+    """Decode speed of the available JSON libraries over real journals"""
+
+    lines = read_journals(args.journal_dir)
+    if not lines:
+        print(f'No journal files in {args.journal_dir}')
+        return
+
+    size = sum(len(line) for line in lines) / 2 ** 20
+    print(f'{len(lines)} lines, {size:.1f} MB, selected codec: {jsoncodec.name}')
+    for name, (loads, _) in jsoncodec.CODECS.items():
+        start = time.perf_counter()
+        for line in lines:
+            loads(line)
+        elapsed = time.perf_counter() - start
+        print(f'{name:8} {len(lines) / elapsed:12,.0f} lines/s {size / elapsed:8.1f} MB/s')
+
+
+# Entries of a busy session in supercruise and at a combat zone, most of
+# them are events neither the printer nor the monitor uses
+SESSION_ENTRIES = [
+    (30, {'event': 'FSSSignalDiscovered', 'SystemAddress': 2868635379121,
+          'SignalName': '$MULTIPLAYER_SCENARIO42_TITLE;',
+          'SignalName_Localised': 'Nav Beacon', 'IsStation': False}),
+    (10, {'event': 'Music', 'MusicTrack': 'Combat_Dogfight'}),
+    (10, {'event': 'ShipTargeted', 'TargetLocked': True, 'Ship': 'ferdelance',
+          'ScanStage': 3, 'PilotName': '$npc_name_decorate:#name=Ace;',
+          'PilotName_Localised': 'Ace', 'PilotRank': 'Elite', 'ShieldHealth': 100.0,
+          'HullHealth': 100.0, 'Faction': 'Pirates', 'LegalStatus': 'Wanted',
+          'Bounty': 350000}),
+    (8, {'event': 'ReservoirReplenished', 'FuelMain': 30.2, 'FuelReservoir': 0.96}),
+    (3, {'event': 'UnderAttack', 'Target': 'You'}),
+    (3, {'event': 'HullDamage', 'Health': 0.87, 'PlayerPilot': True, 'Fighter': False}),
+    (3, {'event': 'Bounty', 'Rewards': [{'Faction': 'Federal Navy', 'Reward': 350000}],
+         'Target': 'ferdelance', 'TotalReward': 350000, 'VictimFaction': 'Pirates'}),
+    (2, {'event': 'Friends', 'Status': 'Online', 'Name': 'Commander'}),
+    (2, {'event': 'FSDTarget', 'Name': 'Sol', 'SystemAddress': 10477373803,
+         'StarClass': 'G', 'RemainingJumpsInRoute': 3}),
+    (1, {'event': 'NpcCrewPaidWage', 'NpcCrewName': 'Crew', 'NpcCrewId': 1, 'Amount': 0}),
+    (10, {'event': 'ReceiveText', 'From': 'Ace', 'Message': '$Pirate_OnStartScanCargo07;',
+          'Message_Localised': 'Let me see what you have.', 'Channel': 'npc'}),
+    (8, {'event': 'Scan', 'ScanType': 'AutoScan', 'BodyName': 'Sol 3', 'BodyID': 3,
+         'Parents': [{'Null': 2}, {'Star': 0}], 'StarSystem': 'Sol',
+         'SystemAddress': 10477373803, 'DistanceFromArrivalLS': 499.0,
+         'TidalLock': False, 'TerraformState': '', 'PlanetClass': 'Earthlike body',
+         'Atmosphere': 'suitable for water-based life', 'AtmosphereType': 'EarthLike',
+         'Volcanism': '', 'Landable': False, 'MassEM': 1.0, 'Radius': 6371000.0,
+         'SurfaceGravity': 9.8, 'SurfaceTemperature': 288.0, 'SurfacePressure': 101325.0,
+         'SemiMajorAxis': 149598000000.0, 'Eccentricity': 0.0167,
+         'OrbitalInclination': 0.0, 'Periapsis': 102.9, 'OrbitalPeriod': 31558149.0,
+         'RotationPeriod': 86164.0, 'AxialTilt': 0.41, 'WasDiscovered': True,
+         'WasMapped': True}),
+    (3, {'event': 'FuelScoop', 'Scooped': 5.0, 'Total': 32.0}),
+    (2, {'event': 'FSDJump', 'StarSystem': 'Sol', 'SystemAddress': 10477373803,
+         'StarPos': [0.0, 0.0, 0.0], 'JumpDist': 8.6, 'FuelUsed': 1.2, 'FuelLevel': 30.8}),
+    (2, {'event': 'StartJump', 'JumpType': 'Hyperspace', 'StarSystem': 'Sol',
+         'SystemAddress': 10477373803, 'StarClass': 'G'}),
+    (2, {'event': 'MaterialCollected', 'Category': 'Raw', 'Name': 'iron', 'Count': 3}),
+    (1, {'event': 'SupercruiseEntry', 'StarSystem': 'Sol', 'SystemAddress': 10477373803}),
+]
+
+
+def session_lines(count):
+    weights, entries = zip(*SESSION_ENTRIES)
+    lines = []
+    for entry in random.choices(entries, weights, k=count):
+        line = {'timestamp': '2021-01-01T00:00:00Z', **entry}
+        lines.append(json.dumps(line, separators=(', ', ':')).encode() + b'\r\n')
+
+    return lines
+
+
+def bench_prefilter(args):
+    """Journal replay through JournalHandler.parse with and without the event pre-filter
+
+    The pre-filter pays for the entries neither the printer nor the monitor
+    uses, with --session over a synthetic journal where most are such events.
+    """
+
+    if args.session:
+        lines = session_lines(args.session)
+    else:
+        lines = read_journals(args.journal_dir)
+    if not lines:
+        print(f'No journal files in {args.journal_dir}')
+        return
+
+    # The live app tracks the printed events, the body replay none. A
+    # skipped line saves more with the json module than with orjson.
+    selected = jsoncodec.loads
+    for codec, (loads, _) in jsoncodec.CODECS.items():
+        jsoncodec.loads = loads
+        for name, tracked in (('printer', LogPrinter.TRACK_EVENTS), ('bodies', ())):
+            for prefilter in (False, True):
+                timings = []
+                for _ in range(args.repeat):
+                    handler = JournalHandler()
+                    handler.track(tracked)
+                    if not prefilter:
+                        handler.relevant_events = None
+
+                    queued = 0
+                    start = time.perf_counter()
+                    for line in lines:
+                        if handler.parse(line) is not None:
+                            queued += 1
+                    timings.append(time.perf_counter() - start)
+
+                mode = 'with pre-filter' if prefilter else 'without pre-filter'
+                print(f'{codec:7} {name:8} {mode:20} '
+                      f'{len(lines) / min(timings):12,.0f} lines/s queued: {queued}')
+
+    jsoncodec.loads = selected
+    for name, tracked in (('printer', LogPrinter.TRACK_EVENTS), ('bodies', ())):
+        handler = JournalHandler()
+        handler.track(tracked)
+        skipped = sum(handler.decode(line) is None for line in lines)
+        print(f'{name:8} skipped lines: {skipped / len(lines):.0%}')
+
+
+def planet_scan_entry(star_system, body_id):
+    return {
+        'timestamp': '2021-01-01T00:00:00Z', 'event': 'Scan', 'ScanType': 'Detailed',
+        'BodyName': f'{star_system} {body_id}', 'BodyID': body_id, 'StarSystem': star_system,
+        'Parents': [{'Star': 0}], 'DistanceFromArrivalLS': 1000.0 + body_id,
+        'TidalLock': False, 'TerraformState': '', 'Landable': True,
+        'PlanetClass': random.choice(('Icy body', 'Rocky body', 'High metal content body')),
+        'Atmosphere': '', 'AtmosphereType': 'None', 'Volcanism': '',
+        'MassEM': random.random(), 'Radius': random.uniform(3e5, 7e6),
+        'SurfaceGravity': random.uniform(0.5, 30), 'SurfaceTemperature': random.uniform(20, 700),
+        'SurfacePressure': 0.0, 'SemiMajorAxis': random.uniform(1e8, 1e12),
+        'Eccentricity': random.random() / 10, 'OrbitalInclination': random.uniform(-10, 10),
+        'Periapsis': random.uniform(0, 360), 'OrbitalPeriod': random.uniform(1e5, 1e8),
+        'RotationPeriod': random.uniform(1e5, 1e7), 'AxialTilt': random.uniform(-1, 1),
+        'Materials': [{'Name': name, 'Percent': random.uniform(0.1, 20)} for name in (
+            'iron', 'sulphur', 'carbon', 'nickel', 'phosphorus', 'chromium', 'zinc', 'tin')],
+        'Composition': {'Ice': 0.1, 'Rock': 0.6, 'Metal': 0.3},
+        'WasDiscovered': False, 'WasMapped': False,
+    }
+
+
+class DictPlanetScan:
+    """A planet as it was stored before BodyScan, for comparison
+
+    An attribute dict with the colors of every record and the values of the
+    entry as they are, the materials and the composition included.
+    """
+
+    def __init__(self, entry, interests):
+        colors = config['colors']
+        for prefix, name in (('k', 'key'), ('v', 'value'), ('i', 'interest'),
+                             ('cm', 'cmdr_message'), ('nm', 'npc_message')):
+            setattr(self, f'{prefix}_s', getattr(colorama.Style, colors[name][1]))
+            setattr(self, f'{prefix}_c', getattr(colorama.Fore, colors[name][0]))
+
+        self.id = entry['BodyID']
+        self.body_type = 'Planet'
+        self.star_system = entry.get('StarSystem')
+        self.parents = entry.get('Parents', [])
+        self.scan_type = entry.get('ScanType')
+        self.body_name = entry.get('BodyName', 'ERROR')
+        self.planet_class = entry.get('PlanetClass', 'ERROR')
+        self.mass = entry.get('MassEM', -1)
+        self.radius = entry.get('Radius') / 1000
+        self.radius_e = self.radius / 6371
+        self.surface_gravity = entry.get('SurfaceGravity', -1) / 10
+        self.rotation_period = entry.get('RotationPeriod', None)
+        self.orbital_period = entry.get('OrbitalPeriod', None)
+        self.axial_tilt = entry.get('AxialTilt', None)
+        self.semi_major_axis = entry.get('SemiMajorAxis', 0) / 1000
+        self.eccentricity = entry.get('Eccentricity', None)
+        self.orbital_inclination = entry.get('OrbitalInclination', None)
+        self.tidal_lock = entry.get('TidalLock', False)
+        self.terraform_state = entry.get('TerraformState', None)
+        self.atmosphere = entry.get('Atmosphere', 'ERROR').capitalize()
+        self.atmosphere_type = entry.get('AtmosphereType', None)
+        self.atmosphere_composition = entry.get('AtmosphereComposition', None)
+        self.volcanism = entry.get('Volcanism', None)
+        self.surface_temperature = entry.get('SurfaceTemperature', 0)
+        self.surface_temperature_c = self.surface_temperature - 273.15
+        self.surface_pressure = entry.get('SurfacePressure', -1) / 101325
+        self.landable = entry.get('Landable', 'N/A')
+        self.materials = entry.get('Materials', None)
+        self.composition = entry.get('Composition', None)
+        self.rings = entry.get('Rings', None)
+        self.was_discovered = entry.get('WasDiscovered', None)
+        self.was_mapped = entry.get('WasMapped', None)
+        self.interests = interests
+
+
+def bench_memory(args):
+    """Memory taken by scanned bodies kept in StarSystemBodies, slotted
+    records vs the attribute dicts before them"""
+
+    bodies_per_system = 20
+
+    for name, record in (
+        ('dict records', lambda entry, scan: DictPlanetScan(entry, list(scan.interests))),
+        ('slotted records', lambda entry, scan: scan),
+    ):
+        random.seed(1)
+        starsystem_bodies = StarSystemBodies(max_systems=0, max_bytes=0)
+
+        tracemalloc.start()
+        for index in range(args.count):
+            star_system = f'Col 285 Sector AB-C d{index // bodies_per_system}'
+            body_id = index % bodies_per_system + 1
+            entry = planet_scan_entry(star_system, body_id)
+            starsystem_bodies.add(star_system, record(entry, events.Scan(entry).body_scan))
+            del entry
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f'{name:16} {args.count:,} bodies: {current / 2 ** 20:6.1f} MB, '
+              f'{current / args.count:5.0f} bytes per body')
+        del starsystem_bodies
+
+
+def bench_render(args):
+    """Records rendered per second for the heaviest schemas"""
+
+    random.seed(1)
+    star_system = 'Col 285 Sector AB-C d1'
+    monitor.state['StarSystem'] = star_system
+    scans = []
+    for body_id in range(1, 31):
+        entry = planet_scan_entry(star_system, body_id)
+        entry['Landable'] = body_id % 2 == 0
+        events.Scan.update_state(monitor.state, entry)
+        scans.append(entry)
+
+    samples = {
+        'Scan': scans,
+        'FSSAllBodiesFound': [{
+            'timestamp': '2021-01-01T00:00:00Z', 'event': 'FSSAllBodiesFound',
+            'SystemName': star_system, 'Count': len(scans),
+        }],
+        'Died': [{
+            'timestamp': '2021-01-01T00:00:00Z', 'event': 'Died',
+            'Killers': [
+                {'Name': f'Cmdr Killer {index}', 'Ship': 'federation_corvette', 'Rank': 'Elite'}
+                for index in range(4)
+            ],
+        }],
+    }
+
+    for event, entries in samples.items():
+        handler = events.registry[event]
+        count = 0
+        start = time.perf_counter()
+        while count < args.count:
+            for entry in entries:
+                handler(entry).render(entry['timestamp'], event)
+                count += 1
+        elapsed = time.perf_counter() - start
+        print(f'{event:18} {count / elapsed:10,.0f} records/s')
+
+
+def bench_console(args):
+    """Console writes of a burst of records, one print() each vs buffered"""
+
+    random.seed(1)
+    star_system = 'Col 285 Sector AB-C d1'
+    monitor.state['StarSystem'] = star_system
+    records = []
+    for body_id in range(1, args.count + 1):
+        entry = planet_scan_entry(star_system, body_id % 100)
+        records.append(events.Scan(entry).render(entry['timestamp'], 'Scan'))
+
+    # Unbuffered like a console, optionally through colorama as on Windows
+    devnull = open(os.devnull, 'w', buffering=1)
+    colorama_stream = colorama.AnsiToWin32(devnull, strip=True, convert=False).stream
+    # name, stream of print(), stream and strip of the ConsoleWriter
+    streams = (
+        ('plain', devnull, devnull, False),
+        ('colorama', colorama_stream, colorama_stream, False),
+        # What the writer does past colorama: a console with ANSI codes
+        # gets the records as they are, a redirected output stripped at once
+        ('direct', colorama_stream, devnull, False),
+        ('stripped', colorama_stream, devnull, True),
+    )
+
+    for name, print_stream, stream, strip in streams:
+        start = time.perf_counter()
+        for record in records:
+            print(record, file=print_stream)
+        printed = time.perf_counter() - start
+
+        writer = ConsoleWriter(stream, strip=strip)
+        start = time.perf_counter()
+        for record in records:
+            writer.write(record)
+        writer.flush()
+        buffered = time.perf_counter() - start
+
+        print(f'{name:9} print {len(records) / printed:10,.0f} records/s  '
+              f'buffered {len(records) / buffered:10,.0f} records/s  '
+              f'({writer.writes} writes)')
+
+    devnull.close()
+
+
+def bench_sinks(args):
+    """Bursts of events to all sinks, with a socket client that never reads"""
+
+    random.seed(1)
+    star_system = 'Col 285 Sector AB-C d1'
+    monitor.state['StarSystem'] = star_system
+    events_ = []
+    for body_id in range(1, args.count + 1):
+        entry = planet_scan_entry(star_system, body_id % 100)
+        events_.append((entry, events.Scan(entry).render(entry['timestamp'], 'Scan')))
+
+    log_dir = tempfile.mkdtemp()
+    devnull = open(os.devnull, 'w')
+    sinks = Sinks([])
+    sinks.sinks = [
+        ConsoleSink(ConsoleWriter(devnull)),
+        TextSink(join(log_dir, 'events.log')),
+        JsonlSink(join(log_dir, 'events.jsonl')),
+        SocketSink(port=0),
+    ]
+    sinks.start()
+
+    # Connected, but its receive buffer fills up
+    client = socket.create_connection(sinks.sinks[-1].server.getsockname())
+    client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    time.sleep(0.1)
+
+    put = 0
+    for index in range(0, len(events_), args.burst):
+        start = time.perf_counter()
+        for entry, record in events_[index:index + args.burst]:
+            sinks.put(entry, record)
+        put += time.perf_counter() - start
+        time.sleep(args.interval)
+
+    sinks.stop()
+    client.close()
+    devnull.close()
+    shutil.rmtree(log_dir)
+
+    print(f'{len(events_):,d} events put in {put * 1000:.1f} ms, '
+          f'{put / len(events_) * 1e6:.1f} us per event')
+    for metrics in sinks.metrics():
+        print(f'{metrics["name"]:8} delivered {metrics["delivered"]:7,d} '
+              f'dropped {metrics["dropped"]:7,d} max depth {metrics["max_depth"]:6,d} '
+              f'max lag {metrics["max_lag"] * 1000:8.1f} ms')
+
+
+def bench_server(args):
+    """Events and state changes pushed to WebSocket clients of the state server"""
+
+    random.seed(1)
+    star_system = 'Col 285 Sector AB-C d1'
+    monitor.state['StarSystem'] = star_system
+    for body_id in range(1, 31):
+        events.Scan.update_state(monitor.state, planet_scan_entry(star_system, body_id))
+    monitor.state['FuelLevel'] = 32.0
+    monitor.state_version += 1
+
+    server = StateServer(port=0)
+    server.start()
+    host, port = server.address()
+
+    async def client(ready, received):
+        reader, writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((
+            'GET /events HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n'
+            f'Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n'
+            'Sec-WebSocket-Version: 13\r\n\r\n'
+        ).encode())
+        await reader.readuntil(b'\r\n\r\n')
+        _, snapshot = await read_websocket_frame(reader)
+        received['snapshot'] = len(snapshot)
+        ready.release()
+
+        # Events and the diffs of the fuel, until the last event
+        while True:
+            _, payload = await read_websocket_frame(reader)
+            received['messages'] = received.get('messages', 0) + 1
+            received['bytes'] = received.get('bytes', 0) + len(payload)
+            message = jsoncodec.loads(payload)
+            if message['type'] == 'event' and message['entry']['Number'] == args.count - 1:
+                break
+        writer.close()
+
+    async def main():
+        ready = asyncio.Semaphore(0)
+        received = {}
+        tasks = [asyncio.create_task(client(ready, received)) for _ in range(args.clients)]
+        for _ in range(args.clients):
+            await ready.acquire()
+
+        entry = {'timestamp': '2021-01-01T00:00:00Z', 'event': 'FuelScoop',
+                 'Scooped': 0.5, 'Total': 32.0}
+        record = events.FuelScoop(entry).render(entry['timestamp'], 'FuelScoop')
+        start = time.perf_counter()
+        cpu = time.process_time()
+        for number in range(args.count):
+            monitor.state['FuelLevel'] = 16.0 + number % 16
+            monitor.state_version += 1
+            server.put(dict(entry, Number=number), record)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        return time.perf_counter() - start, time.process_time() - cpu, received
+
+    elapsed, cpu, received = asyncio.run(main())
+    metrics = server.metrics()
+    server.stop()
+
+    print(f'{args.clients} clients, {args.count:,d} events: {received["messages"]:,d} messages '
+          f'received in {elapsed * 1000:.0f} ms ({cpu * 1000:.0f} ms CPU with the clients)')
+    print(f'snapshot {received["snapshot"]:,d} bytes, an event or a diff '
+          f'{received["bytes"] / received["messages"]:,.0f} bytes on average')
+    print(f'{metrics["snapshots"]:,d} snapshots built, {metrics["messages"]:,d} messages '
+          f'encoded once for all clients')
+
+
+def screenshot_image(width, height):
+    """Noise on a gradient, compresses about like a screenshot of the game"""
+
+    from PIL import Image
+
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 32)
+    return Image.merge('RGB', (gradient, noise, gradient.transpose(Image.ROTATE_180)))
+
+
+def bench_screenshots(args):
+    """A burst of screenshots: a Python process per shot vs the converter pool"""
+
+    width, height = args.size
+    image = screenshot_image(width, height)
+
+    def burst():
+        shots_dir = tempfile.mkdtemp()
+        paths = []
+        for number in range(args.count):
+            path = join(shots_dir, f'Screenshot_{number:04d}.bmp')
+            image.save(path)
+            paths.append(path)
+        return shots_dir, paths
+
+    def finish(name, shots_dir, elapsed):
+        converted = len([f for f in os.listdir(shots_dir) if f.endswith('.png')])
+        print(f'{name:18} {args.count / elapsed:6.2f} shots/s '
+              f'({converted}/{args.count} converted)')
+        shutil.rmtree(shots_dir)
+
+    shots_dir, paths = burst()
+    start = time.perf_counter()
+    script = join(os.path.dirname(os.path.abspath(__file__)), 'convert_to_png.py')
+    processes = [subprocess.Popen([sys.executable, script, path]) for path in paths]
+    for process in processes:
+        process.wait()
+    finish('process per shot', shots_dir, time.perf_counter() - start)
+
+    for pool in ('thread', 'process'):
+        shots_dir, paths = burst()
+        converter = ScreenshotConverter(args.workers, pool)
+        reports = []
+        start = time.perf_counter()
+        for path in paths:
+            converter.submit(path, reports.append)
+        converter.shutdown()
+        finish(f'{pool} pool ({converter.workers})', shots_dir, time.perf_counter() - start)
+        failed = [entry for entry in reports if entry['event'] != 'ScreenshotConverted']
+        if failed:
+            print(f'{len(failed)} failed: {failed[0]["Error"]}')
+
+
+def convert_before(filename):
+    """The conversion before compress_level and the single decode"""
+
+    from PIL import Image
+
+    out_filename = filename.split('.')[0] + '.png'
+    Image.open(filename).save(out_filename)
+    with Image.open(out_filename) as im:
+        im.verify()
+    with Image.open(out_filename) as im:
+        im.transpose(Image.FLIP_LEFT_RIGHT)
+    os.remove(filename)
+    return out_filename
+
+
+def bench_png(args):
+    """Conversion of a 4K and an 8K screenshot with the options of convert()"""
+
+    from convert_to_png import convert
+
+    modes = [('before', convert_before)]
+    for level in args.levels:
+        modes.append((f'level {level}', partial(convert, compress_level=level)))
+    modes.append((f'level {args.levels[-1]} no atomic',
+                  partial(convert, compress_level=args.levels[-1], atomic=False)))
+    modes.append(('level 9 optimize', partial(convert, compress_level=9, optimize=True)))
+
+    for width, height in ((3840, 2160), (7680, 4320)):
+        shots_dir = tempfile.mkdtemp()
+        source = join(shots_dir, 'source.bmp')
+        screenshot_image(width, height).save(source)
+        mb = getsize(source) / 1e6
+        print(f'{width}x{height} {mb:,.1f} MB')
+
+        for name, mode in modes:
+            times = []
+            for _ in range(args.repeat):
+                path = join(shots_dir, 'Screenshot_0000.bmp')
+                shutil.copyfile(source, path)
+                start = time.perf_counter()
+                out_filename = mode(path)
+                times.append(time.perf_counter() - start)
+            elapsed = min(times)
+            print(f'  {name:20} {elapsed:6.2f} s {mb / elapsed:7.1f} MB/s '
+                  f'{getsize(out_filename) / 1e6:7.1f} MB .png')
+            os.remove(out_filename)
+
+        shutil.rmtree(shots_dir)
+
+
+def bench_batch(args):
+    """Conversion of a backlog of screenshots, one job vs a process per CPU"""
+
+    from convert_to_png import BatchConversion
+
+    width, height = args.size
+    image = screenshot_image(width, height)
+    data_dir = config['data_dir']
+
+    for jobs in sorted({1, args.jobs}):
+        shots_dir = tempfile.mkdtemp()
+        for number in range(args.count):
+            image.save(join(shots_dir, f'Screenshot_{number:04d}.bmp'))
+        # The manifest of the batch away from the one of the app
+        config['data_dir'] = shots_dir
+
+        batch = BatchConversion(shots_dir, jobs=jobs, progress=False,
+                                compress_level=args.compress_level)
+        start = time.perf_counter()
+        batch.run()
+        elapsed = time.perf_counter() - start
+        config['data_dir'] = data_dir
+
+        print(f'{jobs:3d} jobs {batch.converted_bytes / 1e6 / elapsed:8.1f} MB/s '
+              f'{batch.converted / elapsed:6.2f} shots/s '
+              f'({batch.converted}/{args.count} converted)')
+        shutil.rmtree(shots_dir)
+
+
+def replay_bodies(database):
+    connection = database.connect()
+    return (
+        connection.execute('SELECT * FROM bodies ORDER BY star_system, body_id').fetchall(),
+        connection.execute('SELECT * FROM interests ORDER BY star_system, body_id, interest').fetchall(),
+    )
+
+
+def bench_replay(args):
+    """Replay of the bodies of all journals, sequential and with a process pool"""
+
+    monitor.journal_dir = args.journal_dir
+    initial_state = copy.deepcopy(
+        {key: value for key, value in monitor.state.items() if key != 'StarSystemBodies'})
+
+    results = []
+    for jobs in (1, args.jobs):
+        monitor.state.update(copy.deepcopy(initial_state))
+        database_dir = tempfile.mkdtemp()
+        database = BodyDatabase(join(database_dir, 'bodies.sqlite'))
+        replay = JournalReplay('bodies', jobs=jobs, progress=False, database=database)
+
+        start = time.perf_counter()
+        replay.run()
+        elapsed = time.perf_counter() - start
+
+        state = {key: value for key, value in monitor.state.items() if key != 'StarSystemBodies'}
+        results.append((replay_bodies(database), state))
+        database.close()
+        shutil.rmtree(database_dir)
+
+        print(f'{jobs:3d} jobs {replay.read_bytes / 1e6 / elapsed:10,.1f} MB/s '
+              f'{replay.systems:,d} systems')
+
+    if results[0] == results[1]:
+        print('parallel result matches the sequential one')
+    else:
+        print('parallel result DIFFERS from the sequential one')
+        sys.exit(1)
+
+
+def bench_resume(args):
+    """Start-up on a long journal: reading it again vs resuming from a checkpoint"""
+
+    random.seed(1)
+    journal_dir = tempfile.mkdtemp()
+    logfile = join(journal_dir, 'Journal.2021-01-01T000000.01.log')
+    with open(logfile, 'w', encoding='utf-8') as log:
+        for system in range(args.systems):
+            star_system = f'Col 285 Sector AB-C d{system}'
+            log.write(json.dumps({
+                'timestamp': '2021-01-01T00:00:00Z', 'event': 'FSDJump',
+                'StarSystem': star_system, 'Population': 0,
+            }) + '\r\n')
+            for body_id in range(1, 31):
+                log.write(json.dumps(planet_scan_entry(star_system, body_id)) + '\r\n')
+
+    def open_journal():
+        handler = JournalHandler()
+        handler.event_queue = EventQueue(maxsize=0)
+        handler.checkpoint_path = join(journal_dir, 'checkpoint')
+        handler.logfile = logfile
+        handler.track(LogPrinter.TRACK_EVENTS)
+        return handler
+
+    handler = open_journal()
+    start = time.perf_counter()
+    handler.loghandle = open(logfile, 'rb')
+    for entry in handler.read_lines():
+        handler.event_queue.put(entry, entry['event'])
+    # the printer has taken every entry, otherwise checkpoint() waits for it
+    while handler.get_entry() is not None:
+        pass
+    read = time.perf_counter() - start
+
+    start = time.perf_counter()
+    handler.checkpoint()
+    saved = time.perf_counter() - start
+    handler.loghandle.close()
+
+    handler = open_journal()
+    start = time.perf_counter()
+    handler.resume()
+    handler.loghandle = open(logfile, 'rb')
+    handler.loghandle.seek(handler.resume_offset)
+    for entry in handler.read_lines():
+        handler.event_queue.put(entry, entry['event'])
+    resumed = time.perf_counter() - start
+    handler.loghandle.close()
+
+    print(f'read the journal    {read * 1000:10.1f} ms ({os.path.getsize(logfile) / 1e6:.1f} MB)')
+    print(f'write a checkpoint  {saved * 1000:10.1f} ms '
+          f'({os.path.getsize(handler.checkpoint_path) / 1e6:.1f} MB)')
+    print(f'resume              {resumed * 1000:10.1f} ms '
+          f'({len(handler.state["StarSystemBodies"]):,d} bodies restored)')
+
+    shutil.rmtree(journal_dir)
+
+
+def bench_bodydb(args):
+    """Batched inserts into the body database and query times over it"""
+
+    random.seed(1)
+    database_dir = tempfile.mkdtemp()
+    database = BodyDatabase(join(database_dir, 'bodies.sqlite'))
+    interests = ('Small body', 'Landable with high gravity', 'Ringed landable body',
+                 'Close ring proximity', 'Landable large planet')
+
+    # A few thousand distinct bodies, stored under many systems
+    bodies = []
+    for body_id in range(1, 3001):
+        entry = planet_scan_entry('Col 285 Sector AB-C d1', body_id % 60)
+        entry['Landable'] = random.random() < 0.3
+        entry['TerraformState'] = 'Terraformable' if random.random() < 0.05 else ''
+        if random.random() < 0.1:
+            entry['Rings'] = [{'Name': 'A Ring', 'RingClass': 'eRingClass_Icy'}]
+        body = events.Scan.get_body_scan(entry)
+        body.interests = random.sample(interests, random.randint(0, 2))
+        bodies.append(body)
+
+    start = time.perf_counter()
+    for number in range(args.count):
+        database.add(f'Synthetic Sector {number // 30}', bodies[number % len(bodies)])
+    database.flush()
+    elapsed = time.perf_counter() - start
+    print(f'insert {args.count / elapsed:12,.0f} bodies/s')
+
+    queries = {
+        'landable high-gravity ringed': dict(landable=True, min_gravity=2, rings=True),
+        'terraformable rocky': dict(body_class='Rocky body', terraformable=True),
+        'interest': dict(interest='Ringed landable body'),
+        'system': dict(star_system=f'Synthetic Sector {args.count // 60}'),
+    }
+    for name, query in queries.items():
+        samples = []
+        for _ in range(5):
+            start = time.perf_counter()
+            rows = database.query(**query)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f'{name:30} {statistics.median(samples):8.2f} ms ({len(rows)} bodies)')
+
+    database.close()
+    shutil.rmtree(database_dir)
+
+
+def bench_journal(args):
+    """Time queries over the sparse index vs decoding the journals"""
+
+    paths = logfiles(args.journal_dir)
+    if not paths:
+        print(f'No journal files in {args.journal_dir}')
+        return
+
+    # Decoding everything is what a query costs without the index
+    start = time.perf_counter()
+    entries = [jsoncodec.loads(line) for line in read_journals(args.journal_dir)]
+    decoded = time.perf_counter() - start
+    timestamps = [entry['timestamp'] for entry in entries]
+    print(f'decode all          {decoded * 1000:12.1f} ms')
+
+    index_dir = tempfile.mkdtemp()
+    journals = Journals(args.journal_dir, index_dir)
+    start = time.perf_counter()
+    for journal in journals.files():
+        with journal:
+            journal.load_index()
+    print(f'build the index     {(time.perf_counter() - start) * 1000:12.1f} ms')
+
+    middle = len(timestamps) // 2
+    start = time.perf_counter()
+    found = sum(1 for entry in journals.events_between(timestamps[middle], timestamps[middle + 100]))
+    print(f'events between      {(time.perf_counter() - start) * 1000:12.1f} ms ({found} events)')
+
+    start = time.perf_counter()
+    journals.last_before('Loadout', timestamps[-1])
+    print(f'last Loadout before {(time.perf_counter() - start) * 1000:12.1f} ms')
+
+    shutil.rmtree(index_dir)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='EDLogPrint benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    latency = subparsers.add_parser('latency', help='journal to printer latency')
+    latency.add_argument('--count', type=int, default=50,
+                         help='number of events to write')
+    latency.add_argument('--interval', type=float, default=0.05,
+                         help='pause between events, seconds')
+    latency.add_argument('--poll', action='store_true',
+                         help='disable file system notifications')
+    latency.add_argument('--asyncio', action='store_true',
+                         help='run the monitor in the asyncio runtime')
+    latency.set_defaults(func=bench_latency)
+
+    rotation = subparsers.add_parser('rotation', help='events around a journal rotation')
+    rotation.add_argument('--count', type=int, default=20,
+                          help='number of rotations')
+    rotation.add_argument('--lines', type=int, default=50,
+                          help='lines written to the old journal just before a rotation')
+    rotation.add_argument('--interval', type=float, default=0.05,
+                          help='pause between rotations, seconds')
+    rotation.add_argument('--poll', action='store_true',
+                          help='disable file system notifications')
+    rotation.set_defaults(func=bench_rotation)
+
+    companion = subparsers.add_parser('companion', help='Status.json rewritten in bursts')
+    companion.add_argument('--count', type=int, default=100,
+                           help='number of bursts')
+    companion.add_argument('--burst', type=int, default=5,
+                           help='writes of the same status in a burst')
+    companion.add_argument('--interval', type=float, default=0.2,
+                           help='pause between bursts, seconds')
+    companion.set_defaults(func=bench_companion)
+
+    decode = subparsers.add_parser('decode', help='JSON decoding of journals')
+    decode.add_argument('journal_dir', nargs='?', default=config['journal_dir'],
+                        help='folder with Journal*.log files')
+    decode.set_defaults(func=bench_decode)
+
+    prefilter = subparsers.add_parser('prefilter', help='journal replay with and without the event pre-filter')
+    prefilter.add_argument('journal_dir', nargs='?', default=config['journal_dir'],
+                           help='folder with Journal*.log files')
+    prefilter.add_argument('--session', type=int, default=0, metavar='LINES',
+                           help='a synthetic journal of a busy session with that many lines')
+    prefilter.add_argument('--repeat', type=int, default=5, help='best of that many runs')
+    prefilter.set_defaults(func=bench_prefilter)
+
+    memory = subparsers.add_parser('memory', help='memory of stored body scans')
+    memory.add_argument('--count', type=int, default=100000,
+                        help='number of bodies')
+    memory.set_defaults(func=bench_memory)
+
+    render = subparsers.add_parser('render', help='rendering throughput of event records')
+    render.add_argument('--count', type=int, default=20000,
+                        help='number of records per event')
+    render.set_defaults(func=bench_render)
+
+    console = subparsers.add_parser('console', help='console output of a burst of records')
+    console.add_argument('--count', type=int, default=2000,
+                        help='number of records')
+    console.set_defaults(func=bench_console)
+
+    sinks = subparsers.add_parser('sinks', help='bursts of events to all sinks')
+    sinks.add_argument('--count', type=int, default=20000,
+                       help='number of events')
+    sinks.add_argument('--burst', type=int, default=100,
+                       help='events in a burst')
+    sinks.add_argument('--interval', type=float, default=0.02,
+                       help='pause between bursts, seconds')
+    sinks.set_defaults(func=bench_sinks)
+
+    server = subparsers.add_parser('server', help='state server with WebSocket clients')
+    server.add_argument('--clients', type=int, default=50,
+                        help='number of WebSocket clients')
+    server.add_argument('--count', type=int, default=1000,
+                        help='number of events')
+    server.set_defaults(func=bench_server)
+
+    screenshots = subparsers.add_parser('screenshots', help='conversion of a burst of screenshots')
+    screenshots.add_argument('--count', type=int, default=8,
+                             help='number of screenshots')
+    screenshots.add_argument('--size', type=int, nargs=2, default=(1920, 1080),
+                             help='width and height')
+    screenshots.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                             help='workers of the pools')
+    screenshots.set_defaults(func=bench_screenshots)
+
+    png = subparsers.add_parser('png', help='4K and 8K conversion by compress level')
+    png.add_argument('--levels', type=int, nargs='+', default=[1, 3, 6],
+                     help='compress levels to compare (default: 1 3 6)')
+    png.add_argument('--repeat', type=int, default=1,
+                     help='conversions per mode, the fastest counts (default: 1)')
+    png.set_defaults(func=bench_png)
+
+    batch = subparsers.add_parser('batch', help='conversion of a backlog of screenshots')
+    batch.add_argument('--count', type=int, default=16,
+                       help='number of screenshots')
+    batch.add_argument('--size', type=int, nargs=2, default=(1920, 1080),
+                       help='width and height')
+    batch.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                       help='processes of the parallel batch')
+    batch.add_argument('--compress-level', type=int, default=6,
+                       help='zlib level of the .png (default: 6)')
+    batch.set_defaults(func=bench_batch)
+
+    replay = subparsers.add_parser('replay', help='sequential and parallel replay of all journals')
+    replay.add_argument('journal_dir', nargs='?', default=config['journal_dir'],
+                        help='directory with Journal*.log files')
+    replay.add_argument('--jobs', type=int, default=max(2, os.cpu_count() or 1),
+                        help='worker processes of the parallel replay')
+    replay.set_defaults(func=bench_replay)
+
+    resume = subparsers.add_parser('resume', help='start-up with and without a checkpoint')
+    resume.add_argument('--systems', type=int, default=200,
+                        help='number of systems in the journal')
+    resume.set_defaults(func=bench_resume)
+
+    bodydb = subparsers.add_parser('bodydb', help='body database inserts and queries')
+    bodydb.add_argument('--count', type=int, default=1000000,
+                        help='number of bodies')
+    bodydb.set_defaults(func=bench_bodydb)
+
+    journal = subparsers.add_parser('journal', help='time queries over the journal index')
+    journal.add_argument('journal_dir', nargs='?', default=config['journal_dir'],
+                         help='directory with Journal*.log files')
+    journal.set_defaults(func=bench_journal)
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    args.func(args)
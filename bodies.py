@@ -0,0 +1,242 @@
+import os
+import shelve
+import sys
+import threading
+from collections import OrderedDict
+from os.path import join
+
+from config import config
+
+
+def sizeof(obj, seen=None):
+    """Rough deep size of a body scan in bytes"""
+
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sizeof(k, seen) + sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += sizeof(vars(obj), seen)
+    elif hasattr(obj, '__slots__'):
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                size += sizeof(getattr(obj, name, None), seen)
+
+    return size
+
+
+class SystemBodies:
+    """Scanned bodies of one star system
+
+    Besides the bodies by id, the bodies are indexed by their direct parent:
+    by the parent planet or star id and by the barycentre (Null) id.
+    """
+
+    def __init__(self, measure=True):
+        self.bodies = {}
+        self.children = {}
+        self.barycentres = {}
+        self.measure = measure
+        self.size = 0
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def __iter__(self):
+        return iter(self.bodies.values())
+
+    def get(self, body_id, default=None):
+        return self.bodies.get(body_id, default)
+
+    def parent_index(self, body):
+        if not body.parents:
+            return None, None
+
+        parent_type, parent_id = next(iter(body.parents[0].items()))
+        if parent_type == 'Null':
+            return self.barycentres, parent_id
+
+        return self.children, parent_id
+
+    def add(self, body):
+        old_body = self.bodies.get(body.id)
+        if old_body is not None:
+            index, parent_id = self.parent_index(old_body)
+            if index is not None:
+                index[parent_id].remove(old_body)
+            if self.measure:
+                self.size -= sizeof(old_body)
+
+        self.bodies[body.id] = body
+        if self.measure:
+            self.size += sizeof(body)
+
+        index, parent_id = self.parent_index(body)
+        if index is not None:
+            index.setdefault(parent_id, []).append(body)
+
+    def get_children(self, parent_id):
+        return self.children.get(parent_id, [])
+
+    def get_barycentre_bodies(self, barycentre_id):
+        return self.barycentres.get(barycentre_id, [])
+
+
+class StarSystemBodies:
+    """Scanned bodies of all star systems, indexed by star system
+
+    Only the most recently visited systems are kept in memory, within
+    the bodies_max_systems and bodies_max_bytes budget. The least recently
+    used systems are moved to a store in data_dir and loaded back
+    transparently when they are needed again.
+
+    With a database every added body is also written to it.
+    """
+
+    def __init__(self, max_systems=None, max_bytes=None, store_path=None, database=None):
+        if max_systems is None:
+            max_systems = config.get('bodies_max_systems', 0)
+        if max_bytes is None:
+            max_bytes = config.get('bodies_max_bytes', 0)
+        if store_path is None:
+            store_path = join(config['data_dir'], 'bodies')
+
+        self.max_systems = max_systems
+        self.max_bytes = max_bytes
+        self.store_path = store_path
+        self.database = database
+        self.store = None
+        self.stored = set()
+        self.systems = OrderedDict()
+        self.size = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(system) for system in self.systems.values())
+
+    def __contains__(self, key):
+        star_system, body_id = key
+        return self.get(star_system, body_id) is not None
+
+    def __getitem__(self, key):
+        star_system, body_id = key
+        body = self.get(star_system, body_id)
+        if body is None:
+            raise KeyError(key)
+
+        return body
+
+    def snapshot(self, max_systems=0):
+        """Systems in memory, least recently used first
+
+        With max_systems only as many of the most recent systems are returned.
+        """
+        with self.lock:
+            systems = list(self.systems.items())
+
+        return systems[-max_systems:] if max_systems else systems
+
+    def restore(self, systems):
+        with self.lock:
+            for star_system, system in systems:
+                self.systems[star_system] = system
+                self.size += system.size
+            self.evict()
+
+    def add(self, star_system, body):
+        with self.lock:
+            system = self.load(star_system)
+            if system is None:
+                # Measuring the bodies is only worth it with a memory budget
+                system = self.systems[star_system] = SystemBodies(measure=bool(self.max_bytes))
+
+            self.size -= system.size
+            system.add(body)
+            self.size += system.size
+
+            self.evict()
+
+        if self.database is not None:
+            self.database.add(star_system, body)
+
+    def get(self, star_system, body_id, default=None):
+        with self.lock:
+            system = self.load(star_system)
+            if system is None:
+                return default
+
+            return system.get(body_id, default)
+
+    def system(self, star_system):
+        with self.lock:
+            return self.load(star_system) or SystemBodies()
+
+    def load(self, star_system):
+        system = self.systems.get(star_system)
+        if system is not None:
+            self.systems.move_to_end(star_system)
+            return system
+
+        key = self.store_key(star_system)
+        if key not in self.stored:
+            return None
+
+        system = self.store.pop(key)
+        self.stored.discard(key)
+        self.systems[star_system] = system
+        self.size += system.size
+        self.evict()
+
+        return system
+
+    def over_budget(self):
+        if self.max_systems and len(self.systems) > self.max_systems:
+            return True
+
+        if self.max_bytes and self.size > self.max_bytes:
+            return True
+
+        return False
+
+    def evict(self):
+        # The most recent system is the current one and always stays
+        while len(self.systems) > 1 and self.over_budget():
+            self.spill()
+
+    def spill(self):
+        star_system, system = self.systems.popitem(last=False)
+        self.size -= system.size
+
+        if self.store is None:
+            os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+            self.store = shelve.open(self.store_path, flag='n')
+
+        key = self.store_key(star_system)
+        self.store[key] = system
+        self.stored.add(key)
+
+    @staticmethod
+    def store_key(star_system):
+        return star_system or ''
+
+    def flush(self):
+        if self.database is not None:
+            self.database.flush()
+
+    def close(self):
+        with self.lock:
+            if self.store is not None:
+                self.store.close()
+                self.store = None
+                self.stored.clear()
+
+        if self.database is not None:
+            self.database.close()
@@ -0,0 +1,266 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from os.path import join
+
+from config import config
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS bodies (
+    star_system TEXT NOT NULL,
+    body_id INTEGER NOT NULL,
+    body_name TEXT,
+    body_type TEXT,
+    class TEXT,
+    landable INTEGER,
+    surface_gravity REAL,
+    radius REAL,
+    mass REAL,
+    surface_temperature REAL,
+    terraform_state TEXT,
+    atmosphere TEXT,
+    volcanism TEXT,
+    rings INTEGER,
+    was_discovered INTEGER,
+    was_mapped INTEGER,
+    PRIMARY KEY (star_system, body_id)
+);
+CREATE TABLE IF NOT EXISTS interests (
+    star_system TEXT NOT NULL,
+    body_id INTEGER NOT NULL,
+    interest TEXT NOT NULL,
+    PRIMARY KEY (star_system, body_id, interest)
+);
+CREATE INDEX IF NOT EXISTS bodies_class ON bodies (class);
+CREATE INDEX IF NOT EXISTS bodies_landable ON bodies (landable, surface_gravity);
+CREATE INDEX IF NOT EXISTS bodies_gravity ON bodies (surface_gravity);
+CREATE INDEX IF NOT EXISTS bodies_terraform_state ON bodies (terraform_state);
+CREATE INDEX IF NOT EXISTS interests_interest ON interests (interest);
+'''
+
+COLUMNS = (
+    'star_system', 'body_id', 'body_name', 'body_type', 'class', 'landable',
+    'surface_gravity', 'radius', 'mass', 'surface_temperature', 'terraform_state',
+    'atmosphere', 'volcanism', 'rings', 'was_discovered', 'was_mapped',
+)
+
+
+def body_row(star_system, body):
+    landable = getattr(body, 'landable', None)
+    rings = getattr(body, 'rings', None)
+
+    return (
+        star_system,
+        body.id,
+        body.body_name,
+        body.body_type,
+        getattr(body, 'planet_class', None) or getattr(body, 'star_type', None),
+        landable if isinstance(landable, bool) else None,
+        getattr(body, 'surface_gravity', None),
+        getattr(body, 'radius', None),
+        getattr(body, 'mass', None),
+        getattr(body, 'surface_temperature', None) or getattr(body, 'surface_temp', None),
+        getattr(body, 'terraform_state', None) or None,
+        getattr(body, 'atmosphere', None),
+        getattr(body, 'volcanism', None) or None,
+        len(rings) if rings else 0,
+        body.was_discovered,
+        body.was_mapped,
+    )
+
+
+class BodyDatabase:
+    """Scanned bodies and their interests in a SQLite database in data_dir
+
+    Bodies are collected and written together in one transaction, when
+    batch_size bodies are waiting or on flush(). A body scanned again
+    replaces the stored one.
+    """
+
+    def __init__(self, path=None, batch_size=None):
+        if path is None:
+            path = join(config['data_dir'], 'bodies.sqlite')
+        if batch_size is None:
+            batch_size = config.get('body_database_batch_size', 10000)
+
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = None
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Written by the journal worker, closed by the main thread
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            # Keeps the indexes in memory while millions of bodies are written
+            self.connection.execute('PRAGMA cache_size=-65536')
+            self.connection.executescript(SCHEMA)
+
+        return self.connection
+
+    def add(self, star_system, body):
+        with self.lock:
+            self.pending.append((star_system, body))
+            full = len(self.pending) >= self.batch_size
+
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+
+            bodies = [body_row(star_system, body) for star_system, body in self.pending]
+            keys = [(star_system, body.id) for star_system, body in self.pending]
+            interests = [
+                (star_system, body.id, interest)
+                for star_system, body in self.pending
+                for interest in set(body.interests or ())
+            ]
+            self.pending.clear()
+
+            connection = self.connect()
+            with connection:
+                connection.executemany(
+                    f'INSERT OR REPLACE INTO bodies VALUES ({", ".join("?" * len(COLUMNS))})',
+                    bodies)
+                connection.executemany(
+                    'DELETE FROM interests WHERE star_system = ? AND body_id = ?', keys)
+                connection.executemany(
+                    'INSERT OR IGNORE INTO interests VALUES (?, ?, ?)', interests)
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def query(self, star_system=None, body_class=None, landable=None, min_gravity=None,
+              max_gravity=None, rings=None, terraformable=None, interest=None, limit=50):
+        where = []
+        params = []
+
+        if star_system:
+            # GLOB, unlike LIKE, uses the index for a name prefix
+            where.append('bodies.star_system GLOB ?' if '*' in star_system
+                         else 'bodies.star_system = ?')
+            params.append(star_system)
+        if body_class:
+            where.append('class = ?')
+            params.append(body_class)
+        if landable is not None:
+            where.append('landable = ?')
+            params.append(int(landable))
+        if min_gravity is not None:
+            where.append('surface_gravity >= ?')
+            params.append(min_gravity)
+        if max_gravity is not None:
+            where.append('surface_gravity <= ?')
+            params.append(max_gravity)
+        if rings is not None:
+            where.append('rings > 0' if rings else 'rings = 0')
+        if terraformable:
+            where.append('terraform_state IS NOT NULL')
+
+        sql = 'SELECT bodies.* FROM bodies'
+        if interest:
+            sql = ('SELECT bodies.* FROM interests JOIN bodies '
+                   'USING (star_system, body_id)')
+            where.append('interests.interest = ?')
+            params.append(interest)
+
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        with self.lock:
+            return self.connect().execute(sql, params).fetchall()
+
+    def interests(self):
+        with self.lock:
+            return self.connect().execute(
+                'SELECT interest, COUNT(*) FROM interests GROUP BY interest ORDER BY 2 DESC'
+            ).fetchall()
+
+    def count(self):
+        with self.lock:
+            return self.connect().execute('SELECT COUNT(*) FROM bodies').fetchone()[0]
+
+
+def print_bodies(rows):
+    for row in rows:
+        body = dict(zip(COLUMNS, row))
+        gravity = body['surface_gravity']
+        print(
+            f'{body["body_name"]:40} {body["class"] or "":30} '
+            f'{"landable" if body["landable"] else "":8} '
+            f'{f"{gravity:.2f}G" if gravity is not None else "":>8} '
+            f'{body["rings"] or "":>2} {body["terraform_state"] or ""}'
+        )
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Query the database of scanned bodies')
+    parser.add_argument('--database', default=None,
+                        help='database file (default: bodies.sqlite in data_dir)')
+    parser.add_argument('--system',
+                        help='star system name, * matches anything (case sensitive)')
+    parser.add_argument('--class', dest='body_class',
+                        help='planet class or star type, e.g. "High metal content body"')
+    parser.add_argument('--landable', action='store_const', const=True,
+                        help='landable bodies only')
+    parser.add_argument('--min-gravity', type=float,
+                        help='lowest surface gravity in G')
+    parser.add_argument('--max-gravity', type=float,
+                        help='highest surface gravity in G')
+    parser.add_argument('--rings', action='store_const', const=True,
+                        help='ringed bodies only')
+    parser.add_argument('--terraformable', action='store_true',
+                        help='bodies with a terraform state only')
+    parser.add_argument('--interest',
+                        help='bodies with this interest, e.g. "Small body"')
+    parser.add_argument('--limit', type=int, default=50,
+                        help='maximum number of bodies, 0 for all')
+    parser.add_argument('--interests', action='store_true',
+                        help='list the interests and their number of bodies')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    database = BodyDatabase(args.database)
+
+    if args.interests:
+        for interest, count in database.interests():
+            print(f'{count:10,d}  {interest}')
+    else:
+        start = time.perf_counter()
+        rows = database.query(
+            star_system=args.system,
+            body_class=args.body_class,
+            landable=args.landable,
+            min_gravity=args.min_gravity,
+            max_gravity=args.max_gravity,
+            rings=args.rings,
+            terraformable=args.terraformable,
+            interest=args.interest,
+            limit=args.limit,
+        )
+        elapsed = time.perf_counter() - start
+
+        print_bodies(rows)
+        print(f'{len(rows):,d} of {database.count():,d} bodies in {elapsed * 1000:.1f} ms')
+
+    database.close()
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from os.path import join
+
+import jsoncodec
+
+
+class CompanionFiles:
+    """The JSON files the game rewrites next to the journal
+
+    A notification only marks a file as modified. The file is read once
+    debounce seconds have passed without another write, and only when its
+    mtime or size differs from the last read. Its content is compared with
+    the last snapshot, and an entry with just the changed fields is made:
+
+        {'timestamp': ..., 'event': 'Status', 'Fuel': {...}, 'Flags': ...}
+
+    A field the game left out since the last snapshot is None.
+    """
+
+    # file name -> event name of the entries, events.py keeps the state of
+    # each. Market.json, Shipyard.json and the like are not watched, the
+    # app has no state for them.
+    FILES = {
+        'Status.json': 'Status',
+        'NavRoute.json': 'NavRoute',
+        'Cargo.json': 'Cargo',
+    }
+
+    # Fields that change on every write
+    IGNORED_FIELDS = frozenset(('timestamp', 'event'))
+
+    def __init__(self, journal_dir, debounce=0.1):
+        self.journal_dir = journal_dir
+        self.debounce = debounce
+        self.lock = threading.Lock()
+        # file name -> (mtime, size) and content of the last read
+        self.stats = {}
+        self.snapshots = {}
+        # file name -> time of the last notification, all files are read
+        # once at the start
+        self.modified = dict.fromkeys(self.FILES, 0)
+
+        self.reads = 0
+        self.entries = 0
+
+    def notify(self, name):
+        if name in self.FILES:
+            with self.lock:
+                self.modified[name] = time.monotonic()
+
+    def timeout(self):
+        """Seconds until a modified file is due to be read, None when none is"""
+
+        with self.lock:
+            if not self.modified:
+                return None
+            last = min(self.modified.values())
+
+        return max(0, last + self.debounce - time.monotonic())
+
+    def changes(self, poll=False):
+        """Entries of the changed fields of the files due to be read
+
+        With poll every file is checked, as there are no notifications.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if poll:
+                due = list(self.FILES)
+                self.modified.clear()
+            else:
+                due = [name for name, modified in self.modified.items()
+                       if now - modified >= self.debounce]
+                for name in due:
+                    del self.modified[name]
+
+        for name in due:
+            entry = self.read(name)
+            if entry is not None:
+                self.entries += 1
+                yield entry
+
+    def read(self, name):
+        path = join(self.journal_dir, name)
+        try:
+            stat = os.stat(path)
+            if (stat.st_mtime_ns, stat.st_size) == self.stats.get(name):
+                return None
+
+            with open(path, 'rb') as companion_file:
+                data = companion_file.read()
+        except OSError:
+            return None
+
+        self.reads += 1
+        if not data.strip():
+            # Truncated by the game, the content follows
+            return None
+
+        try:
+            content = jsoncodec.loads(data)
+        except ValueError:
+            # Caught in the middle of a write, the next notification
+            # reads it again
+            return None
+
+        self.stats[name] = stat.st_mtime_ns, stat.st_size
+        return self.diff(name, content)
+
+    def diff(self, name, content):
+        previous = self.snapshots.get(name, {})
+        self.snapshots[name] = content
+
+        changed = {
+            key: value for key, value in content.items()
+            if key not in self.IGNORED_FIELDS and previous.get(key) != value
+        }
+        for key in previous:
+            if key not in content and key not in self.IGNORED_FIELDS:
+                changed[key] = None
+
+        if not changed:
+            return None
+
+        entry = {
+            'timestamp': content.get('timestamp', ''),
+            'event': self.FILES[name],
+        }
+        entry.update(changed)
+        return entry
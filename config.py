@@ -1,11 +1,106 @@
+from os import environ
 from sys import platform
-from os.path import join, isdir
+from os.path import join, isdir, dirname, abspath
 
 
 config = {
     'journal_dir': 'default',
     'screenshots_dir': 'default',
+    # Where the app keeps its own files (%LOCALAPPDATA%\EDLogPrint)
+    'data_dir': 'default',
     'convert_screenshots': True,
+    # Screenshots are converted to .png by screenshot_workers threads or
+    # processes (screenshot_pool: thread, process), 0 for one per CPU
+    'screenshot_workers': 2,
+    'screenshot_pool': 'thread',
+    # zlib level of the .png, 1 is the fastest and 9 the smallest; optimize
+    # makes it smaller still, slowly. The .png is written to a temporary file
+    # and renamed once it decodes, unless png_atomic_write is off.
+    'png_compress_level': 6,
+    'png_optimize': False,
+    'png_atomic_write': True,
+
+    # Wake up on file system notifications from watchdog. Disable it when the
+    # journal lives on a drive without notifications (e.g. a network share).
+    # The journal is polled every journal_poll_interval seconds either way,
+    # watchdog may miss writes to a file the game keeps open.
+    'journal_notifications': True,
+    'journal_poll_interval': 1.0,
+
+    # threads - the journal is read by a worker thread, the printer waits
+    #           for its entries in the main thread
+    # asyncio - both are tasks of one event loop, see runtime.py
+    'runtime': 'threads',
+
+    # Events waiting for the printer. When the queue is full the policy is:
+    #   block - the journal reader waits for the printer
+    #   drop - low priority events (music, NPC messages, ...) are dropped
+    #   coalesce - only the latest of repeating events (fuel scoop, ...) is kept
+    'event_queue_size': 10000,
+    'event_queue_policy': 'block',
+
+    # Records are written to the console in bursts, at the latest after
+    # console_flush_interval seconds or console_buffer_size characters
+    'console_flush_interval': 0.1,
+    'console_buffer_size': 65536,
+    # Write past colorama, which handles the colors one segment at a time,
+    # when the console understands ANSI codes (Windows 10 and later) or the
+    # output is redirected and the colors are stripped
+    'console_direct': True,
+
+    # Status.json, NavRoute.json and Cargo.json, which the game rewrites next
+    # to the journal. A file is read companion_debounce seconds after a burst of
+    # writes, and only the fields that changed go through the monitor.
+    'companion_files': True,
+    'companion_debounce': 0.1,
+
+    # Outputs of the printed events, each with a queue of sink_queue_size
+    # events and a thread of its own. A sink that falls behind drops events
+    # instead of holding up the others, except the console, which the
+    # printer waits for.
+    #   console - the console window
+    #   text - the records without colors in events.log in data_dir
+    #   jsonl - the journal entries as JSON lines in events.jsonl in data_dir
+    #   socket - JSON lines to the clients of localhost:sink_socket_port
+    #   server - HTTP and WebSocket server of the state and the events on
+    #            server_host:server_port, see server.py
+    # The logs are rotated at sink_log_max_bytes, keeping sink_log_backups.
+    'sinks': ['console'],
+    'sink_queue_size': 10000,
+    'sink_log_max_bytes': 10 * 2 ** 20,
+    'sink_log_backups': 5,
+    'sink_socket_port': 20501,
+    'server_host': '127.0.0.1',
+    'server_port': 20502,
+    # Messages waiting for a WebSocket client before it is disconnected
+    'server_client_queue_size': 1000,
+    # Seconds between checks for changes of the state without a printed event
+    'server_state_interval': 0.25,
+
+    # JSON library for the journal: auto (orjson, ujson if installed), json
+    'json_codec': 'auto',
+
+    # Print the JSON library, whether file system notifications work and the
+    # event queue stats to stderr at the start and the exit (--diagnostics)
+    'diagnostics': False,
+
+    # Seconds between checkpoints of the journal position and the state in
+    # data_dir. On a restart the app continues from the checkpoint instead of
+    # reading the journal again. 0 disables checkpoints.
+    'checkpoint_interval': 30,
+    # Bodies of only the most recently visited systems are checkpointed
+    'checkpoint_systems': 20,
+
+    # Scanned bodies kept in memory. The least recently visited systems over
+    # the budget are moved to a store in data_dir and loaded back on a revisit.
+    # 0 means no limit.
+    'bodies_max_systems': 1000,
+    'bodies_max_bytes': 0,
+
+    # Every scanned body is also saved to bodies.sqlite in data_dir, see
+    # bodydb.py for queries. The bodies are written in batches.
+    'body_database': True,
+    'body_database_batch_size': 10000,
 
     # (Fore, Style)
     # Fore: BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE
@@ -48,3 +143,10 @@ if not isdir(config['journal_dir']):
 
 if not isdir(config['screenshots_dir']):
     config['screenshots_dir'] = default_dir('My Pictures')
+
+if config['data_dir'] == 'default':
+    local_app_data = environ.get('LOCALAPPDATA')
+    if local_app_data:
+        config['data_dir'] = join(local_app_data, 'EDLogPrint')
+    else:
+        config['data_dir'] = join(dirname(abspath(__file__)), 'data')
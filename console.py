@@ -0,0 +1,128 @@
+import os
+import re
+import sys
+import time
+
+from colorama.ansitowin32 import StreamWrapper
+
+from config import config
+
+
+# Colors of the rendered records
+ANSI_CODE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+# SetConsoleMode flag of Windows 10 and later
+ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+
+
+def enable_vt_processing():
+    """Let the Windows console interpret the ANSI codes itself
+
+    False on a console before Windows 10, which needs colorama.
+    """
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = wintypes.DWORD()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        return bool(kernel32.SetConsoleMode(
+            handle, mode.value | ENABLE_VIRTUAL_TERMINAL_PROCESSING))
+    except (AttributeError, ImportError, OSError):
+        return False
+
+
+def direct_stream():
+    """The stream under colorama and whether to strip the colors
+
+    colorama converts or strips the ANSI codes one segment between two codes
+    at a time, which makes it the slowest part of the output. The records
+    are written to the stream under it instead: as they are when the console
+    understands ANSI codes, stripped of them at once when the output is not
+    a console. None when colorama is needed after all, on a console before
+    Windows 10, or when sys.stdout is not colorama's.
+    """
+    if not isinstance(sys.stdout, StreamWrapper):
+        return None
+
+    stream = sys.__stdout__
+    if stream is None or stream.closed:
+        return None
+
+    if not stream.isatty():
+        return stream, True
+    if os.name == 'nt' and not enable_vt_processing():
+        return None
+
+    return stream, False
+
+
+class ConsoleWriter:
+    """Buffered output of rendered records
+
+    Records are collected and written to the console together, once
+    flush_interval seconds have passed since the first buffered record or
+    buffer_size characters are waiting. The printer flushes as soon as
+    there are no more events queued, so a single event is shown right away.
+
+    Without a stream the records go to the console past colorama where it
+    can, see direct_stream(). With strip the colors are removed first.
+    """
+
+    def __init__(self, stream=None, flush_interval=None, buffer_size=None, strip=False):
+        if flush_interval is None:
+            flush_interval = config.get('console_flush_interval', 0.1)
+        if buffer_size is None:
+            buffer_size = config.get('console_buffer_size', 65536)
+
+        self.stream = stream
+        self.strip = strip
+        # Looked up with the first flush, after colorama.init()
+        self.direct = stream is not None or not config.get('console_direct', True)
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.size = 0
+        self.since = None
+
+        self.writes = 0
+        self.records = 0
+
+    def write(self, record):
+        if not self.buffer:
+            self.since = time.monotonic()
+
+        self.buffer.append(record)
+        self.buffer.append('\n')
+        self.size += len(record) + 1
+        self.records += 1
+
+        if (self.size >= self.buffer_size
+                or time.monotonic() - self.since >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+
+        if not self.direct:
+            self.direct = True
+            self.stream, self.strip = direct_stream() or (None, False)
+
+        # colorama replaces sys.stdout, so it is looked up on every write
+        stream = self.stream or sys.stdout
+        try:
+            text = ''.join(self.buffer)
+            if self.strip:
+                text = ANSI_CODE.sub('', text)
+            stream.write(text)
+            stream.flush()
+        finally:
+            # A failed write is not repeated with the next records
+            self.buffer.clear()
+            self.size = 0
+            self.since = None
+            self.writes += 1
@@ -1,64 +1,378 @@
 import argparse
+import json
 import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from os.path import getsize, isfile, join
 
-import filetype
 from PIL import Image
 
 
-def verify_image_file(filename):
+def verify_image_file(filename, size=None):
+    """Decode the image once, False when it is broken or not of size"""
+
     try:
-        im = Image.open(filename)
-        im.verify()
-        im.close()
-        im = Image.open(filename)
-        im.transpose(Image.FLIP_LEFT_RIGHT)
-        im.close()
+        with Image.open(filename) as im:
+            im.load()
+            return size is None or im.size == size
     except Exception:
         return False
 
-    return True
 
+def convert(filename, compress_level=6, optimize=False, atomic=True):
+    """Convert an image to a .png next to it and remove the image
 
-def convert_to_png(filename):
-    folder = os.path.dirname(filename)
+    compress_level is the zlib level of the .png, 1 is the fastest and 9
+    the smallest; optimize makes it smaller still at a further cost. With
+    atomic the .png is written to a temporary file first and renamed once
+    it has been verified, so there is never a partial .png.
 
-    out_filename = filename.split('.')[0] + '.png'
-    out_filename = os.path.join(folder, out_filename)
+    Returns the name of the .png, raises OSError when the image can not be
+    converted. Run by the screenshot converter of the app as well.
+    """
+    out_filename = os.path.splitext(filename)[0] + '.png'
+    write_filename = out_filename + '.tmp' if atomic else out_filename
 
     try:
         with Image.open(filename) as im:
-            im.save(out_filename)
+            size = im.size
+            im.save(write_filename, format='PNG',
+                    compress_level=compress_level, optimize=optimize)
+
+        if not verify_image_file(write_filename, size):
+            raise OSError(f'{out_filename} is not a valid image')
+
+        if atomic:
+            os.replace(write_filename, out_filename)
+    except BaseException:
+        # Also a conversion stopped by Ctrl+C leaves no partial .png
+        if os.path.exists(write_filename):
+            os.remove(write_filename)
+        raise
+
+    os.remove(filename)
+
+    return out_filename
+
+
+def convert_to_png(filename, **options):
+    try:
+        return convert(filename, **options)
     except OSError:
         print('Unable to convert the image file')
         return False
 
-    if verify_image_file(out_filename):
-        os.remove(filename)
-    else:
-        os.remove(out_filename)
-        return False
 
-    return out_filename
+# Ctrl+C presses a worker of the batch got
+worker_interrupts = 0
+
+
+def start_worker():
+    # The first Ctrl+C stops the batch, the conversions already running
+    # finish; the second one stops them too
+    signal.signal(signal.SIGINT, interrupt_worker)
+
+
+def interrupt_worker(signum, frame):
+    global worker_interrupts
+    worker_interrupts += 1
+    if worker_interrupts > 1:
+        raise KeyboardInterrupt
+
+
+def convert_screenshot(filename, **options):
+    """convert() in a worker of the batch"""
+
+    if worker_interrupts > 1:
+        # Queued to the worker before the batch was stopped
+        raise KeyboardInterrupt
+    return convert(filename, **options)
+
+
+class BatchConversion:
+    """Convert every screenshot left in a folder, e.g. by sessions without the app
+
+    The screenshots are converted by a pool of jobs processes, a few ahead
+    of the main process. A screenshot whose .png exists is skipped.
+
+    A manifest in data_dir keeps the count of the converted screenshots and
+    the ones that failed, so a run that was interrupted resumes with the
+    totals of the batch and without trying the failed ones again. It is
+    removed once a batch has converted everything.
+    """
+
+    EXTENSIONS = ('.bmp',)
+
+    # Seconds between two progress updates and saves of the manifest
+    PROGRESS_INTERVAL = 0.5
+
+    def __init__(self, screenshots_dir=None, jobs=0, retry_failed=False,
+                 progress=sys.stderr, **options):
+        # Only the batch needs the config
+        from config import config
+
+        self.screenshots_dir = os.path.abspath(screenshots_dir or config['screenshots_dir'])
+        self.jobs = jobs or os.cpu_count() or 1
+        self.retry_failed = retry_failed
+        self.progress = progress
+        self.options = {
+            'compress_level': config.get('png_compress_level', 6),
+            'optimize': config.get('png_optimize', False),
+            'atomic': config.get('png_atomic_write', True),
+        }
+        self.options.update(
+            (key, value) for key, value in options.items() if value is not None)
+        self.manifest_path = join(config['data_dir'], 'png_batch.json')
+
+        self.converted = 0
+        self.converted_bytes = 0
+        self.seconds = 0.0
+        self.failed = {}
+        self.skipped = 0
+        self.resumed = False
+        self.interrupted = False
+
+        self.total = 0
+        self.done = 0
+        self.start_time = None
+        self.last_progress = 0
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return
+
+        if manifest.get('screenshots_dir') != self.screenshots_dir:
+            return
+
+        self.resumed = True
+        self.converted = manifest.get('converted', 0)
+        self.converted_bytes = manifest.get('converted_bytes', 0)
+        self.seconds = manifest.get('seconds', 0.0)
+        if not self.retry_failed:
+            self.failed = manifest.get('failed', {})
+
+    def save_manifest(self):
+        manifest = {
+            'screenshots_dir': self.screenshots_dir,
+            'converted': self.converted,
+            'converted_bytes': self.converted_bytes,
+            'seconds': self.seconds + time.monotonic() - self.start_time,
+            'failed': self.failed,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+            temp_path = self.manifest_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+                json.dump(manifest, manifest_file)
+            os.replace(temp_path, self.manifest_path)
+        except OSError:
+            pass
+
+    def screenshots(self):
+        """The screenshots left to convert, oldest first"""
+
+        try:
+            names = os.listdir(self.screenshots_dir)
+        except OSError:
+            return []
+
+        screenshots = []
+        for name in names:
+            root, ext = os.path.splitext(name)
+            if ext.lower() not in self.EXTENSIONS or name in self.failed:
+                continue
+
+            path = join(self.screenshots_dir, name)
+            if isfile(join(self.screenshots_dir, root + '.png')):
+                self.skipped += 1
+                continue
+
+            try:
+                screenshots.append((os.path.getmtime(path), path))
+            except OSError:
+                # Renamed or converted by the app meanwhile
+                continue
+
+        return [path for _, path in sorted(screenshots)]
+
+    def run(self):
+        self.load_manifest()
+        paths = self.screenshots()
+        self.total = len(paths)
+        self.start_time = time.monotonic()
+
+        if self.resumed and self.progress:
+            self.progress.write(
+                f'Resuming: {self.converted:,d} converted, '
+                f'{len(self.failed):,d} failed before\n')
+
+        # The first Ctrl+C lets the conversions already started finish,
+        # the second one stops right away
+        handler = signal.signal(signal.SIGINT, self.interrupt)
+        try:
+            self.convert_all(paths)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGINT, handler)
+
+        if self.interrupted:
+            self.save_manifest()
+            if self.progress:
+                self.progress.write('\nInterrupted, run it again to resume\n')
+            return False
+
+        if self.failed:
+            self.save_manifest()
+        elif os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+
+        self.report()
+        return not self.failed
+
+    def interrupt(self, signum, frame):
+        self.interrupted = True
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    def convert_all(self, paths):
+        queued = iter(paths)
+        pending = {}
+        executor = ProcessPoolExecutor(self.jobs, initializer=start_worker)
+        try:
+            while True:
+                # Converted screenshots wait only a few ahead
+                while not self.interrupted and len(pending) < self.jobs * 2:
+                    path = next(queued, None)
+                    if path is None:
+                        break
+                    try:
+                        size = getsize(path)
+                    except OSError:
+                        # Renamed or converted by the app meanwhile
+                        self.done += 1
+                        continue
+                    pending[executor.submit(convert_screenshot, path, **self.options)] = path, size
+
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path, size = pending.pop(future)
+                    self.finish(path, size, future)
+
+                if time.monotonic() - self.last_progress >= self.PROGRESS_INTERVAL:
+                    self.show_progress()
+                    self.save_manifest()
+        except KeyboardInterrupt:
+            # The second Ctrl+C, it also stops the conversions running in
+            # the workers. Those not started yet are cancelled.
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+            for future, (path, size) in pending.items():
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    self.finish(path, size, future)
+            raise
+
+        executor.shutdown()
+        self.show_progress()
+
+    def finish(self, path, size, future):
+        self.done += 1
+        try:
+            future.result()
+        except Exception as error:
+            if isinstance(error, FileNotFoundError) and not os.path.exists(path):
+                # Renamed or converted by the app meanwhile
+                return
+            self.failed[os.path.basename(path)] = str(error) or type(error).__name__
+            return
+
+        self.converted += 1
+        self.converted_bytes += size
+
+    def show_progress(self):
+        self.last_progress = time.monotonic()
+        if not self.progress:
+            return
+
+        elapsed = self.seconds + self.last_progress - self.start_time
+        mb = self.converted_bytes / 1e6
+        line = (
+            f'[{self.done}/{self.total}] {mb:,.1f} MB '
+            f'{mb / elapsed if elapsed else 0:,.1f} MB/s'
+        )
+        self.progress.write(f'\r{line:<79}')
+        self.progress.flush()
+
+    def report(self):
+        if not self.progress:
+            return
+
+        elapsed = self.seconds + time.monotonic() - self.start_time
+        mb = self.converted_bytes / 1e6
+        self.progress.write(
+            f'\n{self.converted:,d} converted ({mb:,.1f} MB, '
+            f'{mb / elapsed if elapsed else 0:,.1f} MB/s with {self.jobs} jobs), '
+            f'{self.skipped:,d} skipped, {len(self.failed):,d} failed '
+            f'in {elapsed:.1f} s\n'
+        )
+        for name, error in self.failed.items():
+            self.progress.write(f'{name}: {error}\n')
 
 
 def is_valid_image_file(parser, filename):
     """Simple check the filename is an image file"""
 
+    # Only the command line needs it
+    import filetype
+
     if not os.path.isfile(filename):
         parser.error(f'The file {filename} does not exist!')
-    if not filetype.image(filename):
+    if not filetype.is_image(filename):
         parser.error(f'The file {filename} not an image file!')
     return filename
 
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Convert image to .png')
-    parser.add_argument('filename',
+    parser.add_argument('filename', nargs='?',
                         help='input image file name',
                         type=lambda x: is_valid_image_file(parser, x))
-    return parser.parse_args()
+    parser.add_argument('--batch', nargs='?', const='', metavar='DIR',
+                        help='convert every screenshot in DIR without a .png, '
+                             'screenshots_dir of the config by default')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='processes converting the screenshots of the batch')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='try the screenshots that failed in the batch again')
+    parser.add_argument('--compress-level', type=int, choices=range(10),
+                        help='zlib level, 1 is the fastest and 9 the smallest (default: 6)')
+    parser.add_argument('--optimize', action='store_true', default=None,
+                        help='make the .png as small as possible, slowly')
+    parser.add_argument('--no-atomic', dest='atomic', action='store_false', default=None,
+                        help='write the .png in place instead of renaming a temporary file')
+
+    args = parser.parse_args()
+    if args.filename is None and args.batch is None:
+        parser.error('a filename or --batch is required')
+    return args
 
 
 if __name__ == '__main__':
     args = parse_arguments()
-    convert_to_png(args.filename)
+    options = {
+        key: getattr(args, key) for key in ('compress_level', 'optimize', 'atomic')
+        if getattr(args, key) is not None
+    }
+    if args.batch is not None:
+        batch = BatchConversion(args.batch, jobs=args.jobs,
+                                retry_failed=args.retry_failed, **options)
+        sys.exit(0 if batch.run() else 1)
+    convert_to_png(args.filename, **options)
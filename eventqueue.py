@@ -0,0 +1,111 @@
+import threading
+from collections import deque
+
+
+class EventQueue:
+    """Bounded FIFO between the journal tailer and the printer
+
+    When the queue is full the policy decides what happens to a new entry:
+        block    - wait until the consumer takes an entry
+        drop     - low priority events are dropped, the rest block
+        coalesce - an event from the coalesce set replaces the pending event
+                   with the same name, the rest block
+        discard  - every new entry is dropped, put() never waits
+    """
+
+    POLICIES = ('block', 'drop', 'coalesce', 'discard')
+
+    def __init__(self, maxsize=10000, policy='block',
+                 low_priority=(), coalesce=()):
+        if policy not in self.POLICIES:
+            raise ValueError(f'Unknown event queue policy: {policy}')
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.low_priority = frozenset(low_priority)
+        self.coalesce = frozenset(coalesce)
+        self.queue = deque()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.closed = False
+
+        self.max_depth = 0
+        self.total = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def full(self):
+        return 0 < self.maxsize <= len(self.queue)
+
+    def put(self, entry, event=None):
+        """Queue the entry, False when it was dropped or the queue is closed"""
+
+        with self.not_full:
+            if self.closed:
+                return False
+
+            if self.full():
+                if (self.policy == 'discard' or
+                        self.policy == 'drop' and event in self.low_priority):
+                    self.dropped += 1
+                    return False
+
+                if self.policy == 'coalesce' and event in self.pending:
+                    self.pending[event][0] = entry
+                    self.coalesced += 1
+                    return True
+
+                while self.full() and not self.closed:
+                    self.not_full.wait()
+
+                if self.closed:
+                    return False
+
+            # Slots are mutable so a coalesced event can be replaced in place
+            slot = [entry, event]
+            self.queue.append(slot)
+            if event in self.coalesce:
+                self.pending[event] = slot
+
+            self.total += 1
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.not_empty.notify()
+
+        return True
+
+    def get(self, timeout=None):
+        with self.not_empty:
+            if not self.queue and timeout:
+                self.not_empty.wait(timeout)
+
+            if not self.queue:
+                return None
+
+            slot = self.queue.popleft()
+            entry, event = slot
+            if self.pending.get(event) is slot:
+                del self.pending[event]
+
+            self.not_full.notify()
+
+        return entry
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.not_full.notify_all()
+            self.not_empty.notify_all()
+
+    def stats(self):
+        return {
+            'depth': len(self.queue),
+            'max_depth': self.max_depth,
+            'total': self.total,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+        }
@@ -1,13 +1,16 @@
 import datetime
 import math
 from math import pi
+from sys import intern
 
 import colorama
 
+import palette
 import screenshot
 from config import config
 from interests import Interest
 from monitor import monitor
+from template import Template
 
 
 SHIP_MAP = {
@@ -59,21 +62,12 @@ SHIP_MAP = {
 
 
 class ColorMixin:
-    def __init__(self):
-        colors = config['colors']
-        self.k_s = getattr(colorama.Style, colors['key'][1])
-        self.k_c = getattr(colorama.Fore, colors['key'][0])
-        self.v_s = getattr(colorama.Style, colors['value'][1])
-        self.v_c = getattr(colorama.Fore, colors['value'][0])
-        # interest color
-        self.i_s = getattr(colorama.Style, colors['interest'][1])
-        self.i_c = getattr(colorama.Fore, colors['interest'][0])
-        # cmdr_message:
-        self.cm_s = getattr(colorama.Style, colors['cmdr_message'][1])
-        self.cm_c = getattr(colorama.Fore, colors['cmdr_message'][0])
-        # npc_message:
-        self.nm_s = getattr(colorama.Style, colors['npc_message'][1])
-        self.nm_c = getattr(colorama.Fore, colors['npc_message'][0])
+    """Colors of the shared palette as attributes: self.k_c, self.v_s, ..."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        return getattr(palette.current(), name)
 
 
 class Fuel(ColorMixin):
@@ -82,8 +76,9 @@ class Fuel(ColorMixin):
     warning_color = colorama.Fore.YELLOW
     critical_color = colorama.Fore.RED
 
+    template = Template('<k>Fuel: <v_s>{color}{level_percent:.2f}% ')
+
     def __init__(self, level=0.0, capacity=0.0):
-        super().__init__()
         self.level = level
         self.capacity = capacity
 
@@ -98,22 +93,117 @@ class Fuel(ColorMixin):
 
     @property
     def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+        palette.reload()
+        out = []
+        self.emit(out)
+        return ''.join(out)
 
+    def emit(self, out):
         level_percent = self.level_percent
 
+        color = palette.current().v_c
         if level_percent < self.critical_threshold:
-            v_c = self.critical_color
+            color = self.critical_color
         elif level_percent < self.warning_threshold:
-            v_c = self.warning_color
+            color = self.warning_color
+
+        out.append(self.template.format(color=color, level_percent=level_percent))
+
+
+# journal event name -> class handling it, filled in as the classes are defined
+registry = {}
+
+
+def update_keys(state, entry):
+    for k, v in entry.items():
+        if k in state:
+            state[k] = v
+
+
+class Event(ColorMixin):
+    """Base of the journal events
 
-        return f'{k_s}{k_c}Fuel: {v_s}{v_c}{level_percent:.2f}% '
+    A subclass handles the journal events listed in journal_events. Its
+    update_state() keeps monitor.state and may enrich the entry before it
+    is queued, and render() makes the record printed by LogPrinter.
+    """
 
+    journal_events = ()
+    printable = True
+    updates_state = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.updates_state = cls.update_state.__func__ is not Event.update_state.__func__
+        for event in cls.__dict__.get('journal_events', ()):
+            registry[event] = cls
+
+    def __init__(self, entry):
+        pass
+
+    @classmethod
+    def update_state(cls, state, entry):
+        pass
+
+    @property
+    def schema(self):
+        palette.reload()
+        out = []
+        self.emit(out)
+        return ''.join(out)
+
+    def emit(self, out):
+        pass
+
+    def prepare(self):
+        pass
+
+    def header(self, timestamp, title):
+        colors = palette.current()
+        return (
+            f'{colors.ek_c}{colors.ek_s}{timestamp}: '
+            f'{colors.ev_s}{colors.ev_c}{title}{colors.d_c}'
+        )
+
+    def render(self, timestamp, event):
+        return f'{self.header(timestamp, event)}\n{self.schema}'
+
+
+def printable_events():
+    return tuple(event for event, cls in registry.items() if cls.printable)
+
+
+def state_events():
+    return tuple(event for event, cls in registry.items() if cls.updates_state)
+
+
+class Notice(Event):
+    """Events printed only with their time and name"""
+
+    journal_events = (
+        'Shutdown',
+        'LaunchSRV',
+        'DockSRV',
+        'SRVDestroyed',
+        'DockFighter',
+        'LaunchFighter',
+        'VehicleSwitch',
+    )
+
+
+class LoadGame(Event):
+    journal_events = ('LoadGame',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        update_keys(state, entry)
+
+    template = Template(
+        '\t<k>CMDR: <v>{record.cmdr}\n'
+        '\t<k>Ship: <v>{record.ship} "{record.ship_name}" {record.ship_ident} '
+    )
 
-class LoadGame(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.cmdr = entry.get('Commander', 'ERROR')
         self.ship = entry.get('Ship_Localised') or entry.get('Ship', 'ERROR')
         self.ship_name = entry.get('ShipName', 'ERROR')
@@ -121,20 +211,28 @@ class LoadGame(ColorMixin):
         self.fuel_level = entry.get('FuelLevel', 0)
         self.fuel_capacity = entry.get('FuelCapacity', 0)
 
-    @property
-    def schema(self):
-        schema = (
-            f'\t{self.k_s}{self.k_c}CMDR: {self.v_s}{self.v_c}{self.cmdr}\n'
-            f'\t{self.k_s}{self.k_c}Ship: {self.v_s}{self.v_c}{self.ship} "{self.ship_name}" {self.ship_ident} '
-        )
-        schema += f'{Fuel(self.fuel_level, self.fuel_capacity).schema}'
+    def emit(self, out):
+        out.append(self.template.format(record=self))
+        Fuel(self.fuel_level, self.fuel_capacity).emit(out)
 
-        return schema
 
+class Location(Event):
+    journal_events = ('Location',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        update_keys(state, entry)
+
+    template = Template(
+        '\t<k>System: <v>{record.star_system} '
+        '<k>Sec.: <v>{record.system_sec} '
+        '<k>Population: <v>{record.population:,d}\n'
+        '\t<k>{record.body_type}: <v>{record.body_name}'
+    )
+    docked_template = Template('\n\t<k>Docked at {record.station_type}: <v>{record.station_name}')
+    landed_template = Template('\n\t<k>Landed in coordinates: <v>{record.latitude}, {record.longitude}')
 
-class Location(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.star_system = entry.get('StarSystem', 'ERROR')
         self.system_sec = entry.get('SystemSecurity_Localised', 'ERROR')
         self.population = entry.get('Population', 0)
@@ -150,111 +248,141 @@ class Location(ColorMixin):
         self.latitude = entry.get('Latitude', None)
         self.longitude = entry.get('Longitude', None)
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
-        schema = (
-            f'\t{k_s}{k_c}System: {v_s}{v_c}{self.star_system} '
-            f'{k_s}{k_c}Sec.: {v_s}{v_c}{self.system_sec} '
-            f'{k_s}{k_c}Population: {v_s}{v_c}{self.population:,d}\n'
-            f'\t{k_s}{k_c}{self.body_type}: {v_s}{v_c}{self.body_name}'
-        )
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
         if self.docked:
-            schema += (
-                f'\n\t{k_s}{k_c}Docked at {self.station_type}: {v_s}{v_c}{self.station_name}'
-            )
+            out.append(self.docked_template.format(record=self))
 
         if self.latitude is not None and self.longitude is not None:
-            schema += (
-                f'\n\t{k_s}{k_c}Landed in coordinates: {v_s}{v_c}{self.latitude}, {self.longitude}'
-            )
+            out.append(self.landed_template.format(record=self))
 
-        return schema
 
+class FSSDiscoveryScan(Event):
+    journal_events = ('FSSDiscoveryScan',)
+
+    template = Template(
+        '\t<k>Progress: <v>{record.progress:.0f}%\n'
+        '\t<k>Bodies: <v>{record.body_count} '
+        '<k>Non bodies: <v>{record.non_body_count}'
+    )
 
-class FSSDiscoveryScan(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.progress = entry.get('Progress', 0) * 100
         self.body_count = entry.get('BodyCount', 0)
         self.non_body_count = entry.get('NonBodyCount', 0)
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
-        schema = (
-            f'\t{k_s}{k_c}Progress: {v_s}{v_c}{self.progress:.0f}%\n'
-            f'\t{k_s}{k_c}Bodies: {v_s}{v_c}{self.body_count} '
-            f'{k_s}{k_c}Non bodies: {v_s}{v_c}{self.non_body_count}'
-        )
-        return schema
 
+class ApproachBody(Event):
+    journal_events = ('ApproachBody',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        state['BodyType'] = 'Planet'
+        update_keys(state, entry)
+
+    template = Template(
+        '\t<k>Planet: <v>{record.body_name} '
+        '<k>System: <v>{record.star_system}'
+    )
 
-class ApproachBody(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.body_name = entry.get('Body', 'ERROR')
         self.star_system = entry.get('StarSystem', 'ERROR')
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
-        schema = (
-            f'\t{k_s}{k_c}Planet: {v_s}{v_c}{self.body_name} '
-            f'{k_s}{k_c}System: {v_s}{v_c}{self.star_system}'
-        )
-        return schema
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
 
 class LeaveBody(ApproachBody):
-    pass
+    journal_events = ('LeaveBody',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        state['BodyType'] = 'Null'
+        update_keys(state, entry)
+
 
+class FSSAllBodiesFound(Event):
+    journal_events = ('FSSAllBodiesFound',)
+
+    template = Template(
+        '\t<k>System: <v>{record.system_name} '
+        '<k>Bodies: <v>{record.body_count}'
+    )
+    interests_template = Template('\n\t<k>Interests:')
+    body_template = Template('\n\t\t<v>{body_name}: <i>{interests}')
 
-class FSSAllBodiesFound(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.system_name = entry.get('SystemName', 'ERROR')
         self.body_count = entry.get('Count', -1)
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
-        schema = (
-            f'\t{k_s}{k_c}System: {v_s}{v_c}{self.system_name} '
-            f'{k_s}{k_c}Bodies: {v_s}{v_c}{self.body_count}'
-        )
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
         bodies_with_interests = {}
-        starsystem_bodies = monitor.state['StarSystemBodies']
-        for starsystem, body_id in starsystem_bodies:
-            if (starsystem == self.system_name and
-                    starsystem_bodies[(self.system_name, body_id)].interests):
-                body = starsystem_bodies[(self.system_name, body_id)]
+        for body in monitor.state['StarSystemBodies'].system(self.system_name):
+            if body.interests:
                 bodies_with_interests.update({
                     body.body_name: body.interests
                 })
 
         if bodies_with_interests:
-            schema += f'\n\t{k_s}{k_c}Interests:'
-            for body_name in bodies_with_interests:
-                interests = ', '.join(bodies_with_interests[body_name])
-                schema += (
-                    f'\n\t\t{v_s}{v_c}{body_name}: {self.i_s}{self.i_c}{interests}'
-                )
+            out.append(self.interests_template.format())
+            for body_name, interests in bodies_with_interests.items():
+                out.append(self.body_template.format(
+                    body_name=body_name,
+                    interests=', '.join(interests),
+                ))
+
+
+def intern_str(value):
+    if isinstance(value, str):
+        return intern(value)
+
+    return value
+
 
-        return schema
+class BodyScan:
+    """Compact record of a scanned body kept in StarSystemBodies
 
+    Only the data used by Interest and the schema is stored, repeated
+    strings are interned and colors are looked up at render time.
+    """
 
-class ScanStar(ColorMixin):
+    __slots__ = (
+        'id',
+        'star_system',
+        'parents',
+        'body_name',
+        'was_discovered',
+        'was_mapped',
+        'interests',
+    )
+
+    body_type = None
+
+    def __init__(self, entry, scan_type=None):
+        self.id = entry['BodyID']
+        self.star_system = intern_str(entry.get('StarSystem'))
+        self.parents = entry.get('Parents', [])
+        self.body_name = entry.get('BodyName', 'ERROR')
+        self.was_discovered = entry.get('WasDiscovered', None)
+        self.was_mapped = entry.get('WasMapped', None)
+        self.interests = []
+
+    @property
+    def schema(self):
+        palette.reload()
+        out = []
+        self.emit(out)
+        return ''.join(out)
+
+
+class ScanStar(BodyScan):
     STAR_DESC = {
         'Main sequance': ('O', 'B', 'A', 'F', 'G', 'K', 'M', 'L', 'T', 'Y'),
         'Proto star': ('TTS', 'AeBe'),
@@ -277,54 +405,65 @@ class ScanStar(ColorMixin):
         'White dwarf': ('VIII', ),
     }
 
-    def __init__(self, entry, scan_type):
-        super().__init__()
-        self.id = entry['BodyID']
-        self.body_type = 'Star'
-        self.star_system = entry.get('StarSystem')
-        self.parents = entry.get('Parents', [])
-        self.scan_type = scan_type
-        self.body_name = entry.get('BodyName', 'ERROR')
-        self.star_type = entry.get('StarType', 'ERROR')
-        self.star_desc = self.get_star_desc(self.star_type)
+    __slots__ = (
+        'star_type',
+        'sub_class',
+        'stellar_mass',
+        'radius',
+        'absolute_magnitude',
+        'age',
+        'surface_temp',
+        'luminosity',
+        'rings',
+        'orbital_period',
+    )
+
+    body_type = 'Star'
+
+    template = Template(
+        '\t<k>{record.body_type}: <v>{record.body_name} '
+        '<k>Class: <v>{record.star_type} ({record.star_desc}) '
+        '<k>Subclass: <v>{record.sub_class} ({record.sub_class})\n'
+        '\t<k>Luminosity: <v>{record.luminosity} ({record.luminosity_desc})\n'
+        '\t<k>Solar mass: <v>{record.stellar_mass:.5f} '
+        '<k>Solar radius: <v>{record.solar_radius:.5f}\n'
+        '\t<k>Surface temp.: <v>{record.surface_temp:.2f} K\n'
+        '\t<k>Age: <v>{record.age} million years\n'
+        '\t<k>Absolute magnitude: <v>{record.absolute_magnitude:.3f}'
+    )
+    orbital_period_template = Template('\n\t<k>Orbital period: <v>{record.orbital_period}')
+
+    def __init__(self, entry, scan_type=None):
+        super().__init__(entry)
+        self.star_type = intern_str(entry.get('StarType', 'ERROR'))
         self.sub_class = entry.get('Subclass', 'ERROR')
         self.stellar_mass = entry.get('StellarMass', -1)
         self.radius = entry.get('Radius', -1) / 1000
-        self.solar_radius = self.radius / 695508
         self.absolute_magnitude = entry.get('AbsoluteMagnitude', -1)
         self.age = entry.get('Age_MY', -1)
         self.surface_temp = entry.get('SurfaceTemperature', -1)
-        self.luminosity = entry.get('Luminosity', 'ERROR')
-        self.luminosity_desc = self.get_star_lum_desc(self.luminosity)
+        self.luminosity = intern_str(entry.get('Luminosity', 'ERROR'))
         self.rings = entry.get('Rings', None)
-        self.was_discovered = entry.get('WasDiscovered', None)
-        self.was_mapped = entry.get('WasMapped', None)
         self.orbital_period = entry.get('OrbitalPeriod', None)
         if self.orbital_period:
             self.orbital_period = datetime.timedelta(seconds=int(self.orbital_period))
 
     @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
-        schema = (
-            f'\t{k_s}{k_c}{self.body_type}: {v_s}{v_c}{self.body_name} '
-            f'{k_s}{k_c}Class: {v_s}{v_c}{self.star_type} ({self.star_desc}) '
-            f'{k_s}{k_c}Subclass: {v_s}{v_c}{self.sub_class} ({self.sub_class})\n'
-            f'\t{k_s}{k_c}Luminosity: {v_s}{v_c}{self.luminosity} ({self.luminosity_desc})\n'
-            f'\t{k_s}{k_c}Solar mass: {v_s}{v_c}{self.stellar_mass:.5f} '
-            f'{k_s}{k_c}Solar radius: {v_s}{v_c}{self.solar_radius:.5f}\n'
-            f'\t{k_s}{k_c}Surface temp.: {v_s}{v_c}{self.surface_temp:.2f} K\n'
-            f'\t{k_s}{k_c}Age: {v_s}{v_c}{self.age} million years\n'
-            f'\t{k_s}{k_c}Absolute magnitude: {v_s}{v_c}{self.absolute_magnitude:.3f}'
-        )
-        if self.orbital_period:
-            schema += (
-                f'\n\t{k_s}{k_c}Orbital period: {v_s}{v_c}{self.orbital_period}'
-            )
+    def star_desc(self):
+        return self.get_star_desc(self.star_type)
 
-        return schema
+    @property
+    def luminosity_desc(self):
+        return self.get_star_lum_desc(self.luminosity)
+
+    @property
+    def solar_radius(self):
+        return self.radius / 695508
+
+    def emit(self, out):
+        out.append(self.template.format(record=self))
+        if self.orbital_period:
+            out.append(self.orbital_period_template.format(record=self))
 
     @classmethod
     def get_star_desc(cls, star_class):
@@ -347,19 +486,70 @@ class ScanStar(ColorMixin):
         return description
 
 
-class ScanPlanet(ColorMixin):
-    def __init__(self, entry, scan_type):
-        super().__init__()
-        self.id = entry['BodyID']
-        self.body_type = 'Planet'
-        self.star_system = entry.get('StarSystem')
-        self.parents = entry.get('Parents', [])
-        self.scan_type = scan_type
-        self.body_name = entry.get('BodyName', 'ERROR')
-        self.planet_class = entry.get('PlanetClass', 'ERROR')
+class ScanPlanet(BodyScan):
+    __slots__ = (
+        'planet_class',
+        'mass',
+        'radius',
+        'surface_gravity',
+        'rotation_period',
+        'orbital_period',
+        'axial_tilt',
+        'semi_major_axis',
+        'eccentricity',
+        'orbital_inclination',
+        'tidal_lock',
+        'terraform_state',
+        'atmosphere',
+        'atmosphere_composition',
+        'volcanism',
+        'surface_temperature',
+        'surface_pressure',
+        'landable',
+        'materials',
+        'composition',
+        'rings',
+    )
+
+    body_type = 'Planet'
+
+    template = Template(
+        '\t<k>{record.body_type}: <v>{record.body_name} '
+        '<k>Landable: <v>{record.landable}\n'
+        '\t<k>Class: <v>{record.planet_class} '
+    )
+    physical_template = Template(
+        '\n\t<k>Gravity: <v>{record.surface_gravity:.2f}G '
+        '<k>EMass: <v>{record.mass:.4f} '
+        '<k>Radius: <v>{record.radius:.2f} km ({record.radius_e:.2f} of Earth)'
+    )
+    rotation_template = Template(
+        '\n\t<k>Rotation period: <v>{rotation_period} '
+        '<k>Axial tilt: <v>{axial_tilt:.2f} deg. '
+        '<k>Tidal lock: <v>{record.tidal_lock}'
+    )
+    orbital_period_template = Template('\n\t<k>Orbital period: <v>{orbital_period}')
+    atmosphere_template = Template('\n\t<k>Atmosphere: <v>{record.atmosphere} ')
+    atmosphere_composition_template = Template('\n\t<k>Atmosphere composition: <v>')
+    no_atmosphere_template = Template('\n\t<k>No atmosphere')
+    volcanism_template = Template('\n\t<k>Volcanism: <v>{volcanism}')
+    no_volcanism_template = Template('\n\t<k>No volcanism')
+    surface_template = Template(
+        '\n\t<k>Temperature: <v>{record.surface_temperature:.0f}K ({record.surface_temperature_c:.1f}C) '
+        '<k>Pressure: <v>{record.surface_pressure:.2f} atmospheres'
+    )
+    terraform_template = Template('\n\t<k>Terraform state: <v>{record.terraform_state}')
+    discovered_template = Template('\n\t<k>Discovered')
+    mapped_template = Template('<k> and mapped')
+    materials_template = Template('\n\t<k>Materials:\n')
+    material_row_template = Template('\t   <v>{name:10} -{percent:6.2f}%')
+    material_column_template = Template('   {name:10} -{percent:6.2f}%')
+
+    def __init__(self, entry, scan_type=None):
+        super().__init__(entry)
+        self.planet_class = intern_str(entry.get('PlanetClass', 'ERROR'))
         self.mass = entry.get('MassEM', -1)
         self.radius = entry.get('Radius') / 1000
-        self.radius_e = (self.radius / 6371)
         self.surface_gravity = entry.get('SurfaceGravity', -1) / 10
 
         self.rotation_period = entry.get('RotationPeriod', None)
@@ -370,288 +560,281 @@ class ScanPlanet(ColorMixin):
         self.orbital_inclination = entry.get('OrbitalInclination', None)
 
         self.tidal_lock = entry.get('TidalLock', False)
-        self.terraform_state = entry.get('TerraformState', None)
-        self.atmosphere = entry.get('Atmosphere', 'ERROR').capitalize()
-        self.atmosphere_type = entry.get('AtmosphereType', None)
+        self.terraform_state = intern_str(entry.get('TerraformState', None))
+        self.atmosphere = intern(entry.get('Atmosphere', 'ERROR').capitalize())
+        self.volcanism = intern_str(entry.get('Volcanism', None))
+
+        # (name, percent) pairs instead of a dict per element
         self.atmosphere_composition = entry.get('AtmosphereComposition', None)
-        self.volcanism = entry.get('Volcanism', None)
+        if self.atmosphere_composition:
+            self.atmosphere_composition = tuple(
+                (intern(element['Name']), element['Percent'])
+                for element in self.atmosphere_composition
+            )
 
         self.surface_temperature = entry.get('SurfaceTemperature', 0)
-        self.surface_temperature_c = self.surface_temperature - 273.15
         self.surface_pressure = entry.get('SurfacePressure', -1) / 101325
         self.landable = entry.get('Landable', 'N/A')
+
         self.materials = entry.get('Materials', None)
+        if self.materials:
+            self.materials = tuple(
+                (intern(material['Name']), material['Percent'])
+                for material in self.materials
+            )
+
         self.composition = entry.get('Composition', None)
+        if self.composition:
+            self.composition = tuple(
+                (intern(element), percent)
+                for element, percent in self.composition.items()
+            )
+
         self.rings = entry.get('Rings', None)
 
-        self.was_discovered = entry.get('WasDiscovered', None)
-        self.was_mapped = entry.get('WasMapped', None)
+    @property
+    def radius_e(self):
+        return self.radius / 6371
 
     @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+    def surface_temperature_c(self):
+        return self.surface_temperature - 273.15
 
-        schema = (
-            f'\t{k_s}{k_c}{self.body_type}: {v_s}{v_c}{self.body_name} '
-            f'{k_s}{k_c}Landable: {v_s}{v_c}{self.landable}\n'
-            f'\t{k_s}{k_c}Class: {v_s}{v_c}{self.planet_class} '
-        )
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
         if self.composition:
-            schema += '('
-            for i, (element, percent) in enumerate(self.composition.items()):
+            out.append('(')
+            for i, (element, percent) in enumerate(self.composition):
                 percent = percent * 100
                 if percent < 0.009:
                     continue
-                schema += f'{element}: {percent:.1f}%'
+                out.append(f'{element}: {percent:.1f}%')
                 if i + 1 < len(self.composition):
-                    schema += ', '
-            schema += ')'
+                    out.append(', ')
+            out.append(')')
 
-        schema += (
-            f'\n\t{k_s}{k_c}Gravity: {v_s}{v_c}{self.surface_gravity:.2f}G '
-            f'{k_s}{k_c}EMass: {v_s}{v_c}{self.mass:.4f} '
-            f'{k_s}{k_c}Radius: {v_s}{v_c}{self.radius:.2f} km ({self.radius_e:.2f} of Earth)'
-        )
+        out.append(self.physical_template.format(record=self))
 
         if self.rotation_period and self.axial_tilt:
-            rotation_period = datetime.timedelta(seconds=int(self.rotation_period))
-            axial_tilt = self.axial_tilt * (180 / pi)
-            schema += (
-                f'\n\t{k_s}{k_c}Rotation period: {v_s}{v_c}{rotation_period} '
-                f'{k_s}{k_c}Axial tilt: {v_s}{v_c}{axial_tilt:.2f} deg. '
-                f'{k_s}{k_c}Tidal lock: {v_s}{v_c}{self.tidal_lock}'
-            )
+            out.append(self.rotation_template.format(
+                record=self,
+                rotation_period=datetime.timedelta(seconds=int(self.rotation_period)),
+                axial_tilt=self.axial_tilt * (180 / pi),
+            ))
 
         if self.orbital_period:
-            orbital_period = datetime.timedelta(seconds=int(self.orbital_period))
-            schema += (
-                f'\n\t{k_s}{k_c}Orbital period: {v_s}{v_c}{orbital_period}'
-            )
+            out.append(self.orbital_period_template.format(
+                orbital_period=datetime.timedelta(seconds=int(self.orbital_period)),
+            ))
 
         if self.atmosphere or self.atmosphere_composition:
             if self.atmosphere:
-                schema += (
-                    f'\n\t{k_s}{k_c}Atmosphere: {v_s}{v_c}{self.atmosphere} '
-                )
+                out.append(self.atmosphere_template.format(record=self))
 
             if self.atmosphere_composition:
                 if not self.atmosphere:
-                    schema += f'\n\t{k_s}{k_c}Atmosphere composition: {v_s}{v_c}'
-                schema += '('
-                for i, element in enumerate(self.atmosphere_composition):
-                    element_name = element['Name']
-                    percent = float(element['Percent'])
+                    out.append(self.atmosphere_composition_template.format())
+                out.append('(')
+                for i, (element_name, percent) in enumerate(self.atmosphere_composition):
+                    percent = float(percent)
                     if percent == 0.0:
                         continue
-                    schema += f'{element_name} - {percent:.1f}%'
+                    out.append(f'{element_name} - {percent:.1f}%')
                     if i + 1 < len(self.atmosphere_composition):
-                        schema += ', '
-                schema += ')'
+                        out.append(', ')
+                out.append(')')
         else:
-            schema += (
-                f'\n\t{k_s}{k_c}No atmosphere'
-            )
+            out.append(self.no_atmosphere_template.format())
 
         if self.volcanism:
-            schema += (
-                f'\n\t{k_s}{k_c}Volcanism: {v_s}{v_c}{self.volcanism.capitalize()}'
-            )
+            out.append(self.volcanism_template.format(volcanism=self.volcanism.capitalize()))
         else:
-            schema += (
-                f'\n\t{k_s}{k_c}No volcanism'
-            )
+            out.append(self.no_volcanism_template.format())
 
         if self.surface_temperature or self.surface_pressure:
-            surface_temperature = f'{self.surface_temperature:.0f}K ({self.surface_temperature_c:.1f}C)'
-            surface_pressure = f'{self.surface_pressure:.2f} atmospheres'
-            schema += (
-                f'\n\t{k_s}{k_c}Temperature: {v_s}{v_c}{surface_temperature} '
-                f'{k_s}{k_c}Pressure: {v_s}{v_c}{surface_pressure}'
-            )
+            out.append(self.surface_template.format(record=self))
 
         if self.terraform_state:
-            schema += (
-                f'\n\t{k_s}{k_c}Terraform state: {v_s}{v_c}{self.terraform_state}'
-            )
+            out.append(self.terraform_template.format(record=self))
 
         if self.was_discovered:
-            schema += (
-                f'\n\t{k_s}{k_c}Discovered'
-            )
+            out.append(self.discovered_template.format())
             if self.was_mapped:
-                schema += (
-                    f'{k_s}{k_c} and mapped'
-                )
+                out.append(self.mapped_template.format())
 
         if self.materials:
-            schema += (
-                f'\n\t{k_s}{k_c}Materials:\n'
-            )
-            ident = ' ' * 3
+            out.append(self.materials_template.format())
             columns = 3
             rows = math.ceil(len(self.materials) / columns)
             for index in range(rows):
-                name = self.materials[index]['Name'].capitalize()
-                percent = self.materials[index]['Percent']
-
-                schema += (
-                    f'\t{ident}{v_s}{v_c}{name:10} -{percent:6.2f}%'
-                )
+                name, percent = self.materials[index]
+                out.append(self.material_row_template.format(name=name.capitalize(), percent=percent))
 
                 for column in range(1, columns):
                     try:
-                        name = self.materials[index+(column * rows)]['Name'].capitalize()
-                        percent = self.materials[index+(column * rows)]['Percent']
-
-                        schema += (
-                            f'{ident}{name:10} -{percent:6.2f}%'
-                        )
+                        name, percent = self.materials[index+(column * rows)]
                     except IndexError:
-                        pass
+                        continue
+                    out.append(self.material_column_template.format(name=name.capitalize(), percent=percent))
 
                 if index + 1 < rows:
-                    schema += '\n'
-
-        return schema
+                    out.append('\n')
 
 
 class ScanMoon(ScanPlanet):
-    def __init__(self, entry, scan_type):
-        super().__init__(entry, scan_type)
-        self.body_type = 'Moon'
+    __slots__ = ()
 
+    body_type = 'Moon'
 
-class ScanBeltCluster(ColorMixin):
-    def __init__(self, entry, scan_type):
-        super().__init__()
-        self.id = entry['BodyID']
-        self.body_type = 'Belt Cluster'
-        self.star_system = entry.get('StarSystem')
-        self.parents = entry.get('Parents', [])
-        self.scan_type = scan_type
-        self.body_name = entry.get('BodyName', 'ERROR')
-        self.was_discovered = entry.get('WasDiscovered', None)
-        self.was_mapped = entry.get('WasMapped', None)
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+class ScanBeltCluster(BodyScan):
+    __slots__ = ()
 
-        schema = (
-            f'\t{k_s}{k_c}Name: {v_s}{v_c}{self.body_name} '
-        )
-        if self.was_discovered:
-            schema += f'{k_s}{k_c}(Discovered)'
+    body_type = 'Belt Cluster'
 
-        return schema
+    template = Template('\t<k>Name: <v>{record.body_name} ')
+    discovered_template = Template('<k>(Discovered)')
+
+    def emit(self, out):
+        out.append(self.template.format(record=self))
+        if self.was_discovered:
+            out.append(self.discovered_template.format())
 
 
 class ScanRing(ScanBeltCluster):
-    pass
+    __slots__ = ()
+
+
+class Scan(Event):
+    journal_events = ('Scan',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        cls.add_body(state, cls.get_body_scan(entry))
+
+    @staticmethod
+    def add_body(state, body_scan):
+        # The interests depend on the bodies scanned before this one
+        body_scan.interests = Interest(body_scan).get_interests()
+        state['StarSystemBodies'].add(state['StarSystem'], body_scan)
 
+    template = Template('\t<k>Scan type: <v>{record.scan_type}\n')
+    rings_template = Template('\n\t<k>Rings ({record.reserve_level}):\n')
+    ring_template = Template('\t\t<v>{ring_name} - {ring_class}')
+    interests_template = Template('\n\t<k>Interests:')
+    interest_template = Template('\n\t<i>{interest}')
 
-class Scan(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.entry = entry
         self.scan_type = entry.get('ScanType', None)
-        self.body_scan = self.get_body_scan()
+        self.body_scan = self.get_body_scan(entry)
         self.body_name = entry.get('BodyName', 'ERROR')
 
         self.rings = entry.get('Rings', None)
         self.reserve_level = entry.get('ReserveLevel', None)
         self.body_scan.interests = Interest(self.body_scan).get_interests()
 
-    def get_body_scan(self):
-        if 'StarType' in self.entry:
-            body_scan = ScanStar(self.entry, self.scan_type)
-        elif 'Belt Cluster' in self.entry.get('BodyName'):
-            body_scan = ScanBeltCluster(self.entry, self.scan_type)
-        elif 'Ring' in self.entry.get('BodyName'):
-            body_scan = ScanRing(self.entry, self.scan_type)
-        elif 'Planet' in self.entry['Parents'][0]:
-            body_scan = ScanMoon(self.entry, self.scan_type)
-        elif 'MassEM' in self.entry:
-            body_scan = ScanPlanet(self.entry, self.scan_type)
+    @staticmethod
+    def get_body_scan(entry):
+        scan_type = entry.get('ScanType', None)
+        if 'StarType' in entry:
+            body_scan = ScanStar(entry, scan_type)
+        elif 'Belt Cluster' in entry.get('BodyName'):
+            body_scan = ScanBeltCluster(entry, scan_type)
+        elif 'Ring' in entry.get('BodyName'):
+            body_scan = ScanRing(entry, scan_type)
+        elif 'Planet' in entry['Parents'][0]:
+            body_scan = ScanMoon(entry, scan_type)
+        elif 'MassEM' in entry:
+            body_scan = ScanPlanet(entry, scan_type)
         else:
             body_scan = None
 
         return body_scan
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
-        schema = (
-            f'\t{k_s}{k_c}Scan type: {v_s}{v_c}{self.scan_type}\n'
-        )
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
         if self.body_scan and self.scan_type in ('AutoScan', 'Detailed'):
-            schema += self.body_scan.schema
+            self.body_scan.emit(out)
 
         if self.rings and isinstance(self.rings, list):
-            schema += (
-                f'\n\t{k_s}{k_c}Rings ({self.reserve_level}):\n'
-            )
+            out.append(self.rings_template.format(record=self))
             for i, ring in enumerate(self.rings):
                 ring_name = ring['Name']
                 if ring_name.startswith(self.body_name):
                     ring_name = ring_name.replace(self.body_name, '')
                 ring_class = ring['RingClass'].split('_')[-1]
-                schema += (
-                    f'\t\t{v_s}{v_c}{ring_name} - {ring_class}'
-                )
+                out.append(self.ring_template.format(ring_name=ring_name, ring_class=ring_class))
                 if i + 1 < len(self.rings):
-                    schema += '\n'
+                    out.append('\n')
 
         if self.body_scan.interests:
-            schema += (
-                f'\n\t{k_s}{k_c}Interests:'
-            )
+            out.append(self.interests_template.format())
             for interest in self.body_scan.interests:
-                schema += (
-                    f'\n\t{self.i_s}{self.i_c}{interest}'
-                )
+                out.append(self.interest_template.format(interest=interest))
 
-        return schema
 
+class Touchdown(Event):
+    journal_events = ('Touchdown',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        state['Latitude'] = entry.get('Latitude')
+        state['Longitude'] = entry.get('Longitude')
+
+    template = Template(
+        '\t<k>Lat.: <v>{record.latitude:.4f} '
+        '<k>Long.: <v>{record.longitude:.4f}'
+    )
 
-class Touchdown(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.player_controlled = entry.get('PlayerControlled', None)
         self.latitude = entry.get('Latitude', None)
         self.longitude = entry.get('Longitude', None)
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
+    def emit(self, out):
         if self.player_controlled:
-            schema = (
-                f'\t{k_s}{k_c}Lat.: {v_s}{v_c}{self.latitude:.4f} '
-                f'{k_s}{k_c}Long.: {v_s}{v_c}{self.longitude:.4f}'
-            )
+            out.append(self.template.format(record=self))
         else:
-            schema = (
-                f'\tAutopilot'
-            )
-
-        return schema
+            out.append('\tAutopilot')
 
 
 class Liftoff(Touchdown):
-    pass
+    journal_events = ('Liftoff',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        state['Latitude'] = None
+        state['Longitude'] = None
 
 
-class MaterialCollected(ColorMixin):
+class MaterialCollected(Event):
+    journal_events = ('MaterialCollected',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        category = entry['Category']
+        name = entry.get('Name_Localised')
+        if not name:
+            name = entry['Name']
+
+        total = cls.new_total(state[category], name, entry['Count'])
+        state[category].update({name: total})
+        entry['Total'] = total
+
+    @staticmethod
+    def new_total(materials, name, count):
+        return materials.get(name, 0) + count
+
+    template = Template(
+        '\t<k>{record.category}: <v>{name}\n'
+        '\t<k>{record.operation}: <v>{record.count} '
+        '<k>Total: <v>{record.total}'
+    )
+
     def __init__(self, entry):
-        super().__init__()
         self.category = entry.get('Category', 'ERROR')
         self.count = entry.get('Count', -1)
         self.total = entry.get('Total', -1)
@@ -660,29 +843,31 @@ class MaterialCollected(ColorMixin):
         if not self.name:
             self.name = entry.get('Name', 'ERROR')
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+    def emit(self, out):
+        out.append(self.template.format(record=self, name=self.name.capitalize()))
 
-        schema = (
-            f'\t{k_s}{k_c}{self.category}: {v_s}{v_c}{self.name.capitalize()}\n'
-            f'\t{k_s}{k_c}{self.operation}: {v_s}{v_c}{self.count} '
-            f'{k_s}{k_c}Total: {v_s}{v_c}{self.total}'
-        )
 
-        return schema
+class MaterialDiscarded(MaterialCollected):
+    journal_events = ('MaterialDiscarded',)
 
+    @staticmethod
+    def new_total(materials, name, count):
+        return materials[name] - count
 
-class MaterialDiscarded(MaterialCollected):
     def __init__(self, entry):
         super().__init__(entry)
         self.operation = 'Discarded'
 
 
-class StartJump(ColorMixin):
+class StartJump(Event):
+    journal_events = ('StartJump',)
+
+    template = Template(
+        '\t<k>Jump to system: <v>{record.star_system} '
+        '<k>Class: <v>{record.star_class} ({record.star_desc})'
+    )
+
     def __init__(self, entry):
-        super().__init__()
         self.jump_type = entry.get('JumpType', None)
         self.star_system = entry.get('StarSystem', None)
         self.star_class = entry.get('StarClass', None)
@@ -690,25 +875,37 @@ class StartJump(ColorMixin):
         if self.star_class:
             self.star_desc = ScanStar.get_star_desc(self.star_class)
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
+    def emit(self, out):
         if self.jump_type == 'Hyperspace':
-            schema = (
-                f'\t{k_s}{k_c}Jump to system: {v_s}{v_c}{self.star_system} '
-                f'{k_s}{k_c}Class: {v_s}{v_c}{self.star_class} ({self.star_desc})'
-            )
-        else:
-            schema = ''
+            out.append(self.template.format(record=self))
+
+    def render(self, timestamp, event):
+        schema = self.schema
+        if not schema:
+            return self.header(timestamp, event)
+
+        return f'{self.header(timestamp, event)}\n{schema}'
+
 
-        return schema
+class FSDJump(Event):
+    journal_events = ('FSDJump',)
 
+    @classmethod
+    def update_state(cls, state, entry):
+        state['BodyType'] = 'Star'
+        update_keys(state, entry)
+        entry['FuelCapacity'] = state['FuelCapacity']
+
+    template = Template(
+        '\t<k>System: <v>{record.star_system} '
+        '<k>Sec.: <v>{record.system_sec} '
+        '<k>Population: <v>{record.population:,d}\n'
+        '\t<k>Jump distance: <v>{record.jump_dist:.1f} ly'
+    )
+    fuel_used_template = Template('\n\t<k>Fuel used: <v>{fuel_used:.1f}% ')
+    no_fuel_template = Template('\n\t<k>Fuel: <v>N/A ')
 
-class FSDJump(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.star_system = entry.get('StarSystem', 'ERROR')
         self.jump_dist = entry.get('JumpDist', -1)
         self.system_sec = entry.get('SystemSecurity_Localised', None)
@@ -718,135 +915,137 @@ class FSDJump(ColorMixin):
         self.fuel_level = entry.get('FuelLevel', 0)
         self.fuel_capacity = entry.get('FuelCapacity', 0)
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
-        schema = (
-            f'\t{k_s}{k_c}System: {v_s}{v_c}{self.star_system} '
-            f'{k_s}{k_c}Sec.: {v_s}{v_c}{self.system_sec} '
-            f'{k_s}{k_c}Population: {v_s}{v_c}{self.population:,d}\n'
-            f'\t{k_s}{k_c}Jump distance: {v_s}{v_c}{self.jump_dist:.1f} ly'
-        )
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
         try:
             fuel_used = (float(self.fuel_used) / float(self.fuel_capacity)) * 100
-            schema += f'\n\t{k_s}{k_c}Fuel used: {v_s}{v_c}{fuel_used:.1f}% '
-            schema += f'{Fuel(self.fuel_level, self.fuel_capacity).schema}'
         except ZeroDivisionError:
-            schema += (
-                f'\n\t{k_s}{k_c}Fuel: {v_s}{v_c}N/A '
-            )
+            out.append(self.no_fuel_template.format())
+        else:
+            out.append(self.fuel_used_template.format(fuel_used=fuel_used))
+            Fuel(self.fuel_level, self.fuel_capacity).emit(out)
+
 
-        return schema
+class FuelScoop(Event):
+    journal_events = ('FuelScoop',)
 
+    @classmethod
+    def update_state(cls, state, entry):
+        state['FuelLevel'] = entry['Total']
+        entry['FuelCapacity'] = state['FuelCapacity']
 
-class FuelScoop(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.scooped = float(entry.get('Scooped', 0))
         self.fuel_capacity = float(entry.get('FuelCapacity', 0))
         self.total = float(entry.get('Total', 0))
 
-    @property
-    def schema(self):
-        schema = f'\t{Fuel(self.total, self.fuel_capacity).schema}'
-        return schema
+    def emit(self, out):
+        out.append('\t')
+        Fuel(self.total, self.fuel_capacity).emit(out)
+
+
+class SupercruiseEntry(Event):
+    journal_events = ('SupercruiseEntry',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        state['BodyType'] = 'Null'
 
+    template = Template('\t<k>System: <v>{record.star_system}')
 
-class SupercruiseEntry(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.star_system = entry.get('StarSystem', 'ERROR')
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
-        schema = f'\t{k_s}{k_c}System: {v_s}{v_c}{self.star_system}'
 
-        return schema
+class SupercruiseExit(Event):
+    journal_events = ('SupercruiseExit',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        update_keys(state, entry)
 
+    template = Template('\t<k>{record.body_type}: <v>{record.body}')
 
-class SupercruiseExit(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.body = entry.get('Body', 'ERROR')
         self.body_type = entry.get('BodyType', 'ERROR')
         if self.body_type == 'Null':
             self.body_type = 'In space'
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
-        schema = f'\t{k_s}{k_c}{self.body_type}: {v_s}{v_c}{self.body}'
 
-        return schema
+class DiscoveryScan(Event):
+    journal_events = ('DiscoveryScan',)
 
+    template = Template('\t<k>New bodies discovered: <v>{record.bodies} ')
 
-class DiscoveryScan(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.bodies = entry.get('Bodies', -1)
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+    def emit(self, out):
+        out.append(self.template.format(record=self))
 
-        schema = f'\t{k_s}{k_c}New bodies discovered: {v_s}{v_c}{self.bodies} '
 
-        return schema
+class Docked(Event):
+    journal_events = ('Docked',)
 
+    @classmethod
+    def update_state(cls, state, entry):
+        state['Docked'] = True
+        state['StationName'] = entry['StationName']
+        state['StationType'] = entry['StationType']
+
+    template = Template(
+        '\t<k>Docked at {record.station_type}: <v>{record.station_name}\n'
+        '\t<k>Faction: <v>{faction} '
+        '<k>State: <v>{record.faction_state}'
+    )
 
-class Docked(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.station_name = entry.get('StationName', 'ERROR')
         self.station_type = entry.get('StationType', 'ERROR')
         self.station_faction = entry.get('StationFaction', 'ERROR')
         self.faction_state = self.station_faction.get('FactionState', 'None')
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+    def emit(self, out):
+        out.append(self.template.format(record=self, faction=self.station_faction.get('Name')))
 
-        schema = (
-            f'\t{k_s}{k_c}Docked at {self.station_type}: {v_s}{v_c}{self.station_name}\n'
-            f'\t{k_s}{k_c}Faction: {v_s}{v_c}{self.station_faction.get("Name")} '
-            f'{k_s}{k_c}State: {v_s}{v_c}{self.faction_state}'
-        )
 
-        return schema
+class ShipyardNew(Event):
+    journal_events = ('ShipyardNew',)
 
+    @classmethod
+    def update_state(cls, state, entry):
+        state['Ship_Localised'] = entry.get('ShipType')
+        state['ShipName'] = None
+        state['ShipIdent'] = None
+
+    template = Template('\t<k>Ship: <v>{ship_type}')
 
-class ShipyardNew(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.ship_type = entry.get('ShipType_Localised') or entry.get('ShipType')
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
+    def emit(self, out):
+        out.append(self.template.format(ship_type=self.ship_type.title()))
 
-        schema = f'\t{k_s}{k_c}Ship: {v_s}{v_c}{self.ship_type.title()}'
 
-        return schema
+class ShipyardSwap(ShipyardNew):
+    journal_events = ('ShipyardSwap',)
 
 
-class ShipyardSwap(ShipyardNew):
-    pass
+class ReceiveText(Event):
+    journal_events = ('ReceiveText',)
 
+    npc_template = Template('\t<k>{from_}: <nm>{message}')
+    cmdr_template = Template('\t<k>{from_}: <cm>{message}')
 
-class ReceiveText(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.from_ = entry.get('From')
         self.from_localised = entry.get('From_Localised')
         self.message = entry.get('Message')
@@ -868,48 +1067,202 @@ class ReceiveText(ColorMixin):
 
         return npc_msg_type
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
+    def emit(self, out):
         message = self.message_localised or self.message
         from_ = self.from_localised or self.from_
 
         if self.channel == 'npc':
-            v_s, v_c = self.nm_s, self.nm_c
+            template = self.npc_template
         else:
             from_ = f'CMDR {self.from_}'
-            v_s, v_c = self.cm_s, self.cm_c
+            template = self.cmdr_template
 
-        schema = f'\t{k_s}{k_c}{from_}: {v_s}{v_c}{message}'
+        out.append(template.format(from_=from_, message=message))
 
-        return schema
+    def render(self, timestamp, event):
+        npc_msg_type = self.npc_msg_type
+        if npc_msg_type and npc_msg_type in self.npc_skip_messages:
+            return None
 
+        if npc_msg_type:
+            title = f'ReceiveText: {self.channel} ({npc_msg_type})'
+        else:
+            title = f'ReceiveText: {self.channel}'
+
+        return f'{self.header(timestamp, title)}\n{self.schema}'
+
+
+class Died(Event):
+    journal_events = ('Died',)
+
+    template = Template('\t<k>Killers: <v>')
+    killer_template = Template('\n\t<v>{name:20} Ship: {ship}   Rank: {rank}')
 
-class Died(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.killers = entry.get('Killers')
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
-        schema = f'\t{k_s}{k_c}Killers: {v_s}{v_c}'
+    def emit(self, out):
+        out.append(self.template.format())
         for killer in self.killers:
-            name = killer['Name'].replace('Cmdr', 'CMDR')
-            ship = SHIP_MAP.get(killer['Ship'].lower(), killer['Ship'])
-            rank = killer['Rank']
-            schema += f'\n\t{v_s}{v_c}{name:20} Ship: {ship}   Rank: {rank}'
+            out.append(self.killer_template.format(
+                name=killer['Name'].replace('Cmdr', 'CMDR'),
+                ship=SHIP_MAP.get(killer['Ship'].lower(), killer['Ship']),
+                rank=killer['Rank'],
+            ))
+
 
-        return schema
+class StateEvent(Event):
+    """Events the monitor keeps the state for but which are not printed"""
 
+    printable = False
+
+
+class Commander(StateEvent):
+    journal_events = ('Commander', 'NewCommander')
+
+    @classmethod
+    def update_state(cls, state, entry):
+        state['Commander'] = entry['Name']
+
+
+class Loadout(StateEvent):
+    journal_events = ('Loadout',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        if entry['Ship'].lower().endswith('fighter'):
+            return
+
+        state['ShipName'] = entry['ShipName']
+        state['ShipIdent'] = entry['ShipIdent']
+        fuel_capacity = 0
+        for module in entry['Modules']:
+            if module['Item'].lower().find('fueltank') > -1:
+                item = module['Item'].split('_')
+                size = int(item[2][-1])
+                fuel_capacity += 2 ** size
+        state['FuelCapacity'] = fuel_capacity
+
+
+class Materials(StateEvent):
+    journal_events = ('Materials',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        for category in ['Raw', 'Manufactured', 'Encoded']:
+            for material in entry.get(category, []):
+                count = material['Count']
+                name = material.get('Name_Localised')
+                if not name:
+                    name = material['Name']
+                state[category].update({name: count})
+
+
+class Refuel(StateEvent):
+    journal_events = ('RefuelAll', 'RefuelPartial')
+
+    @classmethod
+    def update_state(cls, state, entry):
+        state['FuelLevel'] += entry['Amount']
+
+
+class SetUserShipName(StateEvent):
+    journal_events = ('SetUserShipName',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        state['ShipName'] = entry['UserShipName']
+        state['ShipIdent'] = entry['UserShipId']
+
+
+class Status(StateEvent):
+    """Changed fields of Status.json, see companion.py"""
+
+    journal_events = ('Status',)
+
+    OVERHEATING = 1 << 20
+
+    @classmethod
+    def update_state(cls, state, entry):
+        fuel = entry.get('Fuel')
+        if fuel:
+            state['FuelLevel'] = fuel['FuelMain']
+
+        if 'Flags' in entry:
+            state['Overheating'] = bool((entry['Flags'] or 0) & cls.OVERHEATING)
+
+        for key in ('Latitude', 'Longitude', 'Altitude', 'Heading'):
+            if key in entry:
+                state[key] = entry[key]
+
+
+class NavRoute(StateEvent):
+    """The route plotted to a destination, from NavRoute.json
+
+    The journal event only tells that the file was written.
+    """
+
+    journal_events = ('NavRoute', 'NavRouteClear')
+
+    @classmethod
+    def update_state(cls, state, entry):
+        if entry['event'] == 'NavRouteClear':
+            state['NavRoute'] = []
+        elif 'Route' in entry:
+            state['NavRoute'] = [system['StarSystem'] for system in entry['Route'] or ()]
+
+
+class Cargo(StateEvent):
+    """Changed fields of Cargo.json or the Cargo journal event
+
+    The cargo is that of the ship or of the SRV, the Vessel.
+    """
+
+    journal_events = ('Cargo',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        if 'Vessel' in entry:
+            state['CargoVessel'] = entry['Vessel']
+
+        if 'Count' in entry:
+            state['CargoCount'] = entry['Count'] or 0
+
+        if 'Inventory' in entry:
+            cargo = {}
+            # Stolen goods are listed apart
+            for item in entry['Inventory'] or ():
+                name = item.get('Name_Localised') or item['Name']
+                cargo[name] = cargo.get(name, 0) + item['Count']
+            state['Cargo'] = cargo
+
+
+class Undocked(Notice):
+    journal_events = ('Undocked',)
+
+    @classmethod
+    def update_state(cls, state, entry):
+        state['Docked'] = False
+        state['StationName'] = None
+        state['StationType'] = None
+
+
+class Screenshot(Event):
+    journal_events = ('Screenshot',)
+
+    template = Template(
+        '\t<k>Filename: <v>{record.filename}\n'
+        '\t<k>Resolution: <v>{record.width}x{record.height}\n'
+        '\t<k>Star system: <v>{record.star_system} '
+        '<k>Body: <v>{record.body} '
+    )
+    position_template = Template(
+        '\n\t<k>Coordinates: <v>{record.latitude}, {record.longitude}\n'
+        '\t<k>Altitude: <v>{record.altitude}\n'
+        '\t<k>Heading: <v>{record.heading}'
+    )
 
-class Screenshot(ColorMixin):
     def __init__(self, entry):
-        super().__init__()
         self.timestamp = entry['timestamp']
         self.filename = entry['Filename']
         self.width = entry['Width']
@@ -921,25 +1274,15 @@ class Screenshot(ColorMixin):
         self.altitude = entry.get('Altitude')
         self.heading = entry.get('Heading')
 
-    @property
-    def schema(self):
-        k_c, v_c = self.k_c, self.v_c
-        k_s, v_s = self.k_s, self.v_s
-
-        schema = (
-            f'\t{k_s}{k_c}Filename: {v_s}{v_c}{self.filename}\n'
-            f'\t{k_s}{k_c}Resolution: {v_s}{v_c}{self.width}x{self.height}\n'
-            f'\t{k_s}{k_c}Star system: {v_s}{v_c}{self.star_system} '
-            f'{k_s}{k_c}Body: {v_s}{v_c}{self.body} '
-        )
+    def emit(self, out):
+        out.append(self.template.format(record=self))
         if self.latitude and self.longitude:
-            schema += (
-                f'\n\t{k_s}{k_c}Coordinates: {v_s}{v_c}{self.latitude}, {self.longitude}\n'
-                f'\t{k_s}{k_c}Altitude: {v_s}{v_c}{self.altitude}\n'
-                f'\t{k_s}{k_c}Heading: {v_s}{v_c}{self.heading}'
-            )
+            out.append(self.position_template.format(record=self))
 
-        return schema
+    def prepare(self):
+        is_renamed = self.rename()
+        if is_renamed and config.get('convert_screenshots', False):
+            self.convert_to_png()
 
     def rename(self):
         new_filename = screenshot.rename(
@@ -958,4 +1301,52 @@ class Screenshot(ColorMixin):
         return True
 
     def convert_to_png(self):
-        screenshot.convert_to_png(self.filename)
+        screenshot.convert_to_png(self.filename, monitor.publish)
+
+
+class ScreenshotConverted(Event):
+    """Reported by the screenshot converter, see screenshot.py"""
+
+    journal_events = ('ScreenshotConverted',)
+
+    template = Template(
+        '\t<k>Filename: <v>{record.filename} '
+        '<k>Converted in: <v>{record.seconds:.1f} s'
+    )
+
+    def __init__(self, entry):
+        self.filename = entry['Filename']
+        self.seconds = entry['Seconds']
+
+    def emit(self, out):
+        out.append(self.template.format(record=self))
+
+
+class ScreenshotConversionFailed(Event):
+    journal_events = ('ScreenshotConversionFailed',)
+
+    template = Template(
+        '\t<k>Filename: <v>{record.source}\n'
+        '\t<k>Error: <v>{record.error}'
+    )
+
+    def __init__(self, entry):
+        self.source = entry['Source']
+        self.error = entry['Error']
+
+    def emit(self, out):
+        out.append(self.template.format(record=self))
+
+
+class JournalOpened(Event):
+    """Made by the monitor when it continues with a new journal"""
+
+    journal_events = ('JournalOpened',)
+
+    template = Template('\t<k>Journal: <v>{record.path}')
+
+    def __init__(self, entry):
+        self.path = entry['Path']
+
+    def emit(self, out):
+        out.append(self.template.format(record=self))
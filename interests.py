@@ -33,11 +33,9 @@ class Interest:
                 binary_body_id = body.parents[0]['Null']
                 first_body_id = body.id
                 binary_partner = None
-                for starsystem, body_ in starsystem_bodies.items():
-                    if (starsystem == current_starsystem
-                            and body_.id != first_body_id
-                            and body_.parents and 'Null' in body_.parents[0]
-                            and body_.parents[0]['Null'] == binary_body_id):
+                system_bodies = starsystem_bodies.system(current_starsystem)
+                for body_ in system_bodies.get_barycentre_bodies(binary_body_id):
+                    if body_.id != first_body_id:
                         binary_partner = body_
                         break
                 self.interests.append(f'Close binary relative to body size.')
@@ -52,9 +50,8 @@ class Interest:
                 self.interests.append('Highly eccentric orbit')
 
             if body.parents and parent_body_type in ['Planet', 'Star']:
-                if (current_starsystem, parent_body_id) in starsystem_bodies:
-
-                    parent_body = starsystem_bodies[(current_starsystem, parent_body_id)]
+                parent_body = starsystem_bodies.get(current_starsystem, parent_body_id)
+                if parent_body is not None:
                     if parent_body.radius * 3 > body.semi_major_axis:
                         self.interests.append('Close orbit relative to parent body size')
 
@@ -0,0 +1,287 @@
+import argparse
+import bisect
+import mmap
+import os
+import re
+from os import listdir
+from os.path import basename, join
+
+import jsoncodec
+from config import config
+
+
+# The event name is the second key of every journal line
+EVENT_NAME = re.compile(rb'"event"\s*:\s*"(\w+)"')
+TIMESTAMP = re.compile(rb'"timestamp"\s*:\s*"([^"]*)"')
+
+
+def logfiles(journal_dir):
+    """Journal files in journal_dir, oldest first"""
+
+    return [
+        join(journal_dir, f) for f in sorted(
+            [f for f in listdir(journal_dir)
+             if f.startswith('Journal') and f.endswith('.log')],
+            key=lambda x: x.split('.')[1:]
+        )
+    ]
+
+
+def timestamp_key(timestamp):
+    """Journal timestamps compare as strings, datetimes are converted"""
+
+    if isinstance(timestamp, str):
+        return timestamp
+
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class JournalFile:
+    """A journal queried by time through mmap
+
+    A sparse index of the timestamp every INDEX_STRIDE bytes is kept in
+    data_dir, so a time range is found without decoding the file. Only the
+    lines in the range are framed and decoded, straight from the mapped
+    file. Journals only grow, the index of a grown file is extended.
+    """
+
+    INDEX_STRIDE = 64 * 1024
+
+    def __init__(self, path, index_dir=None):
+        if index_dir is None:
+            index_dir = join(config['data_dir'], 'journal_index')
+
+        self.path = path
+        self.index_path = join(index_dir, basename(path) + '.json')
+        self.file = None
+        self.buffer = None
+        self.view = None
+        self.size = 0
+        self.index = None
+        self.keys = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        self.file = open(self.path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        if self.size:
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # An empty file can not be mapped
+            self.buffer = b''
+        self.view = memoryview(self.buffer)
+
+    def close(self):
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def line_ends(self, start=0, end=None):
+        """(start, end) offsets of the complete lines, without blank lines"""
+
+        buffer = self.buffer
+        if end is None:
+            end = self.size
+
+        position = start
+        while position < end:
+            newline = buffer.find(b'\n', position, self.size)
+            if newline < 0:
+                # The game is still writing the last line
+                return
+
+            content_end = newline
+            if content_end > position and buffer[content_end - 1] == 13:
+                content_end -= 1
+            if content_end > position:
+                yield position, newline + 1
+
+            position = newline + 1
+
+    def timestamp(self, start, end):
+        match = TIMESTAMP.search(self.buffer, start, end)
+        return match.group(1).decode() if match else ''
+
+    def load_index(self):
+        if self.index is not None:
+            return self.index
+
+        index = None
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as index_file:
+                index = jsoncodec.loads(index_file.read())
+        except (OSError, ValueError):
+            pass
+
+        if index is None or index['size'] > self.size:
+            index = {'size': 0, 'first': '', 'last': '', 'entries': []}
+
+        if index['size'] < self.size:
+            self.extend_index(index)
+            self.save_index(index)
+
+        self.index = index
+        self.keys = [entry[0] for entry in index['entries']]
+        return index
+
+    def extend_index(self, index):
+        entries = index['entries']
+        next_offset = entries[-1][1] + self.INDEX_STRIDE if entries else 0
+        last_line = None
+
+        for line_start, line_end in self.line_ends(index['size']):
+            if line_start >= next_offset:
+                entries.append((self.timestamp(line_start, line_end), line_start))
+                next_offset = line_start + self.INDEX_STRIDE
+            last_line = line_start, line_end
+
+        if last_line is not None:
+            index['size'] = last_line[1]
+            index['last'] = self.timestamp(*last_line)
+        if entries:
+            index['first'] = entries[0][0]
+
+    def save_index(self, index):
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            temp_path = self.index_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as index_file:
+                index_file.write(jsoncodec.dumps(index))
+            os.replace(temp_path, self.index_path)
+        except OSError:
+            pass
+
+    def seek(self, timestamp):
+        """Offset of a line before the first line at or after timestamp"""
+
+        entries = self.load_index()['entries']
+        position = bisect.bisect_left(self.keys, timestamp_key(timestamp))
+        return entries[position - 1][1] if position else 0
+
+    def decode(self, line_start, line_end):
+        with self.view[line_start:line_end] as line:
+            return jsoncodec.loads_buffer(line)
+
+    def events_between(self, start, end, event_names=None):
+        """Entries with start <= timestamp < end, optionally of these events only"""
+
+        start, end = timestamp_key(start), timestamp_key(end)
+        if event_names is not None:
+            event_names = frozenset(event.encode() for event in event_names)
+
+        for line_start, line_end in self.line_ends(self.seek(start)):
+            timestamp = self.timestamp(line_start, line_end)
+            if timestamp >= end:
+                return
+            if timestamp < start:
+                continue
+
+            if event_names is not None:
+                match = EVENT_NAME.search(self.buffer, line_start, line_end)
+                if not match or match.group(1) not in event_names:
+                    continue
+
+            yield self.decode(line_start, line_end)
+
+    def last_before(self, event, timestamp):
+        """The last entry of the event before timestamp, None if there is none"""
+
+        timestamp = timestamp_key(timestamp)
+        index = self.load_index()
+        event_line = re.compile(rb'"event"\s*:\s*"' + re.escape(event.encode()) + rb'"')
+
+        # Blocks between two index entries, the last one that may hold
+        # earlier lines first
+        offsets = [entry[1] for entry in index['entries']] + [index['size']]
+        block = bisect.bisect_left(self.keys, timestamp)
+        for number in range(block - 1, -1, -1):
+            found = None
+            for match in event_line.finditer(self.buffer, offsets[number], offsets[number + 1]):
+                line_start = self.buffer.rfind(b'\n', 0, match.start()) + 1
+                line_end = self.buffer.find(b'\n', match.end()) + 1
+                if self.timestamp(line_start, line_end) >= timestamp:
+                    break
+                found = line_start, line_end
+
+            if found:
+                return self.decode(*found)
+
+        return None
+
+
+class Journals:
+    """Time range queries over all journals in journal_dir"""
+
+    def __init__(self, journal_dir=None, index_dir=None):
+        self.journal_dir = journal_dir or config['journal_dir']
+        self.index_dir = index_dir
+
+    def files(self):
+        return [JournalFile(path, self.index_dir) for path in logfiles(self.journal_dir)]
+
+    def events_between(self, start, end, event_names=None):
+        start, end = timestamp_key(start), timestamp_key(end)
+        for journal in self.files():
+            with journal:
+                index = journal.load_index()
+                if not index['entries'] or index['last'] < start or index['first'] >= end:
+                    continue
+
+                yield from journal.events_between(start, end, event_names)
+
+    def last_before(self, event, timestamp):
+        timestamp = timestamp_key(timestamp)
+        for journal in reversed(self.files()):
+            with journal:
+                index = journal.load_index()
+                if not index['entries'] or index['first'] >= timestamp:
+                    continue
+
+                entry = journal.last_before(event, timestamp)
+                if entry is not None:
+                    return entry
+
+        return None
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Query the journals by time')
+    parser.add_argument('--journal-dir', default=None,
+                        help='directory with Journal*.log files (default: journal_dir)')
+    subparsers = parser.add_subparsers(dest='query', required=True)
+
+    between = subparsers.add_parser('between', help='events between two times')
+    between.add_argument('start', help='e.g. 2021-05-01T12:00:00Z')
+    between.add_argument('end')
+    between.add_argument('events', nargs='*', help='only these events')
+
+    last = subparsers.add_parser('last', help='the last event before a time')
+    last.add_argument('event', help='e.g. Loadout')
+    last.add_argument('timestamp')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    journals = Journals(args.journal_dir)
+
+    if args.query == 'between':
+        for entry in journals.events_between(args.start, args.end, args.events or None):
+            print(jsoncodec.dumps(entry))
+    else:
+        entry = journals.last_before(args.event, args.timestamp)
+        if entry is not None:
+            print(jsoncodec.dumps(entry))
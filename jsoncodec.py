@@ -0,0 +1,45 @@
+import json
+
+from config import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+# Journal lines are decoded with the fastest installed library. Set
+# config['json_codec'] to 'orjson', 'ujson' or 'json' to force one.
+CODECS = {}
+
+if orjson:
+    CODECS['orjson'] = (orjson.loads, lambda obj: orjson.dumps(obj).decode())
+
+if ujson:
+    CODECS['ujson'] = (ujson.loads, ujson.dumps)
+
+CODECS['json'] = (json.loads, json.dumps)
+
+
+def select(preferred='auto'):
+    if preferred in CODECS:
+        return preferred
+
+    return next(iter(CODECS))
+
+
+name = select(config.get('json_codec', 'auto'))
+loads, dumps = CODECS[name]
+
+# Lines of a memory-mapped journal are memoryviews, orjson decodes them
+# without a copy
+if name == 'orjson':
+    loads_buffer = orjson.loads
+else:
+    def loads_buffer(buffer):
+        return loads(bytes(buffer))
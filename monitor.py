@@ -1,25 +1,72 @@
-import codecs
-import time
-import json
+import os
+import pickle
+import sys
 import threading
-from os import listdir, SEEK_CUR
-from os.path import join, isdir, basename
+import time
+from collections import deque
+from os.path import join, isdir, basename, getsize
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 import events
+import journal
+import jsoncodec
+from bodies import StarSystemBodies, SystemBodies
+from bodydb import BodyDatabase
+from companion import CompanionFiles
 from config import config
+from eventqueue import EventQueue
 
 
 class JournalHandler(FileSystemEventHandler):
 
+    EVENT_NAME = journal.EVENT_NAME
+
+    # Under the 'drop' queue policy these are the first to go when the
+    # printer falls behind
+    LOW_PRIORITY_EVENTS = (
+        'Music',
+        'ReceiveText',
+        'FSSDiscoveryScan',
+        'DiscoveryScan',
+        'FuelScoop',
+    )
+
+    # Only the latest of these is worth printing
+    COALESCE_EVENTS = (
+        'Music',
+        'FSSDiscoveryScan',
+        'FuelScoop',
+    )
+
     def __init__(self):
         self.journal_dir = config['journal_dir']
         self.logfile = None
         self.loghandle = None
         self.observer = None
         self.thread = None
-        self.event_queue = []
+        self.partial_line = b''
+        # Where the line of the last entry from the journal starts, None
+        # when the entry is not from the journal
+        self.entry_offset = None
+        self.next_logfiles = deque()
+        self.tracked_events = None
+        self.relevant_events = None
+        self.log_modified = threading.Event()
+        self.companion = None
+        self.checkpoint_path = join(config['data_dir'], 'checkpoint')
+        self.checkpoint_interval = config.get('checkpoint_interval', 30)
+        self.checkpoint_offset = None
+        self.checkpoint_time = 0
+        self.resume_offset = 0
+        self.event_queue = EventQueue(
+            maxsize=config.get('event_queue_size', 10000),
+            policy=config.get('event_queue_policy', 'block'),
+            low_priority=self.LOW_PRIORITY_EVENTS,
+            coalesce=self.COALESCE_EVENTS,
+        )
+        # Incremented on every update of the state
+        self.state_version = 0
         self.state = {
             'Commander': None,
             'Ship_Localised': None,
@@ -32,7 +79,7 @@ class JournalHandler(FileSystemEventHandler):
 
             'Docked': None,
             'StarSystem': None,
-            'StarSystemBodies': {},
+            'StarSystemBodies': StarSystemBodies(),
             'SystemSecurity_Localised': None,
             'Population': 0,
             'Body': None,
@@ -40,6 +87,14 @@ class JournalHandler(FileSystemEventHandler):
 
             'Latitude': None,
             'Longitude': None,
+            'Altitude': None,
+            'Heading': None,
+            'Overheating': None,
+
+            'NavRoute': [],
+            'CargoVessel': None,
+            'CargoCount': 0,
+            'Cargo': {},
 
             'StationName': None,
             'StationType': None,
@@ -49,208 +104,437 @@ class JournalHandler(FileSystemEventHandler):
             'Encoded': {},
         }
 
-    def start(self):
+    def start(self, worker=True):
+        """Start watching the journal
+
+        Without worker the caller reads the entries itself, see
+        read_entries() and runtime.py.
+        """
         if not self.journal_dir or not isdir(self.journal_dir):
             self.stop()
             return False
 
         try:
-            logfiles = sorted(
-                [f for f in listdir(self.journal_dir)
-                 if f.startswith('Journal') and f.endswith('.log')],
-                key=lambda x: x.split('.')[1:]
-            )
+            logfiles = self.logfiles()
             if logfiles:
-                self.logfile = join(self.journal_dir, logfiles[-1]) or None
+                self.logfile = logfiles[-1]
         except OSError:
             self.logfile = None
             return False
 
-        self.observer = Observer()
-        self.observer.daemon = True
-        self.observer.schedule(self, self.journal_dir)
-        self.observer.start()
+        if config.get('body_database', True):
+            self.state['StarSystemBodies'].database = BodyDatabase()
 
-        if not self.running():
+        if self.checkpoint_interval:
+            self.resume()
+
+        if config.get('companion_files', True):
+            self.companion = CompanionFiles(
+                self.journal_dir, config.get('companion_debounce', 0.1))
+
+        if config.get('journal_notifications', True):
+            try:
+                self.observer = Observer()
+                self.observer.daemon = True
+                self.observer.schedule(self, self.journal_dir)
+                self.observer.start()
+            except OSError:
+                self.observer = None
+
+        if worker and not self.running():
             self.thread = threading.Thread(
                 target=self.worker,
                 name='Journal worker')
             self.thread.daemon = True
             self.thread.start()
 
+        if config.get('diagnostics', False):
+            self.report_diagnostics()
+
         return True
 
+    def logfiles(self):
+        """Journal files in journal_dir, oldest first"""
+
+        return journal.logfiles(self.journal_dir)
+
     def stop(self):
+        thread = self.thread
         self.thread = None
+        self.log_modified.set()
+        self.event_queue.close()
         if self.observer:
             self.observer.stop()
             self.observer.join()
             self.observer = None
 
+        # Let the worker write its last checkpoint
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
     def running(self):
         return self.thread and self.thread.is_alive()
 
-    def on_created(self, event):
-        cond1 = not event.is_directory
-        cond2 = basename(event.src_path).startswith('Journal')
-        cond3 = basename(event.src_path).endswith('.log')
-        if cond1 and cond2 and cond3:
-            newlogfile = event.src_path
+    def notifications(self):
+        return self.observer is not None and self.observer.is_alive()
 
-            if self.loghandle:
-                self.loghandle.close()
+    @staticmethod
+    def is_journal(event):
+        filename = basename(event.src_path)
+        return (not event.is_directory and
+                filename.startswith('Journal') and filename.endswith('.log'))
 
-            self.logfile = newlogfile
-            self.loghandle = open(newlogfile, 'r')
+    def companion_modified(self, path):
+        if self.companion is not None and basename(path) in CompanionFiles.FILES:
+            self.companion.notify(basename(path))
+            self.log_modified.set()
 
-            print(self.logfile)
+    def on_modified(self, event):
+        if self.is_journal(event):
+            self.log_modified.set()
+        elif not event.is_directory:
+            self.companion_modified(event.src_path)
+
+    def on_created(self, event):
+        if self.is_journal(event):
+            # The worker switches to it once the current journal is read
+            # to its end
+            self.next_logfiles.append(event.src_path)
+            self.log_modified.set()
+        elif not event.is_directory:
+            self.companion_modified(event.src_path)
+
+    def on_moved(self, event):
+        # A file written next to it and renamed over it
+        if not event.is_directory:
+            self.companion_modified(event.dest_path)
 
     def worker(self):
-        if not self.logfile:
-            return
-        self.loghandle = codecs.open(join(self.journal_dir, self.logfile), 'r', encoding='utf-8')
+        self.open_logfile()
 
         while True:
-            loghandle = self.loghandle
-            if loghandle:
-                loghandle.seek(0, SEEK_CUR)
-                for line in loghandle:
-                    self.parse(line)
+            self.log_modified.clear()
+            for entry in self.read_entries():
+                if (not self.event_queue.put(entry, entry['event'])
+                        and self.event_queue.closed):
+                    # Stopped before the consumer took it
+                    self.unread_entry()
+                    break
 
-            time.sleep(1)
+            self.log_modified.wait(self.wait_timeout())
 
             if threading.current_thread() != self.thread:
+                if self.checkpoint_interval:
+                    self.checkpoint()
                 return
 
+    def open_logfile(self):
+        if self.logfile:
+            self.loghandle = open(self.logfile, 'rb')
+            self.loghandle.seek(self.resume_offset)
+
+    def read_entries(self):
+        """Entries of the tracked events written since the last call
+
+        Reads the journal, the journals started since and the companion
+        files, and checkpoints when it is time to.
+        """
+        while True:
+            if self.loghandle:
+                yield from self.read_lines()
+                # One transaction for the bodies of what has been read
+                self.state['StarSystemBodies'].flush()
+
+            if self.next_logfiles or self.find_next_logfile():
+                # The new journal is read right away, without waiting
+                yield from self.switch_logfile()
+                continue
+
+            break
+
+        if self.companion is not None:
+            yield from self.read_companion_files()
+
+        if (self.checkpoint_interval and
+                time.monotonic() - self.checkpoint_time >= self.checkpoint_interval):
+            self.checkpoint()
+
+    def wait_timeout(self):
+        """Seconds to sleep until the next read_entries()"""
+
+        # Wake up when watchdog reports a write to the journal, and poll
+        # all the same: on Windows watchdog may miss the appends to the
+        # journal the game keeps open.
+        timeout = config.get('journal_poll_interval', 1.0)
+
+        # Wake up when a modified companion file is due to be read
+        due = self.companion.timeout() if self.companion is not None else None
+        if due is not None and (timeout is None or due < timeout):
+            timeout = due
+
+        return timeout
+
+    def find_next_logfile(self):
+        """Look for a newer journal when there are no file system notifications"""
+
+        if self.notifications():
+            return False
+
+        try:
+            logfiles = self.logfiles()
+        except OSError:
+            return False
+
+        if self.logfile in logfiles:
+            newer = logfiles[logfiles.index(self.logfile) + 1:]
+        else:
+            newer = logfiles[-1:]
+
+        self.next_logfiles.extend(newer)
+        return bool(newer)
+
+    def switch_logfile(self):
+        """Read the current journal to its end and continue with the next one"""
+
+        logfile = self.next_logfiles.popleft()
+        if logfile == self.logfile:
+            return
+
+        if self.loghandle:
+            # Lines written after the last read, before the game started
+            # the new journal
+            yield from self.read_lines()
+            if self.partial_line.strip():
+                # The last line of a crashed game
+                try:
+                    entry = self.parse(self.partial_line)
+                except ValueError:
+                    entry = None
+                if entry is not None:
+                    self.entry_offset = self.loghandle.tell() - len(self.partial_line)
+                    yield entry
+            self.state['StarSystemBodies'].flush()
+            self.loghandle.close()
+            self.loghandle = None
+
+        self.logfile = logfile
+        self.partial_line = b''
+        try:
+            self.loghandle = open(logfile, 'rb')
+        except OSError:
+            return
+
+        # Printed in turn with the events, through the sinks
+        entry = self.apply({
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'event': 'JournalOpened',
+            'Path': logfile,
+        })
+        if entry is not None:
+            self.entry_offset = None
+            yield entry
+
+    def read_lines(self):
+        """Entries of the tracked events in the lines read from the journal"""
+
+        for line in self.loghandle:
+            if self.partial_line:
+                line = self.partial_line + line
+                self.partial_line = b''
+
+            # The game may still be writing the last line
+            if not line.endswith(b'\n'):
+                self.partial_line = line
+                break
+
+            if line.strip():
+                entry = self.parse(line)
+                if entry is not None:
+                    self.entry_offset = self.loghandle.tell() - len(line)
+                    yield entry
+
+    def read_companion_files(self):
+        for entry in self.companion.changes(poll=not self.notifications()):
+            entry = self.apply(entry)
+            if entry is not None:
+                self.entry_offset = None
+                yield entry
+
+    def unread_entry(self):
+        """Read the last entry from the journal again, it was never queued
+
+        The journal is rewound to its line, so the next checkpoint does not
+        skip it.
+        """
+        if self.entry_offset is not None and self.loghandle:
+            self.loghandle.seek(self.entry_offset)
+            self.partial_line = b''
+            self.entry_offset = None
+
+    def checkpoint(self):
+        """Save the read position in the journal and the state
+
+        The checkpoint is written to a temporary file first and moved over
+        the previous one, so a crash leaves either the old or the new one.
+        It waits until the consumer has taken all the entries read, those
+        still queued would never be printed after a restart.
+        """
+        if len(self.event_queue):
+            return
+
+        self.checkpoint_time = time.monotonic()
+        if not self.loghandle:
+            return
+
+        offset = self.loghandle.tell() - len(self.partial_line)
+        if (self.logfile, offset) == self.checkpoint_offset:
+            return
+
+        state = dict(self.state)
+        state['StarSystemBodies'] = self.state['StarSystemBodies'].snapshot(
+            config.get('checkpoint_systems', 0))
+        checkpoint = {
+            'logfile': self.logfile,
+            'offset': offset,
+            'state': state,
+        }
+
+        try:
+            os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+            temp_path = self.checkpoint_path + '.tmp'
+            with open(temp_path, 'wb') as checkpoint_file:
+                pickle.dump(checkpoint, checkpoint_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.checkpoint_path)
+        except OSError:
+            return
+
+        self.checkpoint_offset = (self.logfile, offset)
+
+    def resume(self):
+        """Restore the state of the last checkpoint
+
+        Reading continues from the checkpoint if it is in the current journal,
+        otherwise the current journal is read from the start.
+        """
+        try:
+            with open(self.checkpoint_path, 'rb') as checkpoint_file:
+                checkpoint = pickle.load(checkpoint_file)
+        except FileNotFoundError:
+            return False
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Unreadable or from another version of the app
+            return False
+
+        if not self.valid_checkpoint(checkpoint):
+            # From another version of the app, the journal is read from the start
+            return False
+
+        state = dict(checkpoint['state'])
+        self.state['StarSystemBodies'].restore(state.pop('StarSystemBodies'))
+        self.state.update(state)
+        self.state_version += 1
+
+        logfile, offset = checkpoint['logfile'], checkpoint['offset']
+        if logfile == self.logfile and offset <= getsize(logfile):
+            self.resume_offset = offset
+            self.checkpoint_offset = (logfile, offset)
+
+        return True
+
+    @staticmethod
+    def valid_checkpoint(checkpoint):
+        """True when the checkpoint has the layout checkpoint() writes"""
+
+        try:
+            state = checkpoint['state']
+            systems = state['StarSystemBodies']
+            return (
+                isinstance(state, dict)
+                and isinstance(checkpoint['logfile'], (str, type(None)))
+                and isinstance(checkpoint['offset'], int)
+                and isinstance(systems, list)
+                and all(isinstance(star_system, str) and isinstance(system, SystemBodies)
+                        and isinstance(getattr(system, 'size', None), int)
+                        for star_system, system in systems)
+            )
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def track(self, event_names):
+        """Queue only these events for the consumer
+
+        Lines of any other event the monitor does not keep the state for
+        are skipped without decoding them.
+        """
+        self.tracked_events = frozenset(event_names)
+        self.relevant_events = frozenset(
+            event.encode() for event in self.tracked_events.union(events.state_events())
+        )
+
     def parse(self, line):
-        entry = json.loads(line)
-        event = entry['event']
+        """Update the state from a journal line
 
-        if event == 'FSDJump':
-            self.state['BodyType'] = 'Star'
-            for k, v in entry.items():
-                if k in self.state:
-                    self.state[k] = v
-            entry.update({'FuelCapacity': self.state['FuelCapacity']})
-            line = json.dumps(entry, separators=(', ', ':'))
-
-        elif event == 'FuelScoop':
-            self.state['FuelLevel'] = entry['Total']
-
-        elif event in ['RefuelAll', 'RefuelPartial']:
-            self.state['FuelLevel'] += entry['Amount']
-
-        elif event == 'Scan':
-            body_scan = events.Scan(entry).body_scan
-            self.state['StarSystemBodies'].update({
-                (self.state['StarSystem'], entry['BodyID']): body_scan,
-            })
-
-        elif event == 'SupercruiseEntry':
-            self.state['BodyType'] = 'Null'
-
-        elif event == 'SupercruiseExit':
-            for k, v in entry.items():
-                if k in self.state:
-                    self.state[k] = v
-
-        elif event == 'ApproachBody':
-            self.state['BodyType'] = 'Planet'
-            for k, v in entry.items():
-                if k in self.state:
-                    self.state[k] = v
-
-        elif event == 'LeaveBody':
-            self.state['BodyType'] = 'Null'
-            for k, v in entry.items():
-                if k in self.state:
-                    self.state[k] = v
-
-        elif event == 'Touchdown':
-            self.state['Latitude'] = entry.get('Latitude')
-            self.state['Longitude'] = entry.get('Longitude')
-
-        elif event == 'Liftoff':
-            self.state['Latitude'] = None
-            self.state['Longitude'] = None
-
-        elif event == 'Materials':
-            for category in ['Raw', 'Manufactured', 'Encoded']:
-                for material in entry.get(category, []):
-                    count = material['Count']
-                    name = material.get('Name_Localised')
-                    if not name:
-                        name = material['Name']
-                    self.state[category].update({name: count})
-
-        elif event in ['MaterialCollected', 'MaterialDiscarded']:
-            category = entry['Category']
-            count = entry['Count']
-            name = entry.get('Name_Localised')
-            if not name:
-                name = entry['Name']
-
-            if event == 'MaterialCollected':
-                total = self.state[category].get(name, 0) + count
-            elif event == 'MaterialDiscarded':
-                total = self.state[category][name] - count
-
-            self.state[category].update({name: total})
-
-            entry.update({'Total': total})
-            line = json.dumps(entry, separators=(', ', ':'))
-
-        elif event == 'Docked':
-            self.state['Docked'] = True
-            self.state['StationName'] = entry['StationName']
-            self.state['StationType'] = entry['StationType']
-
-        elif event == 'Undocked':
-            self.state['Docked'] = False
-            self.state['StationName'] = None
-            self.state['StationType'] = None
-
-        elif event == 'SetUserShipName':
-            self.state['ShipName'] = entry['UserShipName']
-            self.state['ShipIdent'] = entry['UserShipId']
-
-        elif event in ['ShipyardNew', 'ShipyardSwap']:
-            self.state['Ship_Localised'] = entry.get('ShipType')
-            self.state['ShipName'] = None
-            self.state['ShipIdent'] = None
-
-        elif event == 'Commander':
-            self.state['Commander'] = entry['Name']
-
-        elif event in ['LoadGame', 'Location']:
-            for k, v in entry.items():
-                if k in self.state:
-                    self.state[k] = v
-
-        elif (event == 'Loadout' and
-              not entry['Ship'].lower().endswith('fighter')):
-            self.state['ShipName'] = entry['ShipName']
-            self.state['ShipIdent'] = entry['ShipIdent']
-            fuel_capacity = 0
-            for module in entry['Modules']:
-                if module['Item'].lower().find('fueltank') > -1:
-                    item = module['Item'].split('_')
-                    size = int(item[2][-1])
-                    fuel_capacity += 2 ** size
-            self.state['FuelCapacity'] = fuel_capacity
-
-        elif event == 'NewCommander':
-            self.state['Commander'] = entry['Name']
-
-        self.event_queue.append(line)
-
-    def get_entry(self):
-        if not self.event_queue:
+        Returns the entry when it is one of the tracked events.
+        """
+        entry = self.decode(line)
+        if entry is None:
             return None
 
-        entry = self.event_queue.pop(0)
+        return self.apply(entry)
+
+    def decode(self, line):
+        """Entry of a journal line, None when the event is not relevant"""
+
+        if self.relevant_events is not None:
+            match = self.EVENT_NAME.search(line)
+            if match and match.group(1) not in self.relevant_events:
+                return None
+
+        return jsoncodec.loads(line)
+
+    def apply(self, entry):
+        event = entry['event']
+
+        handler = events.registry.get(event)
+        if handler is not None and handler.updates_state:
+            handler.update_state(self.state, entry)
+            self.state_version += 1
+
+        if self.is_tracked(event):
+            return entry
+
+        return None
+
+    def publish(self, entry):
+        """Queue an entry the app made itself, from any thread
+
+        Only entries of events without a state update, the state belongs
+        to the journal worker.
+        """
+        entry = self.apply(entry)
+        if entry is not None:
+            self.event_queue.put(entry, entry['event'])
+
+    def is_tracked(self, event):
+        return self.tracked_events is None or event in self.tracked_events
+
+    def get_entry(self, timeout=None):
+        return self.event_queue.get(timeout)
+
+    def pending(self):
+        return len(self.event_queue)
+
+    def diagnostics(self):
+        return {
+            'json_codec': jsoncodec.name,
+            'notifications': self.notifications(),
+            'event_queue': self.event_queue.stats(),
+        }
 
-        return entry
+    def report_diagnostics(self, stream=None):
+        stream = stream or sys.stderr
+        stream.write(f'diagnostics: {jsoncodec.dumps(self.diagnostics())}\n')
+        stream.flush()
 
 
 monitor = JournalHandler()
@@ -0,0 +1,59 @@
+from collections import namedtuple
+
+import colorama
+
+from config import config
+
+
+# config['colors'] name -> (Fore, Style) fields of the palette
+FIELDS = {
+    'default': ('d_c', 'd_s'),
+    'event_key': ('ek_c', 'ek_s'),
+    'event_value': ('ev_c', 'ev_s'),
+    'key': ('k_c', 'k_s'),
+    'value': ('v_c', 'v_s'),
+    'interest': ('i_c', 'i_s'),
+    'cmdr_message': ('cm_c', 'cm_s'),
+    'npc_message': ('nm_c', 'nm_s'),
+}
+
+Palette = namedtuple('Palette', [field for fields in FIELDS.values() for field in fields])
+
+_colors = None
+
+# The palette in use, kept up to date by reload()
+active = None
+
+# Called with the new palette whenever it is rebuilt
+listeners = []
+
+
+def build(colors):
+    values = {}
+    for name, (fore_field, style_field) in FIELDS.items():
+        fore, style = colors[name]
+        values[fore_field] = getattr(colorama.Fore, fore)
+        values[style_field] = getattr(colorama.Style, style)
+
+    return Palette(**values)
+
+
+def reload():
+    """Rebuild the palette if config['colors'] has changed"""
+
+    global _colors, active
+
+    colors = tuple(config['colors'].items())
+    if colors != _colors:
+        active = build(config['colors'])
+        _colors = colors
+
+        for listener in listeners:
+            listener(active)
+
+
+def current():
+    """Palette shared by all renderers, rebuilt only when config['colors'] changes"""
+
+    reload()
+    return active
@@ -1,195 +1,95 @@
-import datetime
-import json
-from time import sleep
+import asyncio
 
 import colorama
 
 import events
-from config import config
+import palette
+from console import ConsoleWriter
 from monitor import monitor
+from sinks import Sinks
 
 
 class LogPrinter:
 
-    TRACK_EVENTS = (
-        'LoadGame',
-        'Location',
-        'ApproachBody',
-        'LeaveBody',
-        'Touchdown',
-        'Liftoff',
-        'FSDJump',
-        'SupercruiseEntry',
-        'SupercruiseExit',
-        'DiscoveryScan',
-        'FSSDiscoveryScan',
-        'FSSAllBodiesFound',
-        'FuelScoop',
-        'Shutdown',
-        'LaunchSRV',
-        'DockSRV',
-        'MaterialCollected',
-        'MaterialDiscarded',
-        'Docked',
-        'Undocked',
-        'StartJump',
-        'SRVDestroyed',
-        'Scan',
-        'Screenshot',
-        'DockFighter',
-        'LaunchFighter',
-        'VehicleSwitch',
-        'ShipyardSwap',
-        'ShipyardNew',
-        'ReceiveText',
-        'Died',
-    )
+    TRACK_EVENTS = events.printable_events()
 
     def __init__(self):
         colorama.init()
-        colors = config['colors']
-        self.default_color = getattr(colorama.Fore, colors['default'][0])
-        self.default_style = getattr(colorama.Style, colors['default'][1])
-        self.event_key_style = getattr(colorama.Style, colors['event_key'][1])
-        self.event_value_style = getattr(colorama.Style, colors['event_value'][1])
-        self.event_key_color = getattr(colorama.Fore, colors['event_key'][0])
-        self.event_value_color = getattr(colorama.Fore, colors['event_value'][0])
-        self.key_style = getattr(colorama.Style, colors['key'][1])
-        self.key_color = getattr(colorama.Fore, colors['key'][0])
-        self.value_style = getattr(colorama.Style, colors['value'][1])
-        self.value_color = getattr(colorama.Fore, colors['value'][0])
-        print(f'{self.default_style}')
+        print(f'{palette.current().d_s}')
+        self.console = ConsoleWriter()
+        # Outputs of the live app, a replay writes to the console directly
+        self.sinks = None
+        monitor.track(self.TRACK_EVENTS)
+
+    def start_sinks(self):
+        self.sinks = Sinks(console=self.console)
+        self.sinks.start()
+
+    def stop_sinks(self):
+        if self.sinks is not None:
+            self.sinks.stop()
+            self.sinks = None
 
     def run(self):
         if monitor.start():
+            self.start_sinks()
             try:
                 while True:
-                    entry = monitor.get_entry()
+                    # The timeout keeps Ctrl+C responsive on Windows
+                    entry = monitor.get_entry(timeout=1)
                     if entry:
                         self.print_event(entry)
-                        continue
-                    sleep(1)
             except KeyboardInterrupt:
                 monitor.stop()
-
-    def print_event(self, entry):
-        entry = json.loads(entry)
+                # The entries read before the stop, the last checkpoint
+                # follows them
+                while True:
+                    entry = monitor.get_entry()
+                    if entry is None:
+                        break
+                    self.print_event(entry)
+                if monitor.checkpoint_interval:
+                    monitor.checkpoint()
+                self.stop_sinks()
+
+    async def consume(self, queue):
+        """The printer as a consumer of the asyncio runtime"""
+
+        self.start_sinks()
+        try:
+            while True:
+                entry = await queue.get()
+                self.print_event(entry)
+        finally:
+            # Joins the workers of the sinks, off the loop
+            await asyncio.get_running_loop().run_in_executor(None, self.stop_sinks)
+
+    def print_event(self, entry, prepare=True):
+        """Render the entry for the sinks
+
+        prepare runs the side effects of the event, e.g. the renaming of a
+        screenshot, which a replay of old journals must not repeat.
+        """
         event = entry['event']
 
-        if event not in self.TRACK_EVENTS:
+        handler = events.registry.get(event)
+        if handler is None or not handler.printable:
             return
 
-        timestamp = datetime.datetime.strptime(
-            entry['timestamp'],
-            '%Y-%m-%dT%H:%M:%SZ').strftime('%Y-%m-%d %H:%M:%S')
-
-        entry['timestamp'] = timestamp
-
-        evt_k_s = self.event_key_style
-        evt_v_s = self.event_value_style
-        evt_k_c = self.event_key_color
-        evt_v_c = self.event_value_color
-
-        default_color = self.default_color
-
-        # print(f'{evt_k_c}{evt_k_s}{timestamp}: {evt_v_s}{evt_v_c}{event}{default_color}')
-
-        # record = ''
-        record = f'{evt_k_c}{evt_k_s}{timestamp}: {evt_v_s}{evt_v_c}{event}{default_color}\n'
-
-        if event == 'LoadGame':
-            record += events.LoadGame(entry).schema
-
-        elif event == 'FSSDiscoveryScan':
-            record += events.FSSDiscoveryScan(entry).schema
-
-        elif event == 'FSSAllBodiesFound':
-            record += events.FSSAllBodiesFound(entry).schema
-
-        elif event == 'Scan':
-            record += events.Scan(entry).schema
-
-        elif event == 'Screenshot':
-            screenshot_event = events.Screenshot(entry)
-            is_renamed = screenshot_event.rename()
-            if is_renamed and config.get('convert_screenshots', False):
-                screenshot_event.convert_to_png()
-            record += screenshot_event.schema
-
-        elif event == 'Location':
-            record += events.Location(entry).schema
-
-        elif event == 'ApproachBody':
-            record += events.ApproachBody(entry).schema
-
-        elif event == 'LeaveBody':
-            record += events.LeaveBody(entry).schema
-
-        elif event == 'Touchdown':
-            record += events.Touchdown(entry).schema
+        # 2021-05-01T12:00:00Z -> 2021-05-01 12:00:00
+        timestamp = entry['timestamp'][:19].replace('T', ' ')
 
-        elif event == 'Liftoff':
-            record += events.Liftoff(entry).schema
-
-        elif event == 'FSDJump':
-            record += events.FSDJump(entry).schema
-
-        elif event == 'SupercruiseEntry':
-            record += events.SupercruiseEntry(entry).schema
-
-        elif event == 'SupercruiseExit':
-            record += events.SupercruiseExit(entry).schema
-
-        elif event == 'DiscoveryScan':
-            record += events.DiscoveryScan(entry).schema
-
-        elif event == 'MaterialCollected':
-            record += events.MaterialCollected(entry).schema
-
-        elif event == 'MaterialDiscarded':
-            record += events.MaterialDiscarded(entry).schema
-
-        elif event == 'FuelScoop':
-            entry['FuelCapacity'] = monitor.state['FuelCapacity']
-            record += events.FuelScoop(entry).schema
-
-        elif event == 'Docked':
-            record += events.Docked(entry).schema
-
-        elif event == 'StartJump':
-            schema = events.StartJump(entry).schema
-            if schema:
-                record += schema
-            else:
-                record = record.rstrip()
-
-        elif event == 'ReceiveText':
-            receive_text_event = events.ReceiveText(entry)
-
-            npc_msg_type = receive_text_event.npc_msg_type
-            if npc_msg_type and npc_msg_type in receive_text_event.npc_skip_messages:
-                return
-
-            if npc_msg_type:
-                record = record.replace(
-                    'ReceiveText',
-                    f'ReceiveText: {receive_text_event.channel} ({npc_msg_type})')
-            else:
-                record = record.replace('ReceiveText', f'ReceiveText: {receive_text_event.channel}')
-
-            record += receive_text_event.schema
-
-        elif event == 'ShipyardNew':
-            record += events.ShipyardNew(entry).schema
-
-        elif event == 'ShipyardSwap':
-            record += events.ShipyardSwap(entry).schema
-
-        elif event == 'Died':
-            record += events.Died(entry).schema
+        # The sinks and other consumers of the entry keep the journal timestamp
+        event_record = handler(dict(entry, timestamp=timestamp))
+        if prepare:
+            event_record.prepare()
+        record = event_record.render(timestamp, event)
 
         if record:
-            print(record)
+            if self.sinks is not None:
+                self.sinks.put(entry, record)
+            else:
+                self.console.write(record)
 
 
 printer = LogPrinter()
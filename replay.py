@@ -0,0 +1,266 @@
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from os.path import basename, getsize, join
+
+import events
+from bodies import StarSystemBodies
+from bodydb import BodyDatabase
+from config import config
+from monitor import monitor
+
+
+def start_worker(tracked_events):
+    monitor.track(tracked_events)
+
+
+class JournalBodies(StarSystemBodies):
+    """Bodies scanned in one journal, in memory
+
+    Notes when a body is looked up that was not scanned in the journal,
+    it may have been scanned in one of the journals before.
+    """
+
+    def __init__(self):
+        super().__init__(max_systems=0, max_bytes=0)
+        self.missed = False
+
+    def get(self, star_system, body_id, default=None):
+        body = super().get(star_system, body_id)
+        if body is None:
+            self.missed = True
+            return default
+
+        return body
+
+
+def read_journal(logfile):
+    """Decode a journal in a worker process
+
+    Returns the relevant entries with the body record of every scan.
+    The interests of a scan are found from the bodies scanned before it in
+    the same journal, they are None when they depend on a body the journal
+    does not have. The entry of a scan is None when it is not tracked.
+    """
+    items = []
+    lines = 0
+    errors = 0
+
+    # The system is unknown until the journal names it
+    monitor.state['StarSystem'] = object()
+    monitor.state['StarSystemBodies'] = bodies = JournalBodies()
+
+    with open(logfile, 'rb') as loghandle:
+        for line in loghandle:
+            lines += 1
+            if not line.strip():
+                continue
+
+            try:
+                entry = monitor.decode(line)
+            except ValueError:
+                errors += 1
+                continue
+
+            if entry is None:
+                continue
+
+            body_scan = None
+            if entry['event'] == 'Scan':
+                body_scan = events.Scan.get_body_scan(entry)
+                if body_scan is not None:
+                    bodies.missed = False
+                    events.Scan.add_body(monitor.state, body_scan)
+                    if bodies.missed:
+                        body_scan.interests = None
+                # The entry is passed back only to be printed
+                if not monitor.is_tracked('Scan'):
+                    entry = None
+            else:
+                monitor.apply(entry)
+            items.append((entry, body_scan))
+
+    return items, lines, errors
+
+
+class JournalReplay:
+    """Run every journal in journal_dir through the monitor, oldest first
+
+    The journals are streamed line by line without waiting for the game,
+    through the same parse and state updates as the live monitor. The output
+    is either the rendered events on the console or the scanned bodies
+    rebuilt into the body database.
+
+    With more than one job the journals are decoded by a pool of processes,
+    a few files ahead of the main process. The workers also find the
+    interests of the bodies, the main process applies the entries to the
+    state in journal order and only finds the interests that depend on the
+    journals before. The result is the same as of a sequential run.
+    """
+
+    OUTPUTS = ('text', 'bodies')
+
+    # Seconds between two progress updates
+    PROGRESS_INTERVAL = 0.5
+
+    def __init__(self, output='text', jobs=1, progress=None, database=None):
+        if output not in self.OUTPUTS:
+            raise ValueError(f'Unknown replay output: {output}')
+
+        if progress is None:
+            # Rendered events on the console are progress enough
+            if output == 'text' and sys.stdout.isatty():
+                progress = False
+            else:
+                progress = sys.stderr
+
+        self.output = output
+        self.jobs = jobs
+        self.progress = progress
+        self.database = database
+        self.printer = None
+        self.bodies = None
+
+        self.total_bytes = 0
+        self.read_bytes = 0
+        self.lines = 0
+        self.entries = 0
+        self.errors = 0
+        self.systems = 0
+        self.start_time = None
+        self.last_progress = 0
+
+    def setup(self):
+        if self.output == 'text':
+            # The printer tracks the printable events of the monitor
+            from printer import printer
+            self.printer = printer
+        else:
+            # Only the events the state is kept for are decoded
+            monitor.track(())
+            if self.database is None:
+                self.database = BodyDatabase()
+            # Systems over the memory budget go to a store of their own
+            self.bodies = StarSystemBodies(
+                store_path=join(config['data_dir'], 'replay'), database=self.database)
+            monitor.state['StarSystemBodies'] = self.bodies
+
+    def run(self):
+        self.setup()
+
+        logfiles = monitor.logfiles()
+        self.total_bytes = sum(getsize(logfile) for logfile in logfiles)
+        self.start_time = time.monotonic()
+
+        try:
+            if self.jobs > 1:
+                self.replay_parallel(logfiles)
+            else:
+                for number, logfile in enumerate(logfiles, 1):
+                    self.replay(logfile, f'[{number}/{len(logfiles)}] {basename(logfile)}')
+        finally:
+            if self.printer:
+                self.printer.console.flush()
+            if self.bodies is not None:
+                self.systems = len(self.bodies.systems) + len(self.bodies.stored)
+                self.bodies.close()
+
+        self.report()
+
+    def replay(self, logfile, name):
+        with open(logfile, 'rb') as loghandle:
+            for line in loghandle:
+                self.read_bytes += len(line)
+                self.lines += 1
+
+                if not line.strip():
+                    continue
+
+                try:
+                    entry = monitor.parse(line)
+                except ValueError:
+                    # Truncated line of a crashed game
+                    self.errors += 1
+                    continue
+
+                if entry is not None:
+                    self.output_entry(entry)
+
+                if time.monotonic() - self.last_progress >= self.PROGRESS_INTERVAL:
+                    self.show_progress(name)
+
+        self.show_progress(name)
+
+    def replay_parallel(self, logfiles):
+        with ProcessPoolExecutor(self.jobs, initializer=start_worker,
+                                 initargs=(monitor.tracked_events,)) as executor:
+            # Decoded journals wait in memory only a few files ahead
+            queued = iter(logfiles)
+            pending = deque()
+            for logfile in queued:
+                pending.append((logfile, executor.submit(read_journal, logfile)))
+                if len(pending) >= self.jobs * 2:
+                    break
+
+            number = 0
+            while pending:
+                logfile, future = pending.popleft()
+                for next_logfile in queued:
+                    pending.append((next_logfile, executor.submit(read_journal, next_logfile)))
+                    break
+
+                items, lines, errors = future.result()
+                for entry, body_scan in items:
+                    self.apply(entry, body_scan)
+
+                number += 1
+                self.read_bytes += getsize(logfile)
+                self.lines += lines
+                self.errors += errors
+                self.show_progress(f'[{number}/{len(logfiles)}] {basename(logfile)}')
+
+    def apply(self, entry, body_scan):
+        if body_scan is None:
+            entry = monitor.apply(entry)
+        elif body_scan.interests is None:
+            events.Scan.add_body(monitor.state, body_scan)
+        else:
+            monitor.state['StarSystemBodies'].add(monitor.state['StarSystem'], body_scan)
+
+        if entry is not None:
+            self.output_entry(entry)
+
+    def output_entry(self, entry):
+        self.entries += 1
+        if self.printer:
+            # Only rendered, the screenshots of old entries are not renamed
+            self.printer.print_event(entry, prepare=False)
+
+    def show_progress(self, name):
+        self.last_progress = time.monotonic()
+        if not self.progress:
+            return
+
+        elapsed = self.last_progress - self.start_time
+        mb = self.read_bytes / 1e6
+        line = (
+            f'{name} {mb:,.1f}/{self.total_bytes / 1e6:,.1f} MB '
+            f'{mb / elapsed if elapsed else 0:,.1f} MB/s'
+        )
+        self.progress.write(f'\r{line:<79}')
+        self.progress.flush()
+
+    def report(self):
+        if not self.progress:
+            return
+
+        elapsed = time.monotonic() - self.start_time
+        if self.bodies is not None:
+            result = f'{self.systems:,d} systems saved to {self.database.path}'
+        else:
+            result = f'{self.entries:,d} events'
+        self.progress.write(
+            f'\n{self.lines:,d} lines, {result}, '
+            f'{self.errors:,d} bad lines in {elapsed:.1f} s\n'
+        )
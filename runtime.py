@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+from config import config
+from monitor import monitor
+
+
+class LoopEvent:
+    """Drop-in for the log_modified threading.Event of the monitor
+
+    watchdog sets it from its observer thread, the tailer task awaits it.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def set(self):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.event.set)
+
+    def clear(self):
+        self.event.clear()
+
+    async def wait(self, timeout=None):
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class LoopQueue:
+    """Drop-in for the event_queue of the monitor
+
+    Entries put from other threads, e.g. by the screenshot converter, are
+    handed to the loop, which puts them on the queues of the consumers, or
+    drops them when a queue is full. Its length is that of the fullest queue.
+    """
+
+    def __init__(self, loop, queues):
+        self.loop = loop
+        self.queues = queues
+        self.closed = False
+        self.dropped = 0
+
+    def __len__(self):
+        return max((queue.qsize() for queue in self.queues), default=0)
+
+    def put(self, entry, event=None):
+        if self.closed or self.loop.is_closed():
+            return False
+
+        self.loop.call_soon_threadsafe(self.dispatch, entry)
+        return True
+
+    def dispatch(self, entry):
+        for queue in self.queues:
+            try:
+                queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def stats(self):
+        """Depths of the queues of the consumers, like EventQueue.stats()"""
+
+        depths = [queue.qsize() for queue in self.queues]
+        return {
+            'depth': max(depths, default=0),
+            'depths': depths,
+            'maxsize': max((queue.maxsize for queue in self.queues), default=0),
+            'dropped': self.dropped,
+        }
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncRuntime:
+    """The monitor and its consumers as tasks of one event loop
+
+    A tailer task reads the journal and the companion files when watchdog
+    reports a write and hands every entry to the queue of each consumer.
+    A consumer is a coroutine function taking its asyncio.Queue, e.g.
+    LogPrinter.consume. Besides the loop there are the observer thread of
+    watchdog, the workers of the screenshot converter and those of the sinks,
+    which block on the console, the log files and the socket clients. The
+    state server runs on the loop.
+
+    The queues are bounded by event_queue_size and the tailer waits for
+    a full one, like the 'block' policy of the threaded runtime.
+    """
+
+    def __init__(self, handler=None, queue_size=None):
+        if queue_size is None:
+            queue_size = config.get('event_queue_size', 10000)
+
+        self.handler = handler or monitor
+        self.queue_size = queue_size
+        self.consumers = []
+        self.queues = []
+
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+
+    def run(self):
+        try:
+            asyncio.run(self.main())
+        except KeyboardInterrupt:
+            pass
+
+    async def main(self):
+        handler = self.handler
+        loop = asyncio.get_running_loop()
+        self.queues = [asyncio.Queue(self.queue_size) for _ in self.consumers]
+        handler.log_modified = LoopEvent(loop)
+        handler.event_queue = LoopQueue(loop, self.queues)
+        if not handler.start(worker=False):
+            return
+
+        tasks = [
+            asyncio.create_task(consumer(queue))
+            for consumer, queue in zip(self.consumers, self.queues)
+        ]
+
+        try:
+            await self.tail()
+        finally:
+            # The entries read before the stop, the last checkpoint follows
+            # them unless a consumer is gone
+            await self.drain(tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            handler.stop()
+            if handler.checkpoint_interval:
+                handler.checkpoint()
+
+    async def tail(self):
+        handler = self.handler
+        handler.open_logfile()
+
+        while True:
+            handler.log_modified.clear()
+            for entry in handler.read_entries():
+                try:
+                    for queue in self.queues:
+                        await queue.put(entry)
+                except asyncio.CancelledError:
+                    # Stopped before the consumers took it
+                    handler.unread_entry()
+                    raise
+
+            await handler.log_modified.wait(handler.wait_timeout())
+
+    async def drain(self, tasks, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and any(
+                queue.qsize() and not task.done()
+                for queue, task in zip(self.queues, tasks)):
+            await asyncio.sleep(0.01)
@@ -1,6 +1,8 @@
 import os
-import subprocess
-from os.path import join, isfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from os.path import basename, join, isfile
 
 from config import config
 
@@ -32,12 +34,76 @@ def rename(filename, body_name, timestamp, latitude=None, longitude=None):
     return newfilename
 
 
-def convert_to_png(filename):
-    screenshots_dir = config['screenshots_dir']
-    file_path = join(screenshots_dir, filename)
+class ScreenshotConverter:
+    """Pool of workers converting the screenshots to .png
+
+    The screenshots wait in the queue of the pool, which is started with the
+    first one and converts screenshot_workers of them at a time in threads
+    or processes. report() is called from a worker with an entry of the
+    ScreenshotConverted or the ScreenshotConversionFailed event.
+    """
+
+    def __init__(self, workers=None, pool=None):
+        if workers is None:
+            workers = config.get('screenshot_workers', 2)
+        if pool is None:
+            pool = config.get('screenshot_pool', 'thread')
+        if pool not in ('thread', 'process'):
+            raise ValueError(f'Unknown screenshot pool: {pool}')
+
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = pool
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def submit(self, file_path, report):
+        # Pillow is loaded with the first screenshot
+        from convert_to_png import convert
+
+        with self.lock:
+            if self.executor is None:
+                if self.pool == 'process':
+                    self.executor = ProcessPoolExecutor(self.workers)
+                else:
+                    self.executor = ThreadPoolExecutor(
+                        self.workers, thread_name_prefix='Screenshot converter')
+
+        started = time.monotonic()
+        future = self.executor.submit(
+            convert, file_path,
+            compress_level=config.get('png_compress_level', 6),
+            optimize=config.get('png_optimize', False),
+            atomic=config.get('png_atomic_write', True))
+        future.add_done_callback(
+            lambda future: report(self.result(file_path, started, future)))
+
+    @staticmethod
+    def result(file_path, started, future):
+        entry = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'Source': basename(file_path),
+            'Seconds': time.monotonic() - started,
+        }
+        try:
+            entry['Filename'] = basename(future.result())
+            entry['event'] = 'ScreenshotConverted'
+        except Exception as error:
+            entry['event'] = 'ScreenshotConversionFailed'
+            entry['Error'] = str(error) or type(error).__name__
+
+        return entry
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait)
+                self.executor = None
+
+
+converter = ScreenshotConverter()
+
+
+def convert_to_png(filename, report):
+    """Queue the renamed screenshot for the converter"""
 
-    subprocess.Popen(
-        ['python', 'convert_to_png.py', file_path],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT
-    )
+    converter.submit(join(config['screenshots_dir'], filename), report)
@@ -0,0 +1,349 @@
+import asyncio
+import base64
+import hashlib
+import struct
+import threading
+
+import jsoncodec
+from bodydb import COLUMNS, body_row
+from config import config
+from monitor import monitor
+from sinks import ANSI_CODE, listen
+
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+def websocket_frame(payload, opcode=OPCODE_TEXT):
+    """An unmasked server frame"""
+
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 2 ** 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    """Opcode and payload of a frame of a client, clients mask their frames"""
+
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', await reader.readexactly(8))
+
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+
+    return first & 0x0F, payload
+
+
+class StateServer:
+    """Local HTTP and WebSocket server of the state and the printed events
+
+        GET /state    snapshot of monitor.state as JSON
+        GET /metrics  metrics of the sinks
+        GET /events   WebSocket: a snapshot, then diffs of the state and the
+                      printed events
+
+    The snapshot is rebuilt only when monitor.state_version has changed and
+    there is a client, and every message is encoded once for all clients:
+
+        {"type": "snapshot", "version": 7, "state": {...}}
+        {"type": "diff", "version": 8, "changed": {...}, "removed": [...]}
+        {"type": "event", "version": 8, "entry": {...}, "record": "..."}
+
+    A client whose queue of client_queue_size messages is full is
+    disconnected, it gets a new snapshot when it connects again.
+
+    The server runs on the event loop of the asyncio runtime, or on a
+    thread with a loop of its own. It is fed like a sink, put() only hands
+    the event to the loop.
+    """
+
+    name = 'server'
+
+    def __init__(self, host=None, port=None, client_queue_size=None, metrics=None):
+        if host is None:
+            host = config.get('server_host', '127.0.0.1')
+        if port is None:
+            port = config.get('server_port', 20502)
+        if client_queue_size is None:
+            client_queue_size = config.get('server_client_queue_size', 1000)
+
+        self.host = host
+        self.port = port
+        self.client_queue_size = client_queue_size
+        self.sink_metrics = metrics
+        self.socket = None
+        self.loop = None
+        self.thread = None
+        self.task = None
+        self.server = None
+        self.clients = set()
+
+        self.version = None
+        self.state = {}
+        self.snapshot_json = b'{}'
+
+        self.snapshots = 0
+        self.messages = 0
+        self.disconnected = 0
+
+    def start(self):
+        # Bound right here, so a port that is taken raises OSError to
+        # Sinks.start(), which leaves the server out
+        self.socket = listen((self.host, self.port))
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None:
+            self.loop = loop
+            self.task = loop.create_task(self.serve())
+            return
+
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run_thread, args=(started,), name='State server')
+        self.thread.daemon = True
+        self.thread.start()
+        started.wait(5)
+
+    def run_thread(self, started):
+        asyncio.set_event_loop(self.loop)
+        self.task = self.loop.create_task(self.serve(started))
+        self.loop.run_forever()
+
+    async def serve(self, started=None):
+        try:
+            self.server = await asyncio.start_server(self.handle, sock=self.socket)
+        finally:
+            if started is not None:
+                started.set()
+
+        while True:
+            # Changes of the state outside of the printed events, e.g. Status.json
+            await asyncio.sleep(config.get('server_state_interval', 0.25))
+            if self.clients:
+                self.update_state()
+
+    def address(self):
+        """(host, port) the server listens on, the port may have been 0"""
+
+        return self.server.sockets[0].getsockname()[:2]
+
+    def put(self, entry, record):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.publish, entry, record)
+
+    def stop(self, timeout=5):
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop)
+        if self.thread is not None:
+            future.result(timeout)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
+            if not self.thread.is_alive():
+                # A second stop() returns right away
+                self.loop.close()
+
+    async def shutdown(self):
+        if self.task is not None:
+            self.task.cancel()
+        if self.server is not None:
+            self.server.close()
+        for queue in list(self.clients):
+            self.close_client(queue)
+
+    def metrics(self):
+        return {
+            'name': self.name,
+            'clients': len(self.clients),
+            'snapshots': self.snapshots,
+            'messages': self.messages,
+            'disconnected': self.disconnected,
+            'version': self.version,
+            # Dropped clients, not events: they are sent a new snapshot
+            'dropped': 0,
+            'errors': 0,
+        }
+
+    def build_snapshot(self):
+        state = {key: value for key, value in monitor.state.items()
+                 if key != 'StarSystemBodies'}
+        star_system = state.get('StarSystem')
+        bodies = []
+        if star_system:
+            for body in list(monitor.state['StarSystemBodies'].system(star_system)):
+                record = dict(zip(COLUMNS[1:], body_row(star_system, body)[1:]))
+                record['interests'] = list(body.interests or ())
+                bodies.append(record)
+        state['Bodies'] = bodies
+
+        # Copies of the nested values, they are changed in place
+        return jsoncodec.loads(jsoncodec.dumps(state))
+
+    def update_state(self):
+        version = monitor.state_version
+        if version == self.version:
+            return
+
+        try:
+            state = self.build_snapshot()
+        except RuntimeError:
+            # Changed by the journal worker meanwhile, next time
+            return
+
+        changed = {key: value for key, value in state.items()
+                   if self.state.get(key) != value}
+        removed = [key for key in self.state if key not in state]
+
+        self.snapshots += 1
+        self.version = version
+        self.state = state
+        self.snapshot_json = jsoncodec.dumps(
+            {'type': 'snapshot', 'version': version, 'state': state}).encode()
+
+        if changed or removed:
+            self.broadcast({'type': 'diff', 'version': version,
+                            'changed': changed, 'removed': removed})
+
+    def publish(self, entry, record):
+        # Without clients the snapshot waits for the next request
+        if not self.clients:
+            return
+
+        self.update_state()
+        self.broadcast({'type': 'event', 'version': self.version,
+                        'entry': entry, 'record': ANSI_CODE.sub('', record)})
+
+    def broadcast(self, message):
+        if not self.clients:
+            return
+
+        frame = websocket_frame(jsoncodec.dumps(message).encode())
+        self.messages += 1
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self.disconnected += 1
+                self.close_client(queue)
+
+    def close_client(self, queue):
+        self.clients.discard(queue)
+        # Tells the writer of the client to close the connection
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+
+        lines = request.decode('latin-1').split('\r\n')
+        method, path = (lines[0].split(' ') + ['', ''])[:2]
+        headers = {}
+        for line in lines[1:]:
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        try:
+            if method != 'GET':
+                await self.respond(writer, 405, b'')
+            elif path == '/events' and headers.get('upgrade', '').lower() == 'websocket':
+                await self.websocket(reader, writer, headers)
+            elif path == '/state':
+                self.update_state()
+                if headers.get('if-none-match') == f'"{self.version}"':
+                    await self.respond(writer, 304, b'')
+                else:
+                    await self.respond(writer, 200, self.snapshot_json,
+                                       {'ETag': f'"{self.version}"'})
+            elif path == '/metrics':
+                metrics = self.sink_metrics() if self.sink_metrics else [self.metrics()]
+                await self.respond(writer, 200, jsoncodec.dumps(metrics).encode())
+            else:
+                await self.respond(writer, 404, b'')
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, body, headers=None):
+        reasons = {200: 'OK', 304: 'Not Modified', 404: 'Not Found',
+                   405: 'Method Not Allowed'}
+        head = [f'HTTP/1.1 {status} {reasons[status]}', 'Connection: close',
+                f'Content-Length: {len(body)}']
+        if body:
+            head.append('Content-Type: application/json')
+        head.extend(f'{key}: {value}' for key, value in (headers or {}).items())
+
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        await writer.drain()
+
+    async def websocket(self, reader, writer, headers):
+        key = headers.get('sec-websocket-key', '')
+        accept = base64.b64encode(
+            hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write((
+            'HTTP/1.1 101 Switching Protocols\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            f'Sec-WebSocket-Accept: {accept}\r\n\r\n'
+        ).encode())
+
+        self.update_state()
+        queue = asyncio.Queue(self.client_queue_size)
+        queue.put_nowait(websocket_frame(self.snapshot_json))
+        self.clients.add(queue)
+
+        receiver = asyncio.create_task(self.receive(reader, queue))
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    writer.write(websocket_frame(b'', OPCODE_CLOSE))
+                    break
+                writer.write(frame)
+                await writer.drain()
+        finally:
+            self.clients.discard(queue)
+            receiver.cancel()
+
+    async def receive(self, reader, queue):
+        """Answers pings and ends the connection on a close frame"""
+
+        try:
+            while True:
+                opcode, payload = await read_websocket_frame(reader)
+                if opcode == OPCODE_CLOSE:
+                    break
+                if opcode == OPCODE_PING:
+                    queue.put_nowait(websocket_frame(payload, OPCODE_PONG))
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.QueueFull):
+            pass
+
+        self.close_client(queue)
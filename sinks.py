@@ -0,0 +1,346 @@
+import os
+import socket
+import sys
+import threading
+import time
+from os.path import join
+
+import jsoncodec
+from config import config
+from console import ANSI_CODE, ConsoleWriter
+from eventqueue import EventQueue
+
+
+def listen(address):
+    """A TCP socket listening on address, what socket.create_server() of
+    Python 3.8 does"""
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if os.name == 'posix':
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(address)
+        server.listen()
+    except OSError:
+        server.close()
+        raise
+
+    return server
+
+
+class Sink:
+    """An output of the printed events with a queue and a worker of its own
+
+    With the 'discard' policy put() never waits: when the queue is full the
+    event is dropped, so a sink that falls behind holds up neither the
+    printer nor the other sinks. The console blocks instead and loses
+    nothing. The worker writes the events and flushes once the queue is
+    empty. lag is the time from put() until the last event was written.
+    """
+
+    name = None
+    policy = 'discard'
+
+    def __init__(self, queue_size=None):
+        if queue_size is None:
+            queue_size = config.get('sink_queue_size', 10000)
+
+        self.queue = EventQueue(maxsize=queue_size, policy=self.policy)
+        self.thread = None
+        self.delivered = 0
+        self.errors = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        self.open()
+        self.thread = threading.Thread(target=self.worker, name=f'{self.name} sink')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, entry, record):
+        self.queue.put((time.monotonic(), entry, record))
+
+    def worker(self):
+        queue = self.queue
+        while True:
+            item = queue.get(timeout=1)
+            if item is None:
+                if queue.closed:
+                    break
+                continue
+
+            queued, entry, record = item
+            try:
+                self.write(entry, record)
+            except Exception:
+                # e.g. a character the console can not encode, the next
+                # event is written all the same
+                self.errors += 1
+
+            self.delivered += 1
+            self.lag = time.monotonic() - queued
+            self.max_lag = max(self.max_lag, self.lag)
+
+            if not len(queue):
+                self.safe_flush()
+
+        self.safe_flush()
+        self.close()
+
+    def safe_flush(self):
+        try:
+            self.flush()
+        except Exception:
+            self.errors += 1
+
+    def stop(self, timeout=5):
+        """Write out the queued events and stop the worker"""
+
+        self.queue.close()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def metrics(self):
+        metrics = self.queue.stats()
+        metrics.update(
+            name=self.name,
+            delivered=self.delivered,
+            errors=self.errors,
+            lag=self.lag,
+            max_lag=self.max_lag,
+        )
+        return metrics
+
+    def open(self):
+        pass
+
+    def write(self, entry, record):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleSink(Sink):
+    name = 'console'
+    # The printer waits for the console, like it did before the sinks
+    policy = 'block'
+
+    def __init__(self, console=None, queue_size=None):
+        super().__init__(queue_size)
+        self.console = console or ConsoleWriter()
+
+    def write(self, entry, record):
+        self.console.write(record)
+
+    def flush(self):
+        self.console.flush()
+
+
+class RotatingFile:
+    """A log file in data_dir moved to name.1, name.2, ... at max_bytes"""
+
+    def __init__(self, path, max_bytes=None, backups=None):
+        if max_bytes is None:
+            max_bytes = config.get('sink_log_max_bytes', 10 * 2 ** 20)
+        if backups is None:
+            backups = config.get('sink_log_backups', 5)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file = None
+        self.size = 0
+
+    def open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.size = self.file.tell()
+
+    def write(self, text):
+        # Characters, close enough to bytes for the size of a log
+        if self.max_bytes and self.size and self.size + len(text) > self.max_bytes:
+            self.rotate()
+
+        self.file.write(text)
+        self.size += len(text)
+
+    def rotate(self):
+        self.file.close()
+        for number in range(self.backups - 1, 0, -1):
+            backup = f'{self.path}.{number}'
+            if os.path.exists(backup):
+                os.replace(backup, f'{self.path}.{number + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self.open()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class TextSink(Sink):
+    """The printed records without colors in a rotating log"""
+
+    name = 'text'
+
+    def __init__(self, path=None, queue_size=None):
+        super().__init__(queue_size)
+        self.log = RotatingFile(path or join(config['data_dir'], 'events.log'))
+
+    def open(self):
+        self.log.open()
+
+    def write(self, entry, record):
+        self.log.write(ANSI_CODE.sub('', record) + '\n')
+
+    def flush(self):
+        self.log.flush()
+
+    def close(self):
+        self.log.close()
+
+
+class JsonlSink(TextSink):
+    """The journal entries of the printed events as JSON lines in a rotating log"""
+
+    name = 'jsonl'
+
+    def __init__(self, path=None, queue_size=None):
+        super().__init__(path or join(config['data_dir'], 'events.jsonl'), queue_size)
+
+    def write(self, entry, record):
+        self.log.write(jsoncodec.dumps(entry) + '\n')
+
+
+class SocketSink(Sink):
+    """The journal entries as JSON lines to every client of a local TCP port
+
+    A client that does not take a line within send_timeout seconds is
+    disconnected.
+    """
+
+    name = 'socket'
+
+    def __init__(self, host='127.0.0.1', port=None, send_timeout=1.0, queue_size=None):
+        super().__init__(queue_size)
+        if port is None:
+            port = config.get('sink_socket_port', 20501)
+
+        self.address = (host, port)
+        self.send_timeout = send_timeout
+        self.server = None
+        self.clients = []
+        self.lock = threading.Lock()
+
+    def open(self):
+        self.server = listen(self.address)
+        thread = threading.Thread(target=self.accept, name='socket sink clients')
+        thread.daemon = True
+        thread.start()
+
+    def accept(self):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                # The server is closed
+                return
+
+            client.settimeout(self.send_timeout)
+            with self.lock:
+                self.clients.append(client)
+
+    def write(self, entry, record):
+        data = (jsoncodec.dumps(entry) + '\n').encode()
+        with self.lock:
+            clients = list(self.clients)
+
+        for client in clients:
+            try:
+                client.sendall(data)
+            except OSError:
+                self.disconnect(client)
+
+    def disconnect(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        client.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            client.close()
+
+
+SINKS = {
+    'console': ConsoleSink,
+    'text': TextSink,
+    'jsonl': JsonlSink,
+    'socket': SocketSink,
+    # server.StateServer, created by Sinks
+    'server': None,
+}
+
+
+class Sinks:
+    """The sinks of config['sinks'], fed by the printer"""
+
+    def __init__(self, names=None, console=None):
+        if names is None:
+            names = config.get('sinks', ['console'])
+
+        self.sinks = []
+        for name in names:
+            if name not in SINKS:
+                raise ValueError(f'Unknown sink: {name}')
+            if name == 'console':
+                self.sinks.append(ConsoleSink(console))
+            elif name == 'server':
+                # The server needs the monitor, which the sinks do not
+                from server import StateServer
+                self.sinks.append(StateServer(metrics=self.metrics))
+            else:
+                self.sinks.append(SINKS[name]())
+
+    def start(self):
+        for sink in list(self.sinks):
+            try:
+                sink.start()
+            except OSError as error:
+                # e.g. the port of the socket sink is taken
+                sys.stderr.write(f'{sink.name} sink not started: {error}\n')
+                self.sinks.remove(sink)
+
+    def put(self, entry, record):
+        for sink in self.sinks:
+            sink.put(entry, record)
+
+    def stop(self):
+        for sink in self.sinks:
+            sink.stop()
+
+        for metrics in self.metrics():
+            if metrics['dropped'] or metrics['errors']:
+                sys.stderr.write(
+                    f'{metrics["name"]} sink: {metrics["dropped"]:,d} events dropped, '
+                    f'{metrics["errors"]:,d} write errors\n'
+                )
+
+    def metrics(self):
+        return [sink.metrics() for sink in self.sinks]
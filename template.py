@@ -0,0 +1,44 @@
+import re
+
+import palette
+
+
+class Template:
+    """Layout of a record compiled once into a format string
+
+    The layout is a str.format string where <name> marks a palette colour:
+    <k_c>, <v_s>, ... for one field, or <k>, <v>, <i>, <cm>, <nm> for the
+    style and colour pair. The colours are substituted when the template is
+    compiled, so template.format() is the plain format() of the compiled
+    string. All templates are recompiled when the palette changes.
+    """
+
+    COLOR = re.compile(r'<(\w+)>')
+
+    instances = []
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.compile(palette.current())
+        self.instances.append(self)
+
+    def compile(self, colors):
+        def color(match):
+            name = match.group(1)
+            if name in colors._fields:
+                code = getattr(colors, name)
+            else:
+                code = getattr(colors, f'{name}_s') + getattr(colors, f'{name}_c')
+            # Colour codes are literal text in the format string
+            return code.replace('{', '{{').replace('}', '}}')
+
+        self.compiled = self.COLOR.sub(color, self.layout)
+        self.format = self.compiled.format
+
+    @classmethod
+    def recompile(cls, colors):
+        for template in cls.instances:
+            template.compile(colors)
+
+
+palette.listeners.append(Template.recompile)
@@ -0,0 +1,59 @@
+import copy
+import json
+import os
+import sys
+import tempfile
+from os.path import abspath, dirname, join
+
+import pytest
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+# config.py looks the folders of the game up in the registry of Windows,
+# unless folders of the configured names exist
+os.chdir(tempfile.mkdtemp())
+os.mkdir('default')
+
+import events  # noqa: E402,F401 (events has to be imported before monitor)
+from config import config  # noqa: E402
+from monitor import monitor  # noqa: E402
+
+
+@pytest.fixture
+def app_dirs(tmp_path):
+    """Journal, screenshots and data folders of their own for a test
+
+    The state and the tracked events of the monitor are restored afterwards.
+    """
+    dirs = {}
+    for name in ('journal_dir', 'screenshots_dir', 'data_dir'):
+        dirs[name] = str(tmp_path / name)
+        os.mkdir(dirs[name])
+
+    saved_config = {name: config[name] for name in dirs}
+    saved_state = copy.deepcopy(
+        {key: value for key, value in monitor.state.items() if key != 'StarSystemBodies'})
+    saved_bodies = monitor.state['StarSystemBodies']
+    saved_tracking = monitor.tracked_events, monitor.relevant_events
+
+    config.update(dirs)
+    monitor.journal_dir = dirs['journal_dir']
+    yield dirs
+
+    config.update(saved_config)
+    monitor.journal_dir = config['journal_dir']
+    monitor.state.update(saved_state)
+    monitor.state['StarSystemBodies'] = saved_bodies
+    monitor.tracked_events, monitor.relevant_events = saved_tracking
+
+
+@pytest.fixture
+def write_journal(app_dirs):
+    """Write the entries to a journal of that name in journal_dir"""
+
+    def write(name, entries):
+        with open(join(app_dirs['journal_dir'], name), 'w', encoding='utf-8') as log:
+            for entry in entries:
+                log.write(json.dumps(entry) + '\r\n')
+
+    return write
@@ -0,0 +1,89 @@
+import pickle
+from os.path import join
+
+import pytest
+
+from config import config
+from eventqueue import EventQueue
+from monitor import JournalHandler
+
+
+def music(number):
+    return {'timestamp': '2021-05-01T12:00:00Z', 'event': 'Music', 'MusicTrack': f'Track {number}'}
+
+
+def journal_handler(data_dir, queue_size=0):
+    handler = JournalHandler()
+    handler.event_queue = EventQueue(maxsize=queue_size)
+    handler.checkpoint_path = join(data_dir, 'checkpoint')
+    handler.track(('Music',))
+    return handler
+
+
+def test_checkpoint_follows_the_consumer(app_dirs, write_journal, monkeypatch):
+    monkeypatch.setitem(config, 'journal_notifications', False)
+    monkeypatch.setitem(config, 'companion_files', False)
+    write_journal('Journal.2021-05-01T120000.01.log', [music(number) for number in range(100)])
+
+    # The worker waits for the consumer with 10 entries queued
+    handler = journal_handler(app_dirs['data_dir'], queue_size=10)
+    assert handler.start()
+    taken = [handler.get_entry(timeout=5) for _ in range(5)]
+    handler.checkpoint()
+
+    handler.stop()
+    while True:
+        entry = handler.get_entry()
+        if entry is None:
+            break
+        taken.append(entry)
+    handler.checkpoint()
+
+    # The next start continues right after the last entry taken
+    handler = journal_handler(app_dirs['data_dir'])
+    assert handler.start(worker=False)
+    handler.open_logfile()
+    rest = list(handler.read_entries())
+    handler.stop()
+
+    tracks = [entry['MusicTrack'] for entry in taken + rest]
+    assert 5 <= len(taken) < 100
+    assert tracks == [f'Track {number}' for number in range(100)]
+
+
+def test_checkpoint_waits_for_queued_entries(app_dirs, write_journal):
+    write_journal('Journal.2021-05-01T120000.01.log', [music(number) for number in range(3)])
+
+    handler = journal_handler(app_dirs['data_dir'])
+    handler.logfile = join(app_dirs['journal_dir'], 'Journal.2021-05-01T120000.01.log')
+    handler.open_logfile()
+    for entry in handler.read_entries():
+        handler.event_queue.put(entry, entry['event'])
+
+    handler.checkpoint()
+    assert handler.checkpoint_offset is None
+
+    while handler.get_entry() is not None:
+        pass
+    handler.checkpoint()
+    assert handler.checkpoint_offset is not None
+
+
+@pytest.mark.parametrize('checkpoint', [
+    {'offset': 10, 'state': {'StarSystemBodies': []}},
+    {'logfile': None, 'offset': 10},
+    {'logfile': None, 'offset': 10, 'state': {'StarSystemBodies': {'Sol': None}}},
+    {'logfile': None, 'offset': 10, 'state': {'StarSystemBodies': [('Sol', 1, 2)]}},
+    {'logfile': None, 'offset': '10', 'state': {'StarSystemBodies': []}},
+    ['logfile', 'offset', 'state'],
+])
+def test_resume_ignores_checkpoints_of_another_layout(app_dirs, write_journal, checkpoint):
+    write_journal('Journal.2021-05-01T120000.01.log', [music(number) for number in range(3)])
+    handler = journal_handler(app_dirs['data_dir'])
+    with open(handler.checkpoint_path, 'wb') as checkpoint_file:
+        pickle.dump(checkpoint, checkpoint_file)
+
+    state = dict(handler.state)
+    assert not handler.resume()
+    assert handler.state == state
+    assert handler.resume_offset == 0
@@ -0,0 +1,62 @@
+import json
+import os
+from os.path import join
+
+from companion import CompanionFiles
+from monitor import JournalHandler
+
+
+def write(journal_dir, name, content):
+    path = join(journal_dir, name)
+    with open(path, 'w', encoding='utf-8') as companion_file:
+        json.dump(dict(content, timestamp='2021-05-01T12:00:00Z'), companion_file)
+    # A new mtime even within the resolution of the file system
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_companion_files_keep_the_state(app_dirs):
+    journal_dir = app_dirs['journal_dir']
+    companion = CompanionFiles(journal_dir)
+    handler = JournalHandler()
+
+    write(journal_dir, 'Status.json', {
+        'event': 'Status', 'Flags': 1 << 20, 'Fuel': {'FuelMain': 12.5, 'FuelReservoir': 0.5},
+    })
+    write(journal_dir, 'NavRoute.json', {'event': 'NavRoute', 'Route': [
+        {'StarSystem': 'Sol', 'SystemAddress': 10477373803},
+        {'StarSystem': 'Alpha Centauri', 'SystemAddress': 1458376315610},
+    ]})
+    write(journal_dir, 'Cargo.json', {'event': 'Cargo', 'Vessel': 'Ship', 'Count': 6, 'Inventory': [
+        {'Name': 'gold', 'Name_Localised': 'Gold', 'Count': 4, 'Stolen': 0},
+        {'Name': 'gold', 'Name_Localised': 'Gold', 'Count': 1, 'Stolen': 1},
+        {'Name': 'water', 'Count': 1, 'Stolen': 0},
+    ]})
+    write(journal_dir, 'Market.json', {'event': 'Market', 'Items': []})
+
+    entries = list(companion.changes(poll=True))
+    assert sorted(entry['event'] for entry in entries) == ['Cargo', 'NavRoute', 'Status']
+    for entry in entries:
+        handler.apply(entry)
+
+    assert handler.state['FuelLevel'] == 12.5
+    assert handler.state['Overheating'] is True
+    assert handler.state['NavRoute'] == ['Sol', 'Alpha Centauri']
+    assert handler.state['CargoVessel'] == 'Ship'
+    assert handler.state['CargoCount'] == 6
+    assert handler.state['Cargo'] == {'Gold': 5, 'water': 1}
+
+    # Only the changed fields come through
+    write(journal_dir, 'Cargo.json', {'event': 'Cargo', 'Vessel': 'Ship', 'Count': 2, 'Inventory': [
+        {'Name': 'water', 'Count': 2, 'Stolen': 0},
+    ]})
+    write(journal_dir, 'NavRoute.json', {'event': 'NavRoute'})
+
+    entries = {entry['event']: entry for entry in companion.changes(poll=True)}
+    assert 'Vessel' not in entries['Cargo']
+    for entry in entries.values():
+        handler.apply(entry)
+
+    assert handler.state['Cargo'] == {'water': 2}
+    assert handler.state['CargoCount'] == 2
+    assert handler.state['NavRoute'] == []
@@ -0,0 +1,51 @@
+import io
+import os
+import sys
+
+import colorama
+import pytest
+
+from console import ConsoleWriter
+
+
+class Stream(io.StringIO):
+    def __init__(self, tty):
+        super().__init__()
+        self.tty = tty
+        self.writes = 0
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+RECORDS = [f'{colorama.Fore.GREEN}Scan {number}{colorama.Style.RESET_ALL}' for number in range(50)]
+
+
+def console_writer(monkeypatch, tty):
+    stream = Stream(tty)
+    monkeypatch.setattr(sys, '__stdout__', stream)
+    monkeypatch.setattr(sys, 'stdout', colorama.AnsiToWin32(stream, strip=not tty).stream)
+    writer = ConsoleWriter(flush_interval=10)
+    for record in RECORDS:
+        writer.write(record)
+    writer.flush()
+    return stream
+
+
+def test_redirected_output_is_stripped_past_colorama(monkeypatch):
+    stream = console_writer(monkeypatch, tty=False)
+
+    assert stream.getvalue() == ''.join(f'Scan {number}\n' for number in range(50))
+    assert stream.writes == 1
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='the console mode of the test run')
+def test_ansi_console_gets_the_records_as_they_are(monkeypatch):
+    stream = console_writer(monkeypatch, tty=True)
+
+    assert stream.getvalue() == ''.join(record + '\n' for record in RECORDS)
+    assert stream.writes == 1
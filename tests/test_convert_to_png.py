@@ -0,0 +1,26 @@
+import os
+from os.path import join
+
+from PIL import Image
+
+import convert_to_png
+from convert_to_png import BatchConversion
+
+
+def test_batch_skips_screenshots_that_disappear(app_dirs, monkeypatch):
+    screenshots_dir = app_dirs['screenshots_dir']
+    Image.new('RGB', (64, 32), 'red').save(join(screenshots_dir, 'Screenshot_0000.bmp'))
+    # Renamed by the app between the listing and the conversion
+    listdir = os.listdir
+    monkeypatch.setattr(convert_to_png.os, 'listdir',
+                        lambda path: listdir(path) + ['Screenshot_0001.bmp'])
+
+    batch = BatchConversion(screenshots_dir, jobs=1, progress=False)
+    paths = batch.screenshots()
+    assert paths == [join(screenshots_dir, 'Screenshot_0000.bmp')]
+
+    assert batch.run()
+    batch.convert_all([join(screenshots_dir, 'Screenshot_0002.bmp')])
+    assert batch.converted == 1
+    assert batch.failed == {}
+    assert listdir(screenshots_dir) == ['Screenshot_0000.png']
@@ -0,0 +1,24 @@
+import threading
+
+from eventqueue import EventQueue
+
+
+def test_blocked_put_returns_false_after_close():
+    queue = EventQueue(maxsize=2)
+    assert queue.put('a')
+    assert queue.put('b')
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(queue.put('c')))
+    thread.start()
+    thread.join(0.1)
+    assert thread.is_alive()
+
+    queue.close()
+    thread.join(1)
+    assert results == [False]
+    assert len(queue) == 2
+    assert not queue.put('d')
+
+    # The entries queued before the close are still taken
+    assert [queue.get(), queue.get(), queue.get()] == ['a', 'b', None]
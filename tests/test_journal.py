@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+from journal import JournalFile, Journals
+
+
+def entry(number, timestamp, event='Music'):
+    return {'timestamp': timestamp, 'event': event, 'Number': number}
+
+
+def timestamp(minute):
+    return f'2021-05-01T12:{minute:02d}:00Z'
+
+
+@pytest.fixture
+def journal_path(app_dirs, write_journal, monkeypatch):
+    # Many index entries from a small journal
+    monkeypatch.setattr(JournalFile, 'INDEX_STRIDE', 256)
+    # Ten lines a minute, index entries share their timestamps
+    write_journal('Journal.2021-05-01T120000.01.log', [
+        entry(number, timestamp(number // 10), 'Loadout' if number % 25 == 0 else 'Music')
+        for number in range(300)
+    ])
+    return os.path.join(app_dirs['journal_dir'], 'Journal.2021-05-01T120000.01.log')
+
+
+def append(path, entries, newline=True):
+    with open(path, 'a', encoding='utf-8') as log:
+        log.write('\r\n'.join(json.dumps(entry) for entry in entries))
+        if newline:
+            log.write('\r\n')
+
+
+def test_index_is_built_once_and_reused(journal_path, monkeypatch):
+    with JournalFile(journal_path) as journal:
+        index = journal.load_index()
+
+    assert os.path.exists(journal.index_path)
+    assert index['size'] == os.path.getsize(journal_path)
+    assert index['first'] == timestamp(0)
+    assert index['last'] == timestamp(29)
+    assert len(index['entries']) > 10
+    assert [offset for _, offset in index['entries']] == sorted(
+        offset for _, offset in index['entries'])
+
+    def extend_index(index):
+        raise AssertionError('the saved index is up to date')
+
+    monkeypatch.setattr(JournalFile, 'extend_index', extend_index)
+    with JournalFile(journal_path) as journal:
+        assert journal.load_index() == json.loads(json.dumps(index))
+
+
+def test_index_of_a_grown_journal_is_extended(journal_path):
+    with JournalFile(journal_path) as journal:
+        size = journal.load_index()['size']
+
+    append(journal_path, [entry(300 + number, timestamp(30 + number)) for number in range(20)])
+    # The game is still writing the last line
+    append(journal_path, [entry(320, timestamp(59))], newline=False)
+
+    with JournalFile(journal_path) as journal:
+        index = journal.load_index()
+        assert size < index['size'] < os.path.getsize(journal_path)
+        assert index['last'] == timestamp(49)
+        found = list(journal.events_between(timestamp(40), timestamp(59)))
+        assert [entry['Number'] for entry in found] == list(range(310, 320))
+        assert journal.last_before('Music', timestamp(59))['Number'] == 319
+
+
+def test_index_of_a_replaced_journal_is_rebuilt(journal_path, write_journal):
+    with JournalFile(journal_path) as journal:
+        journal.load_index()
+
+    write_journal(os.path.basename(journal_path), [entry(0, timestamp(45))])
+
+    with JournalFile(journal_path) as journal:
+        index = journal.load_index()
+        assert index['first'] == index['last'] == timestamp(45)
+        assert [entry['Number'] for entry in journal.events_between(timestamp(0), timestamp(59))] == [0]
+
+
+def test_events_between_includes_the_start_and_excludes_the_end(journal_path):
+    with JournalFile(journal_path) as journal:
+        found = list(journal.events_between(timestamp(5), timestamp(7)))
+        assert [entry['Number'] for entry in found] == list(range(50, 70))
+
+        loadouts = list(journal.events_between(timestamp(0), timestamp(30), ['Loadout']))
+        assert [entry['Number'] for entry in loadouts] == list(range(0, 300, 25))
+
+        assert list(journal.events_between(timestamp(30), timestamp(40))) == []
+        assert [entry['Number'] for entry in journal.events_between(
+            '2021-05-01T11:00:00Z', timestamp(1))] == list(range(10))
+
+
+def test_last_before_excludes_the_timestamp_itself(journal_path):
+    with JournalFile(journal_path) as journal:
+        # Loadouts at 12:00, 12:02 (number 25), 12:05 (50), 12:07 (75)
+        assert journal.last_before('Loadout', timestamp(5))['Number'] == 25
+        assert journal.last_before('Loadout', timestamp(6))['Number'] == 50
+        assert journal.last_before('Loadout', timestamp(0)) is None
+        assert journal.last_before('Docked', timestamp(29)) is None
+
+
+def test_queries_over_all_journals(journal_path, write_journal):
+    write_journal('Journal.2021-05-02T120000.01.log', [
+        {'timestamp': '2021-05-02T12:00:00Z', 'event': 'Loadout', 'Number': 1000},
+    ])
+    journals = Journals()
+
+    found = list(journals.events_between(timestamp(29), '2021-05-02T12:00:01Z'))
+    assert [entry['Number'] for entry in found] == list(range(290, 300)) + [1000]
+    assert journals.last_before('Loadout', '2021-05-02T00:00:00Z')['Number'] == 275
+    assert journals.last_before('Loadout', '2021-05-03T00:00:00Z')['Number'] == 1000
@@ -0,0 +1,54 @@
+from os.path import join
+
+import pytest
+
+import events
+from config import config
+from monitor import JournalHandler
+
+
+@pytest.mark.parametrize('checkpoint_interval', [0, 30])
+def test_notifications_still_poll_the_journal(monkeypatch, checkpoint_interval):
+    monkeypatch.setitem(config, 'journal_poll_interval', 0.5)
+    handler = JournalHandler()
+    handler.checkpoint_interval = checkpoint_interval
+    monkeypatch.setattr(handler, 'notifications', lambda: True)
+
+    assert handler.wait_timeout() == 0.5
+
+
+def test_new_journal_is_announced_in_turn_with_the_events(app_dirs, write_journal, capsys):
+    def music(track):
+        return {'timestamp': '2021-05-01T12:00:00Z', 'event': 'Music', 'MusicTrack': track}
+
+    write_journal('Journal.2021-05-01T120000.01.log', [music('First')])
+    handler = JournalHandler()
+    handler.checkpoint_interval = 0
+    handler.track(('Music', 'JournalOpened'))
+    handler.logfile = join(app_dirs['journal_dir'], 'Journal.2021-05-01T120000.01.log')
+    handler.open_logfile()
+    assert [entry['MusicTrack'] for entry in handler.read_entries()] == ['First']
+
+    write_journal('Journal.2021-05-01T130000.01.log', [music('Second')])
+    entries = list(handler.read_entries())
+    handler.loghandle.close()
+
+    assert [entry['event'] for entry in entries] == ['JournalOpened', 'Music']
+    assert entries[0]['Path'] == join(app_dirs['journal_dir'], 'Journal.2021-05-01T130000.01.log')
+    assert capsys.readouterr().out == ''
+
+
+@pytest.mark.parametrize('tracked', [('Music',), ()])
+def test_prefilter_keeps_the_lines_of_state_and_tracked_events(tracked):
+    handler = JournalHandler()
+    handler.track(tracked)
+
+    for event in set(events.state_events()) | set(tracked):
+        # Spacing of the game and of other writers of journals
+        for line in (f'{{ "timestamp":"2021-05-01T12:00:00Z", "event":"{event}" }}',
+                     f'{{"timestamp": "2021-05-01T12:00:00Z", "event" : "{event}"}}'):
+            assert handler.decode(line.encode()) == {
+                'timestamp': '2021-05-01T12:00:00Z', 'event': event}
+
+    line = b'{ "timestamp":"2021-05-01T12:00:00Z", "event":"ReservoirReplenished" }'
+    assert handler.decode(line) is None
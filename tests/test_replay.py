@@ -0,0 +1,114 @@
+import copy
+import os
+from os.path import join
+
+from bodydb import BodyDatabase
+from monitor import monitor
+from replay import JournalReplay
+
+
+def scan_entry(star_system, body_id, timestamp):
+    return {
+        'timestamp': timestamp, 'event': 'Scan', 'ScanType': 'Detailed',
+        'BodyName': f'{star_system} {body_id}', 'BodyID': body_id, 'StarSystem': star_system,
+        'Parents': [{'Star': 0}], 'DistanceFromArrivalLS': 1000.0 + body_id,
+        'TidalLock': False, 'TerraformState': '', 'Landable': True,
+        'PlanetClass': 'High metal content body' if body_id % 2 else 'Icy body',
+        'Atmosphere': '', 'AtmosphereType': 'None', 'Volcanism': '',
+        'MassEM': 0.1 * body_id, 'Radius': 1e6 * body_id,
+        'SurfaceGravity': 2.0 * body_id, 'SurfaceTemperature': 100.0 + body_id,
+        'SurfacePressure': 0.0, 'SemiMajorAxis': 1e9 * body_id,
+        'Eccentricity': 0.01, 'OrbitalInclination': 1.0, 'Periapsis': 10.0,
+        'OrbitalPeriod': 1e6, 'RotationPeriod': 1e5, 'AxialTilt': 0.1,
+        'Materials': [{'Name': 'iron', 'Percent': 20.0}, {'Name': 'polonium', 'Percent': 1.0}],
+        'Composition': {'Ice': 0.1, 'Rock': 0.6, 'Metal': 0.3},
+        'WasDiscovered': False, 'WasMapped': False,
+    }
+
+
+def moon_scan_entry(star_system, body_id, parent_id, timestamp):
+    entry = scan_entry(star_system, body_id, timestamp)
+    entry.update({'Parents': [{'Planet': parent_id}, {'Star': 0}],
+                  'Radius': 1e5, 'SemiMajorAxis': 1e6})
+    return entry
+
+
+def session(number, systems=3, bodies=5):
+    timestamp = f'2021-05-0{number}T12:00:00Z'
+    entries = [
+        {'timestamp': timestamp, 'event': 'LoadGame', 'Commander': 'Jameson',
+         'Ship_Localised': 'Asp Explorer', 'ShipName': 'Hopper', 'ShipIdent': 'HP-01',
+         'FuelLevel': 30.0, 'FuelCapacity': 32.0, 'GameMode': 'Solo',
+         'Credits': 1000 * number},
+    ]
+    if number > 1:
+        # The game was restarted in the last system of the journal before,
+        # the moons orbit the planets scanned there
+        star_system = f'Synuefe AB-C d{number - 1}-{systems - 1}'
+        entries.append({'timestamp': timestamp, 'event': 'Location',
+                        'StarSystem': star_system, 'Population': 0})
+        for body_id in range(1, bodies + 1):
+            entries.append(moon_scan_entry(star_system, 100 + body_id, body_id, timestamp))
+    for system in range(systems):
+        star_system = f'Synuefe AB-C d{number}-{system}'
+        entries.append({'timestamp': timestamp, 'event': 'FSDJump',
+                        'StarSystem': star_system, 'Population': 0})
+        for body_id in range(1, bodies + 1):
+            entries.append(scan_entry(star_system, body_id, timestamp))
+            entries.append(moon_scan_entry(star_system, 50 + body_id, body_id, timestamp))
+    return entries
+
+
+def replay_bodies(database):
+    connection = database.connect()
+    return (
+        connection.execute('SELECT * FROM bodies ORDER BY star_system, body_id').fetchall(),
+        connection.execute('SELECT * FROM interests ORDER BY star_system, body_id, interest').fetchall(),
+    )
+
+
+def test_parallel_replay_matches_sequential(app_dirs, write_journal, tmp_path):
+    for number in range(1, 5):
+        write_journal(f'Journal.2021-05-0{number}T120000.01.log', session(number))
+
+    initial_state = copy.deepcopy(
+        {key: value for key, value in monitor.state.items() if key != 'StarSystemBodies'})
+
+    results = []
+    for jobs in (1, 2):
+        monitor.state.update(copy.deepcopy(initial_state))
+        database = BodyDatabase(str(tmp_path / f'bodies-{jobs}.sqlite'))
+        JournalReplay('bodies', jobs=jobs, progress=False, database=database).run()
+
+        state = {key: value for key, value in monitor.state.items() if key != 'StarSystemBodies'}
+        results.append((replay_bodies(database), state))
+        database.close()
+
+    (bodies, interests), state = results[0]
+    assert len(bodies) == 4 * 3 * 5 * 2 + 3 * 5
+    close_orbits = [row for row in interests if 'Close orbit' in str(row)]
+    # The moons of every planet, in its journal and in the one after
+    assert len(close_orbits) == len(bodies) - 4 * 3 * 5
+    assert state['Commander'] == 'Jameson'
+    assert state['Credits'] == 4000
+    assert results[1] == results[0]
+
+
+def test_text_replay_leaves_screenshots_alone(app_dirs, write_journal):
+    screenshots_dir = app_dirs['screenshots_dir']
+    for name in ('Screenshot_0000.bmp', 'Screenshot_0001.bmp'):
+        with open(join(screenshots_dir, name), 'wb') as screenshot_file:
+            screenshot_file.write(b'BM')
+
+    write_journal('Journal.2021-05-01T120000.01.log', [
+        {'timestamp': '2021-05-01T12:05:00Z', 'event': 'Screenshot',
+         'Filename': '\\ED_Pictures\\Screenshot_0000.bmp', 'Width': 1920, 'Height': 1080,
+         'System': 'Sol', 'Body': 'Earth'},
+    ])
+
+    before = sorted(os.listdir(screenshots_dir))
+    replay = JournalReplay('text', jobs=1, progress=False)
+    replay.run()
+
+    assert replay.entries == 1
+    assert sorted(os.listdir(screenshots_dir)) == before
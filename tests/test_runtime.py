@@ -0,0 +1,21 @@
+import asyncio
+
+from monitor import JournalHandler
+from runtime import LoopQueue
+
+
+def test_diagnostics_with_loop_queue():
+    async def main():
+        queues = [asyncio.Queue(10), asyncio.Queue(10)]
+        handler = JournalHandler()
+        handler.event_queue = LoopQueue(asyncio.get_running_loop(), queues)
+
+        for number in range(12):
+            handler.event_queue.put({'event': 'Music', 'number': number})
+        await asyncio.sleep(0)
+        await queues[1].get()
+        return handler.diagnostics()['event_queue'], len(handler.event_queue)
+
+    stats, depth = asyncio.run(main())
+    assert stats == {'depth': 10, 'depths': [10, 9], 'maxsize': 10, 'dropped': 4}
+    assert depth == 10
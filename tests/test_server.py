@@ -0,0 +1,193 @@
+import asyncio
+import base64
+import hashlib
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from config import config
+from monitor import monitor
+from server import (
+    OPCODE_CLOSE, OPCODE_TEXT, WEBSOCKET_GUID, StateServer, read_websocket_frame)
+from sinks import Sinks, listen
+
+
+@pytest.fixture
+def server(app_dirs):
+    server = StateServer(port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def get(server, path, headers=None):
+    host, port = server.address()
+    request = urllib.request.Request(f'http://{host}:{port}{path}', headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+
+def decode_frame(frame):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(frame)
+        reader.feed_eof()
+        return await read_websocket_frame(reader)
+
+    opcode, payload = asyncio.run(read())
+    return opcode, json.loads(payload)
+
+
+def test_server_on_a_taken_port_is_left_out(monkeypatch, capsys):
+    with listen(('127.0.0.1', 0)) as taken:
+        monkeypatch.setitem(config, 'server_port', taken.getsockname()[1])
+        sinks = Sinks(['server'])
+        sinks.start()
+
+    assert sinks.sinks == []
+    assert 'server sink not started' in capsys.readouterr().err
+
+
+def test_server_in_a_thread_of_its_own(server):
+    status, _, body = get(server, '/metrics')
+    assert status == 200
+    assert json.loads(body)[0]['name'] == 'server'
+
+
+def test_state_is_not_sent_again_while_unchanged(server):
+    monitor.state['Commander'] = 'Jameson'
+    monitor.state_version += 1
+
+    status, headers, body = get(server, '/state')
+    etag = headers['ETag']
+    assert status == 200
+    assert etag == f'"{monitor.state_version}"'
+    assert json.loads(body)['state']['Commander'] == 'Jameson'
+
+    status, _, body = get(server, '/state', {'If-None-Match': etag})
+    assert status == 304
+    assert body == b''
+
+    monitor.state['Credits'] = 1000
+    monitor.state_version += 1
+    status, headers, body = get(server, '/state', {'If-None-Match': etag})
+    assert status == 200
+    assert headers['ETag'] != etag
+    assert json.loads(body)['state']['Credits'] == 1000
+
+
+def test_snapshot_is_rebuilt_only_for_a_new_state_version(app_dirs, monkeypatch):
+    server = StateServer(port=0)
+    builds = []
+    build_snapshot = server.build_snapshot
+    monkeypatch.setattr(server, 'build_snapshot', lambda: builds.append(1) or build_snapshot())
+
+    server.update_state()
+    server.update_state()
+    assert len(builds) == 1
+
+    monitor.state_version += 1
+    server.update_state()
+    server.update_state()
+    assert len(builds) == 2
+    assert server.version == monitor.state_version
+
+
+def test_diff_has_the_changed_and_removed_keys(app_dirs):
+    server = StateServer(port=0, client_queue_size=10)
+    monitor.state['Commander'] = 'Jameson'
+    monitor.state_version += 1
+    server.update_state()
+
+    client = asyncio.Queue(10)
+    server.clients.add(client)
+    monitor.state['Credits'] = 2000
+    monitor.state['FuelLevel'] = 12.5
+    del monitor.state['Docked']
+    monitor.state_version += 1
+    server.update_state()
+
+    opcode, message = decode_frame(client.get_nowait())
+    assert opcode == OPCODE_TEXT
+    assert message == {
+        'type': 'diff', 'version': monitor.state_version,
+        'changed': {'Credits': 2000, 'FuelLevel': 12.5}, 'removed': ['Docked'],
+    }
+    assert client.empty()
+
+
+def test_client_with_a_full_queue_is_disconnected(app_dirs):
+    server = StateServer(port=0, client_queue_size=2)
+    slow = asyncio.Queue(2)
+    fast = asyncio.Queue(2)
+    server.clients.update((slow, fast))
+
+    server.broadcast({'type': 'event'})
+    server.broadcast({'type': 'event'})
+    fast.get_nowait()
+    fast.get_nowait()
+    server.broadcast({'type': 'event'})
+
+    assert server.clients == {fast}
+    assert server.metrics()['disconnected'] == 1
+    # Everything queued for it is dropped, its writer closes the connection
+    assert slow.get_nowait() is None
+    assert slow.empty()
+
+
+def test_websocket_sends_a_snapshot_then_the_events(server):
+    monitor.state['Commander'] = 'Jameson'
+    monitor.state_version += 1
+    host, port = server.address()
+    key = base64.b64encode(b'0123456789abcdef').decode()
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write((
+            'GET /events HTTP/1.1\r\n'
+            f'Host: {host}:{port}\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            f'Sec-WebSocket-Key: {key}\r\n'
+            'Sec-WebSocket-Version: 13\r\n\r\n'
+        ).encode())
+        response = (await reader.readuntil(b'\r\n\r\n')).decode()
+
+        messages = [await read_websocket_frame(reader)]
+        server.put({'event': 'Music', 'MusicTrack': 'Exploration'}, '\x1b[33mMusic')
+        messages.append(await read_websocket_frame(reader))
+
+        monitor.state['Credits'] = 3000
+        monitor.state_version += 1
+        server.put({'event': 'Music', 'MusicTrack': 'Combat'}, 'Music')
+        messages.append(await read_websocket_frame(reader))
+        messages.append(await read_websocket_frame(reader))
+
+        server.stop()
+        closed = await read_websocket_frame(reader)
+        writer.close()
+        return response, messages, closed
+
+    response, messages, closed = asyncio.run(asyncio.wait_for(client(), 5))
+
+    accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+    assert response.startswith('HTTP/1.1 101 ')
+    assert f'Sec-WebSocket-Accept: {accept}\r\n' in response
+
+    assert all(opcode == OPCODE_TEXT for opcode, _ in messages)
+    snapshot, event, diff, second_event = (json.loads(payload) for _, payload in messages)
+    assert snapshot['type'] == 'snapshot'
+    assert snapshot['state']['Commander'] == 'Jameson'
+    assert event == {'type': 'event', 'version': snapshot['version'],
+                     'entry': {'event': 'Music', 'MusicTrack': 'Exploration'},
+                     'record': 'Music'}
+    assert diff == {'type': 'diff', 'version': snapshot['version'] + 1,
+                    'changed': {'Credits': 3000}, 'removed': []}
+    assert second_event['version'] == diff['version']
+    assert second_event['entry']['MusicTrack'] == 'Combat'
+    assert closed == (OPCODE_CLOSE, b'')
@@ -0,0 +1,77 @@
+import json
+import socket
+import time
+
+from console import ConsoleWriter
+from sinks import ConsoleSink, SocketSink, TextSink
+
+
+class SlowStream:
+    def __init__(self):
+        self.lines = []
+
+    def write(self, text):
+        time.sleep(0.001)
+        self.lines.extend(text.splitlines())
+
+    def flush(self):
+        pass
+
+
+def test_console_sink_loses_nothing():
+    stream = SlowStream()
+    sink = ConsoleSink(ConsoleWriter(stream, flush_interval=0, buffer_size=0), queue_size=10)
+    sink.start()
+    for number in range(500):
+        sink.put({'event': 'Music'}, f'record {number}')
+    sink.stop()
+
+    assert stream.lines == [f'record {number}' for number in range(500)]
+    assert sink.metrics()['dropped'] == 0
+
+
+def test_text_sink_discards_when_full(tmp_path):
+    sink = TextSink(str(tmp_path / 'events.log'), queue_size=10)
+    # Not started, nothing takes the events
+    for number in range(20):
+        sink.put({'event': 'Music'}, f'record {number}')
+
+    assert sink.metrics()['dropped'] == 10
+
+
+class Cp1252Stream(SlowStream):
+    def write(self, text):
+        text.encode('cp1252')
+        self.lines.extend(text.splitlines())
+
+
+def test_sink_survives_write_errors():
+    stream = Cp1252Stream()
+    sink = ConsoleSink(ConsoleWriter(stream, flush_interval=0, buffer_size=0))
+    sink.start()
+    sink.put({'event': 'ReceiveText'}, 'record 0')
+    sink.put({'event': 'ReceiveText'}, 'Система Сол')
+    sink.put({'event': 'ReceiveText'}, 'record 2')
+    sink.stop()
+
+    assert stream.lines == ['record 0', 'record 2']
+    assert sink.metrics()['errors'] == 1
+    assert sink.metrics()['delivered'] == 3
+
+
+def test_socket_sink_sends_json_lines():
+    sink = SocketSink(port=0)
+    sink.start()
+    client = socket.create_connection(sink.server.getsockname(), timeout=5)
+    try:
+        # The client is accepted by a thread of the sink
+        deadline = time.monotonic() + 5
+        while not sink.clients and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sink.put({'event': 'Music', 'MusicTrack': 'Exploration'}, 'record')
+        line = client.makefile().readline()
+    finally:
+        client.close()
+        sink.stop()
+
+    assert json.loads(line) == {'event': 'Music', 'MusicTrack': 'Exploration'}